@@ -1,12 +1,21 @@
+import contextlib
 import json
 import logging
 import os
+import threading
+import time
 
 import requests
 
 from ecsclient.authentication import Authentication
-from ecsclient.common.exceptions import ECSClientException
+from ecsclient.common.concurrency import OVERLOAD_STATUS_CODES, TokenBucket
+from ecsclient.common.deadline import current_deadline, deadline as new_deadline
+from ecsclient.common.drift import DriftMonitor
+from ecsclient.common.exceptions import DeadlineExceeded, ECSClientException
+from ecsclient.common.token_manager import TokenManager
 from ecsclient.common.token_request import TokenRequest
+from ecsclient.common.urn import URNResolver
+from ecsclient.common.util import is_valid_response, response_schema
 
 # Suppress the insecure request warning
 # https://urllib3.readthedocs.org/en/
@@ -17,13 +26,22 @@ requests.packages.urllib3.disable_warnings()
 log = logging.getLogger(__name__)
 log.addHandler(logging.NullHandler())
 
+# HTTP verbs sending a JSON body
+BODY_VERBS = frozenset(['POST', 'PUT'])
+
+# Encoded default payload of POST and PUT calls
+EMPTY_PAYLOAD = json.dumps('{}')
+
 
 class Client(object):
 
     def __init__(self, username=None, password=None, token=None,
                  ecs_endpoint=None, token_endpoint=None, verify_ssl=False,
                  token_path='/tmp/ecsclient.tkn',
-                 request_timeout=15.0, cache_token=True, override_header=None):
+                 request_timeout=15.0, cache_token=True, override_header=None,
+                 limiter=None, rate_limit=None, adapter=None, token_lifetime=None,
+                 token_manager=None, token_store=None, urn_cache_ttl=900, validate_responses=False,
+                 drift_monitor=None, drift_rate=None):
         """
         Creates the ECSClient class that the client will directly work with
 
@@ -33,13 +51,41 @@ class Client(object):
         :param token: Supply a valid token to use instead of username/password
         :param ecs_endpoint: The URL where ECS is located
         :param token_endpoint: The URL where the ECS login is located
-        :param verify_ssl: Verify SSL certificates
+        :param verify_ssl: Verify SSL certificates. The proxies (``*_PROXY``,
+        ``NO_PROXY``) and CA bundle (``REQUESTS_CA_BUNDLE``) environment
+        variables are read once, when the client is created, and ``.netrc``
+        credentials are not used
         :param token_path: Path to the cached token file
         :param request_timeout: How long to wait for ECS to respond
         :param cache_token: Whether to cache the token, by default this is true
         you should only switch this to false when you want to directly fetch
         a token for a user
         :param override_header: X-EMC-Override header value into API calls
+        :param limiter: Concurrency limiter shared by all calls made with this
+        client, ex: ecsclient.common.concurrency.AIMDLimiter (optional)
+        :param rate_limit: Maximum number of requests per second (optional)
+        :param adapter: Transport adapter used for the ECS endpoint, ex:
+        ecsclient.common.recording.RecordingAdapter (optional)
+        :param token_lifetime: Seconds a token is valid for. When set along with
+        username/password, the token is refreshed in the background before it
+        expires (optional)
+        :param token_manager: TokenManager holding the tokens of the identities
+        used with as_identity(). Created on first use if not provided (optional)
+        :param token_store: Where to cache the token, ex:
+        ecsclient.common.token_store.DirectoryTokenStore. Defaults to the
+        single file at token_path
+        :param urn_cache_ttl: Seconds the names of replication groups, storage
+        pools and VDCs are cached for by the ``urns`` resolver
+        :param validate_responses: Validate every GET response against its
+        schema from ecsclient.schemas and log the responses that do not
+        match (optional)
+        :param drift_monitor: Validates a sample of the responses in the
+        background and counts schema violations, ex:
+        ecsclient.common.drift.DriftMonitor. It is not closed with the
+        client, so that it can be shared (optional)
+        :param drift_rate: Fraction of the responses validated by a
+        DriftMonitor created for this client and closed with it, instead
+        of ``drift_monitor`` (optional)
         """
         if not ecs_endpoint:
             raise ECSClientException("Missing 'ecs_endpoint'")
@@ -51,7 +97,7 @@ class Client(object):
                 raise ECSClientException("'token_endpoint' provided but missing ('username','password')")
             self.token_endpoint = self.token_endpoint.rstrip('/')
         else:
-            if not (token or os.path.isfile(token_path)):
+            if not (token or token_store is not None or os.path.isfile(token_path)):
                 raise ECSClientException("'token_endpoint' not provided and missing 'token'|'token_path'")
 
         self.override_header = override_header
@@ -63,7 +109,27 @@ class Client(object):
         self.token_path = token_path
         self.request_timeout = request_timeout
         self.cache_token = cache_token
+        self.limiter = limiter
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.token_manager = token_manager
+        self.urns = URNResolver(self, ttl=urn_cache_ttl)
+        self.validate_responses = validate_responses
+        if drift_monitor is not None and drift_rate is not None:
+            raise ECSClientException("Only one of 'drift_monitor' and 'drift_rate' can be provided")
+        self._owns_drift_monitor = drift_rate is not None
+        self.drift_monitor = DriftMonitor(rate=drift_rate) if self._owns_drift_monitor else drift_monitor
+        self._local = threading.local()
+        self._url_prefix = self.ecs_endpoint + '/'
+        self._headers_cache = (None, None, None)
         self._session = requests.Session()
+
+        # Resolve proxies and CA bundle from the environment once, instead of
+        # letting requests scan the environment on every call. Later changes
+        # to the environment and .netrc auth are therefore ignored
+        settings = self._session.merge_environment_settings(self._url_prefix, {}, None, self.verify_ssl, None)
+        self._session.proxies.update(settings['proxies'])
+        self._session.trust_env = False
+        self._verify = settings['verify']
         self._token_request = TokenRequest(
             username=self.username,
             password=self.password,
@@ -72,11 +138,33 @@ class Client(object):
             verify_ssl=self.verify_ssl,
             token_path=self.token_path,
             request_timeout=self.request_timeout,
-            cache_token=self.cache_token)
+            cache_token=self.cache_token,
+            token_store=token_store)
+
+        if adapter is not None:
+            self._session.mount(self.ecs_endpoint, adapter)
+            self._token_request.session.mount(self.ecs_endpoint, adapter)
+            if self.token_endpoint:
+                self._token_request.session.mount(self.token_endpoint, adapter)
+
+        if token_lifetime and self.token_endpoint:
+            self._token_request.start_refresher(token_lifetime)
 
         # Authentication
         self.authentication = Authentication(self)
 
+    def close(self):
+        """
+        Release the resources held by the client: background token refresh,
+        connection pools, transport adapters and the drift monitor it
+        created. The token is not logged out
+        """
+        self._token_request.stop_refresher()
+        self._token_request.session.close()
+        self._session.close()
+        if self._owns_drift_monitor:
+            self.drift_monitor.close()
+
     def get_token(self):
         """
         Get a token directly back, typically you want to set the cache_token
@@ -98,24 +186,83 @@ class Client(object):
         and want to use a different token
         """
         self.token = None
-        self._token_request.token = None
+        self._token_request.remove_cached_token()
+
+    def deadline(self, timeout=None):
+        """
+        Context manager putting every call made in the enclosed block (in the
+        current thread and in the workers of ecsclient.common.parallel.imap)
+        under an overall deadline. Per-call timeouts are shrunk to the
+        remaining budget and calls fail with DeadlineExceeded once it is spent
+        or the deadline is cancelled, ie,
+
+            with client.deadline(60) as d:
+                client.bucket.list('namespace1')
+
+        :param timeout: Seconds until the deadline expires. None for a
+        cancellation-only deadline
+        """
+        return new_deadline(timeout)
+
+    @contextlib.contextmanager
+    def as_identity(self, username, password):
+        """
+        Context manager issuing the calls made in the enclosed block, in the
+        current thread, as another user. Tokens are kept by the client's
+        token manager and the connection pool is shared by all identities, ie,
 
-        if os.path.isfile(self.token_path):
-            log.debug("Removing cached token '{0}'".format(self.token_path))
-            os.remove(self.token_path)
+            with client.as_identity('ns1-admin', 'password'):
+                client.bucket.list('ns1')
 
-    def _fetch_headers(self):
-        token = self.token if self.token else self._token_request.get_token()
-        headers = {'Accept': 'application/json',
-                   'Content-Type': 'application/json',
-                   'x-sds-auth-token': token}
-        if self.override_header is not None:
-            headers['X-EMC-Override'] = self.override_header
-        return headers
+        :param username: The username to fetch a token
+        :param password: The password to fetch a token
+        """
+        if self.token_manager is None:
+            self.token_manager = TokenManager(verify_ssl=self.verify_ssl,
+                                              request_timeout=self.request_timeout,
+                                              session=self._session)
+
+        previous = getattr(self._local, 'identity', None)
+        self._local.identity = (username, password)
+        try:
+            yield
+        finally:
+            self._local.identity = previous
+
+    def _identity_token_endpoint(self):
+        return self.token_endpoint or self.ecs_endpoint + '/login'
+
+    def _fetch_token(self):
+        identity = getattr(self._local, 'identity', None)
+        if identity is not None:
+            return self.token_manager.get_token(self.ecs_endpoint, self._identity_token_endpoint(), *identity)
+        return self.token if self.token else self._token_request.get_token()
+
+    def _fetch_headers(self, http_verb='GET'):
+        """
+        Return the headers for a call. The dicts are built once per token and
+        shared by all calls, so they must not be modified.
+        """
+        token = self._fetch_token()
+        key = (token, self.override_header)
+        cached = self._headers_cache
+        if cached[0] != key:
+            headers = {'Accept': 'application/json',
+                       'Content-Type': 'application/json',
+                       'x-sds-auth-token': token}
+            if self.override_header is not None:
+                headers['X-EMC-Override'] = self.override_header
+            # Need to follow up - if 'accept' is in the headers
+            # delete calls are not working because ECS 2.0 is returning
+            # XML even if JSON is specified
+            delete_headers = dict(headers)
+            del delete_headers['Accept']
+            cached = self._headers_cache = (key, headers, delete_headers)
+        return cached[2] if http_verb == 'DELETE' else cached[1]
 
     def _construct_url(self, path):
-        url = '{0}/{1}'.format(self.ecs_endpoint, path)
-        log.debug('Constructed URL as: {0}'.format(url))
+        url = self._url_prefix + path
+        log.debug('Constructed URL as: %s', url)
         return url
 
     def get(self, url, params=None):
@@ -130,63 +277,88 @@ class Client(object):
     def delete(self, url, params=None):
         return self._request(url, params=params, http_verb='DELETE')
 
+    def _acquire_slot(self, deadline=None):
+        timeout = deadline.remaining() if deadline is not None else None
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(timeout=timeout):
+            raise DeadlineExceeded('Deadline exceeded waiting for the rate limiter')
+        timeout = deadline.remaining() if deadline is not None else None
+        if self.limiter is not None and not self.limiter.acquire(timeout=timeout):
+            raise DeadlineExceeded('Deadline exceeded waiting for the concurrency limiter')
+
+    def _release_slot(self, started, dropped):
+        if self.limiter is not None:
+            self.limiter.release(latency=time.time() - started, dropped=dropped)
+
     def _request(self, url, json_payload='{}', http_verb='GET', params=None):
-        json_payload = json.dumps(json_payload)
+        if http_verb in BODY_VERBS:
+            data = EMPTY_PAYLOAD if json_payload == '{}' else json.dumps(json_payload)
+        else:
+            data = None
 
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check()
+
+        self._acquire_slot(deadline)
+        started = time.time()
+        dropped = False
         try:
-            if http_verb == "PUT":
-                req = self._session.put(
-                    self._construct_url(url),
-                    verify=self.verify_ssl,
-                    headers=self._fetch_headers(),
-                    timeout=self.request_timeout,
-                    data=json_payload)
-            elif http_verb == 'POST':
-                req = self._session.post(
-                    self._construct_url(url),
-                    verify=self.verify_ssl,
-                    headers=self._fetch_headers(),
-                    timeout=self.request_timeout,
-                    data=json_payload)
-            elif http_verb == 'DELETE':
-                # Need to follow up - if 'accept' is in the headers
-                # delete calls are not working because ECS 2.0 is returning
-                # XML even if JSON is specified
-                headers = self._fetch_headers()
-                del headers['Accept']
-
-                req = self._session.delete(
-                    self._construct_url(url),
-                    verify=self.verify_ssl,
-                    headers=headers,
-                    timeout=self.request_timeout,
-                    params=params)
-            else:  # Default to GET
-                req = self._session.get(
-                    self._construct_url(url),
-                    verify=self.verify_ssl,
-                    headers=self._fetch_headers(),
-                    timeout=self.request_timeout,
-                    params=params)
+            timeout = self.request_timeout
+            if deadline is not None:
+                # Computed once the limiters let the call through, so that the
+                # time spent waiting for them counts against the deadline
+                timeout = deadline.timeout(timeout)
+            dropped = True
+            req = self._session.request(
+                http_verb,
+                self._construct_url(url),
+                verify=self._verify,
+                headers=self._fetch_headers(http_verb),
+                timeout=timeout,
+                params=params,
+                data=data)
+
+            dropped = req.status_code in OVERLOAD_STATUS_CODES
+
+            identity = getattr(self._local, 'identity', None)
+            if req.status_code == 401 and identity is not None:
+                # Let the next call as this identity log in again
+                self.token_manager.invalidate(self._identity_token_endpoint(), identity[0],
+                                              req.request.headers.get('x-sds-auth-token'))
 
             # Because some delete actions in the API return HTTP/1.1 204 No Content
             if not (200 <= req.status_code < 300):
                 log.error("Status code NOT OK")
                 raise ECSClientException.from_response(req)
+            if self.drift_monitor is not None:
+                self.drift_monitor.observe(http_verb, url, req.content)
             try:
-                return req.json()
+                body = req.json()
             except ValueError:
                 return req.text
+            if self.validate_responses:
+                schema = response_schema(http_verb, url)
+                if schema is not None and not is_valid_response(body, schema):
+                    log.warning("Unexpected response to %s %s", http_verb, url)
+            return body
 
         except requests.ConnectionError as conn_err:
+            if deadline is not None:
+                deadline.check()
             msg = 'Connection error: {0}'.format(conn_err.args)
             log.error(msg)
             raise ECSClientException(message=msg)
         except requests.HTTPError as http_err:
+            if deadline is not None:
+                deadline.check()
             msg = 'HTTP error: {0}'.format(http_err.args)
             log.error(msg)
             raise ECSClientException(message=msg)
         except requests.RequestException as req_err:
+            if deadline is not None:
+                deadline.check()
             msg = 'Request error: {0}'.format(req_err.args)
             log.error(msg)
             raise ECSClientException(message=msg)
+        finally:
+            self._release_slot(started, dropped)
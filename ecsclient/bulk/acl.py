@@ -0,0 +1,137 @@
+# Standard lib imports
+import json
+import logging
+
+# Third party imports
+import six
+
+# Project level imports
+from ecsclient.bulk.listing import iter_buckets
+from ecsclient.common import parallel
+
+log = logging.getLogger(__name__)
+
+# ACL entry lists and the key naming the grantee of their entries
+ACL_LISTS = (('user_acl', 'user'), ('group_acl', 'group'), ('customgroup_acl', 'customgroup'))
+
+
+def normalize_acl(acl):
+    """
+    Canonical form of a bucket ACL, so that two ACLs granting the same
+    permissions compare equal whatever the order of their entries
+
+    :param acl: The ACL returned by Bucket.get_acl, or its ``acl`` part
+    """
+    acl = acl.get('acl', acl) if acl else {}
+    normalized = {'owner': acl.get('owner') or None,
+                  'default_group': acl.get('default_group') or None}
+    for name, grantee in ACL_LISTS:
+        entries = []
+        for entry in acl.get(name) or []:
+            permission = entry.get('permission') or []
+            if isinstance(permission, six.string_types):
+                permission = [permission]
+            entries.append({grantee: entry[grantee], 'permission': sorted(permission)})
+        normalized[name] = sorted(entries, key=lambda e: e[grantee])
+    return normalized
+
+
+def export_acls(client, namespace, path, buckets=None, max_workers=None):
+    """
+    Write the ACL of every bucket of a namespace to a JSON-lines file, one
+    ``{"bucket": ..., "namespace": ..., "acl": {...}}`` line per bucket in
+    normalized form. ACLs are fetched concurrently and written as they
+    arrive, in bucket order.
+
+    A result dict is yielded for every bucket:
+
+    {
+        'bucket': 'bucket1',
+        'namespace': 'namespace1',
+        'status': 'exported',  # or 'failed'
+        'error': None
+    }
+
+    :param client: An ECS client instance
+    :param namespace: The namespace whose buckets are exported
+    :param path: Path to the JSON-lines file to write
+    :param buckets: Iterable of bucket names. Defaults to every bucket of the
+    namespace (optional)
+    :param max_workers: Maximum number of concurrent fetches. Defaults to the
+    client concurrency limit (optional)
+    """
+    if buckets is None:
+        buckets = (bucket['name'] for bucket in iter_buckets(client, namespace))
+
+    with open(path, 'w') as f:
+        for name, acl, error in parallel.imap(lambda name: client.bucket.get_acl(name, namespace=namespace),
+                                              buckets, max_workers=max_workers or parallel.default_workers(client)):
+            result = {'bucket': name, 'namespace': namespace, 'status': 'exported', 'error': None}
+            if error is not None:
+                result.update(status='failed', error=getattr(error, 'message', None) or str(error))
+                log.warning("Exporting the ACL of bucket '{0}' failed: {1}".format(name, result['error']))
+            else:
+                f.write(json.dumps({'bucket': name, 'namespace': namespace, 'acl': normalize_acl(acl)},
+                                   sort_keys=True) + '\n')
+            yield result
+
+
+def _read_acls(path):
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _set_acl(client, name, namespace, acl):
+    """
+    Replace the ACL of a bucket. Unlike Bucket.set_acl, which leaves empty
+    lists out of the request and so keeps the current grants, empty lists
+    are sent to clear the grants of their kind
+    """
+    payload = {'bucket': name, 'acl': dict((key, value) for key, value in acl.items() if value is not None)}
+    if namespace:
+        payload['namespace'] = namespace
+    client.put('object/bucket/{0}/acl'.format(name), json_payload=payload)
+
+
+def import_acls(client, path, dry_run=False, max_workers=None):
+    """
+    Restore bucket ACLs from a file written by export_acls(). The current
+    ACL of every bucket is fetched and only the buckets whose ACL differs
+    are updated, concurrently. The file is streamed, so it can be larger
+    than memory.
+
+    A result dict is yielded for every bucket, in file order:
+
+    {
+        'bucket': 'bucket1',
+        'namespace': 'namespace1',
+        'status': 'updated',  # or 'unchanged', 'changed' (dry run), 'failed'
+        'error': None
+    }
+
+    :param client: An ECS client instance
+    :param path: Path to the JSON-lines file to read
+    :param dry_run: Only report the buckets whose ACL would change
+    :param max_workers: Maximum number of buckets processed concurrently.
+    Defaults to the client concurrency limit (optional)
+    """
+    def restore(record):
+        name, namespace = record['bucket'], record.get('namespace')
+        desired = normalize_acl(record['acl'])
+        if normalize_acl(client.bucket.get_acl(name, namespace=namespace)) == desired:
+            return 'unchanged'
+        if dry_run:
+            return 'changed'
+
+        _set_acl(client, name, namespace, desired)
+        return 'updated'
+
+    for record, status, error in parallel.imap(restore, _read_acls(path),
+                                               max_workers=max_workers or parallel.default_workers(client)):
+        result = {'bucket': record['bucket'], 'namespace': record.get('namespace'), 'status': status, 'error': None}
+        if error is not None:
+            result.update(status='failed', error=getattr(error, 'message', None) or str(error))
+            log.warning("Importing the ACL of bucket '{0}' failed: {1}".format(record['bucket'], result['error']))
+        yield result
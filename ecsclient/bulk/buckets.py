@@ -0,0 +1,217 @@
+# Standard lib imports
+import collections
+import csv
+import io
+import json
+import logging
+import os
+import time
+
+# Third party imports
+import six
+
+# Project level imports
+from ecsclient.bulk.errors import already_exists
+from ecsclient.common import parallel
+from ecsclient.common.exceptions import ECSClientException
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+log = logging.getLogger(__name__)
+
+# CSV columns holding JSON documents, and columns converted to other types
+_CSV_JSON_COLUMNS = ('search_metadata', 'user_acl', 'group_acl', 'customgroup_acl')
+_CSV_BOOLEAN_COLUMNS = ('filesystem_enabled', 'stale_allowed', 'encryption_enabled')
+_CSV_INTEGER_COLUMNS = ('block_size', 'notification_size', 'retention_period')
+
+
+def _from_csv_row(row):
+    """
+    Turn a flat CSV row into a bucket spec. Quota, retention and ACL fields
+    are plain columns, and every ``metadata.<key>`` column is a metadata entry
+    """
+    spec = {'metadata': {}}
+    for column, value in row.items():
+        if value is None or value == '':
+            continue
+        if column in _CSV_JSON_COLUMNS:
+            value = json.loads(value)
+        elif column in _CSV_BOOLEAN_COLUMNS:
+            value = value.strip().lower() in ('1', 'true', 'yes')
+        elif column in _CSV_INTEGER_COLUMNS:
+            value = int(value)
+
+        if column.startswith('metadata.'):
+            spec['metadata'][column[len('metadata.'):]] = value
+        elif column in ('block_size', 'notification_size'):
+            spec.setdefault('quota', {})[column] = value
+        elif column == 'retention_period':
+            spec['retention'] = value
+        elif column in ('default_group', 'user_acl', 'group_acl', 'customgroup_acl'):
+            spec.setdefault('acl', {})[column] = value
+        else:
+            spec[column] = value
+    return spec
+
+
+def read_document(path):
+    """
+    Parse a JSON or YAML (requires PyYAML) document, chosen from the file
+    extension
+
+    :param path: Path to the document
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in ('.json', '.yaml', '.yml'):
+        raise ECSClientException("Unsupported document format '{0}'".format(extension))
+    if extension != '.json' and yaml is None:
+        raise ECSClientException("YAML documents require the 'PyYAML' package")
+
+    with open(path, 'r') as f:
+        return json.load(f) if extension == '.json' else yaml.safe_load(f)
+
+
+def load_manifest(path):
+    """
+    Read a manifest of bucket specs. The format is chosen from the file
+    extension: .json (a list, or a dict with a ``buckets`` list), .yaml or
+    .yml (same layout, requires PyYAML) or .csv (one bucket per row).
+
+    Every bucket spec is a dict with the keys:
+
+    - name: The bucket name
+    - namespace: The namespace of the bucket (optional)
+    - replication_group, filesystem_enabled, head_type, stale_allowed,
+      encryption_enabled, search_metadata: Passed to Bucket.create (optional)
+    - quota: Dict with the block_size and notification_size in GB (optional)
+    - retention: Retention period in seconds (optional)
+    - acl: Dict with the default_group, user_acl, group_acl and
+      customgroup_acl arguments of Bucket.set_acl (optional)
+    - owner: The new bucket owner (optional)
+    - metadata: Dict of head metadata keys and values (optional)
+
+    In CSV manifests the quota and ACL fields are columns of their own
+    (block_size, notification_size, retention_period, default_group,
+    user_acl, ...), list and dict values are JSON documents, and metadata
+    entries are ``metadata.<key>`` columns.
+
+    :param path: Path to the manifest
+    :return: The list of bucket specs
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        # The Python 2 csv module only reads bytes
+        with (open(path, 'rb') if six.PY2 else io.open(path, 'r', newline='')) as f:
+            return [_from_csv_row(row) for row in csv.DictReader(f)]
+
+    manifest = read_document(path)
+    if isinstance(manifest, dict):
+        manifest = manifest.get('buckets', [])
+    return manifest
+
+
+def _steps(client, spec):
+    """
+    Yield the (name, callable) pairs configuring a bucket, in order
+    """
+    name, namespace = spec['name'], spec.get('namespace')
+    bucket = client.bucket
+
+    if spec.get('quota'):
+        quota = spec['quota']
+        yield 'quota', lambda: bucket.set_quota(name, quota['block_size'], quota['notification_size'],
+                                                namespace=namespace)
+    if spec.get('retention') is not None:
+        yield 'retention', lambda: bucket.set_retention(name, namespace, spec['retention'])
+    if spec.get('acl'):
+        yield 'acl', lambda: bucket.set_acl(name, namespace=namespace, **spec['acl'])
+    if spec.get('owner'):
+        yield 'owner', lambda: bucket.set_owner(name, spec['owner'], namespace=namespace)
+    for key, value in sorted((spec.get('metadata') or {}).items()):
+        yield 'metadata:{0}'.format(key), lambda key=key, value=value: bucket.set_metadata(
+            name, key, value, spec.get('head_type') or 'S3', namespace=namespace)
+
+
+def _provision(client, spec):
+    name, namespace = spec['name'], spec.get('namespace')
+    steps = collections.OrderedDict()
+    errors = {}
+
+    try:
+        client.bucket.create(name,
+                             replication_group=spec.get('replication_group', ''),
+                             filesystem_enabled=spec.get('filesystem_enabled', False),
+                             head_type=spec.get('head_type'),
+                             namespace=namespace,
+                             stale_allowed=spec.get('stale_allowed'),
+                             metadata=spec.get('search_metadata'),
+                             encryption_enabled=spec.get('encryption_enabled', False))
+        steps['create'] = 'created'
+    except Exception as e:
+        if already_exists(e):
+            steps['create'] = 'exists'
+        else:
+            steps['create'] = 'failed'
+            errors['create'] = getattr(e, 'message', None) or str(e)
+            # Nothing to configure without a bucket
+            for step, _ in _steps(client, spec):
+                steps[step] = 'skipped'
+            return steps, errors
+
+    for step, call in _steps(client, spec):
+        try:
+            call()
+            steps[step] = 'set'
+        except Exception as e:
+            steps[step] = 'failed'
+            errors[step] = getattr(e, 'message', None) or str(e)
+    return steps, errors
+
+
+def provision_buckets(client, buckets, max_workers=None):
+    """
+    Create and configure buckets in bulk. Each bucket is created, then its
+    quota, retention, ACL, owner and metadata are set, in that order and
+    only for the fields present in its spec (see load_manifest()). Buckets
+    are provisioned concurrently. A bucket that already exists is
+    configured as if it had just been created. When creating a bucket
+    fails its other steps are skipped, and when another step fails the
+    remaining ones still run. No failure stops the batch. Every metadata
+    key is its own step, named ``metadata:<key>``.
+
+    For every bucket a result dict is yielded, in input order:
+
+    {
+        'name': 'bucket1',
+        'namespace': 'namespace1',
+        'status': 'created',  # or 'exists', 'failed'
+        'steps': OrderedDict([('create', 'created'), ('quota', 'set'), ('owner', 'failed')]),
+        'errors': {'owner': 'Resource not found'},
+        'elapsed': 0.42
+    }
+
+    :param client: An ECS client instance
+    :param buckets: Iterable of bucket specs, ie from load_manifest()
+    :param max_workers: Maximum number of buckets provisioned concurrently.
+    Defaults to the client concurrency limit (optional)
+    """
+    def provision(spec):
+        started = time.time()
+        steps, errors = _provision(client, spec)
+        if errors:
+            log.warning("Provisioning of bucket '{0}' failed at {1}".format(spec['name'], ', '.join(errors)))
+        return {'name': spec['name'],
+                'namespace': spec.get('namespace'),
+                'status': 'failed' if errors else steps['create'],
+                'steps': steps,
+                'errors': errors,
+                'elapsed': time.time() - started}
+
+    for _, result, error in parallel.imap(provision, buckets,
+                                          max_workers=max_workers or parallel.default_workers(client)):
+        if error is not None:
+            raise error
+        yield result
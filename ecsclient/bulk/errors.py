@@ -0,0 +1,44 @@
+# Project level imports
+from ecsclient.common import error_codes
+from ecsclient.common.exceptions import ECSClientException
+
+# Generic and bucket specific codes
+ALREADY_EXISTS = (error_codes.RESOURCE_ALREADY_EXISTS, error_codes.BUCKET_ALREADY_EXISTS)
+BEING_REFERENCED = error_codes.RESOURCE_BEING_REFERENCED
+NOT_FOUND = (error_codes.REQUEST_PARAMETER_NOT_FOUND, error_codes.RESOURCE_NOT_FOUND)
+
+
+def _code(error):
+    if not isinstance(error, ECSClientException) or error.ecs_code is None:
+        return None
+    return str(error.ecs_code)
+
+
+def already_exists(error):
+    """
+    Returns True if the error says the resource already exists
+
+    :param error: The exception raised by the API call
+    """
+    if _code(error) in ALREADY_EXISTS:
+        return True
+    return isinstance(error, ECSClientException) and 'already exists' in str(error.message).lower()
+
+
+def being_referenced(error):
+    """
+    Returns True if the error says the resource is still referenced by
+    another one, which is transient while that one is being deleted
+
+    :param error: The exception raised by the API call
+    """
+    return _code(error) == BEING_REFERENCED
+
+
+def not_found(error):
+    """
+    Returns True if the error says the resource does not exist
+
+    :param error: The exception raised by the API call
+    """
+    return _code(error) in NOT_FOUND or getattr(error, 'http_status', None) == 404
@@ -0,0 +1,97 @@
+# Standard lib imports
+import logging
+
+# Third party imports
+import six
+
+# Project level imports
+from ecsclient.common import parallel
+
+log = logging.getLogger(__name__)
+
+FACETS = ('info', 'lock', 'retention', 'quota', 'metadata')
+
+
+def _fetch(client, bucket, namespace, facet):
+    name = bucket['name']
+    if facet == 'info':
+        return client.bucket.get(name, namespace=namespace)
+    elif facet == 'lock':
+        return client.bucket.get_lock(name, namespace=namespace)
+    elif facet == 'retention':
+        return client.bucket.get_retention(name, namespace=namespace)
+    elif facet == 'quota':
+        return client.bucket.get_quota(name, namespace=namespace)
+    elif facet == 'metadata':
+        return client.bucket.get_metadata(name, bucket.get('api_type') or 'S3', namespace=namespace)
+    raise ValueError("Unknown bucket facet '{0}'".format(facet))
+
+
+def hydrate_buckets(client, buckets, facets=FACETS, namespace=None, cache=None, max_workers=None):
+    """
+    Add details to bucket list results. For every bucket, each requested
+    facet is fetched with the matching Bucket method:
+
+    - info: Bucket.get
+    - lock: Bucket.get_lock
+    - retention: Bucket.get_retention
+    - quota: Bucket.get_quota
+    - metadata: Bucket.get_metadata, for the bucket's api_type head
+
+    All the facets of all the buckets are fetched concurrently, through the
+    client's concurrency and rate limits, and a copy of every bucket record
+    is yielded in input order with each facet response under the facet name.
+    Facets that could not be fetched are left out, and their errors are
+    under the ``errors`` key.
+
+    :param client: An ECS client instance
+    :param buckets: Iterable of bucket records from Bucket.list, or of bucket names
+    :param facets: The facets to fetch
+    :param namespace: Namespace of the buckets whose record does not name
+    one (optional)
+    :param cache: DiskCache of facets. Facets fetched less than its TTL ago
+    are not fetched again (optional)
+    :param max_workers: Maximum number of concurrent fetches. Defaults to the
+    client concurrency limit (optional)
+    """
+    for facet in facets:
+        if facet not in FACETS:
+            raise ValueError("Unknown bucket facet '{0}'".format(facet))
+
+    def tasks():
+        for index, bucket in enumerate(buckets):
+            if isinstance(bucket, six.string_types):
+                bucket = {'name': bucket}
+            for facet in facets:
+                yield index, bucket, facet
+
+    def fetch(task):
+        _, bucket, facet = task
+        bucket_namespace = bucket.get('namespace') or namespace
+        key = 'bucket/{0}/{1}/{2}'.format(bucket_namespace, bucket['name'], facet)
+        value = cache.get(key) if cache is not None else None
+        if value is None:
+            value = _fetch(client, bucket, bucket_namespace, facet)
+            if cache is not None and value is not None:
+                cache.set(key, value)
+        return value
+
+    record, current = None, None
+    try:
+        for (index, bucket, facet), value, error in parallel.imap(
+                fetch, tasks(), max_workers=max_workers or parallel.default_workers(client)):
+            if index != current:
+                if record is not None:
+                    yield record
+                record, current = dict(bucket, errors={}), index
+            if error is not None:
+                record['errors'][facet] = getattr(error, 'message', None) or str(error)
+                log.warning("Fetching the {0} of bucket '{1}' failed: {2}".format(
+                    facet, bucket['name'], record['errors'][facet]))
+            else:
+                record[facet] = value
+        if record is not None:
+            yield record
+    finally:
+        if cache is not None:
+            cache.save()
@@ -0,0 +1,89 @@
+# Standard lib imports
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Journal(object):
+    """
+    Append-only JSON-lines log of the items processed by a bulk operation,
+    one record per item and attempt. It is both the structured result log
+    of the run and its checkpoint: when a run is interrupted, opening the
+    same file again tells which items are already done so they can be
+    skipped. The last record of an item wins.
+    """
+
+    def __init__(self, path):
+        """
+        Create a new Journal instance, loading the records already in the file
+
+        :param path: Path to the journal file. Created if missing
+        """
+        self.path = path
+        self._records = {}
+        self._lock = threading.Lock()
+        if os.path.isfile(path):
+            self._load()
+        self._file = open(path, 'a')
+
+    def _load(self):
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Truncated by an interruption while writing
+                    log.warning("Ignoring corrupt line in journal '{0}'".format(self.path))
+                    continue
+                self._records[record['key']] = record
+        log.debug("Loaded {0} records from journal '{1}'".format(len(self._records), self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, key):
+        """
+        :param key: The item key
+        :return: The last record of the item, or None
+        """
+        return self._records.get(key)
+
+    def done(self, key):
+        """
+        :param key: The item key
+        :return: True if the item was processed successfully
+        """
+        record = self._records.get(key)
+        return record is not None and record['status'] != 'failed'
+
+    def write(self, key, status, **fields):
+        """
+        Append a record and flush it to disk
+
+        :param key: The item key
+        :param status: The outcome of the item. 'failed' items are retried
+        on the next run
+        :param fields: Additional JSON serializable fields
+        :return: The record
+        """
+        record = dict(fields, key=key, status=status, time=time.time())
+        line = json.dumps(record, sort_keys=True)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self._records[key] = record
+        return record
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,39 @@
+# Standard lib imports
+import logging
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def iter_buckets(client, namespace, page_size=DEFAULT_PAGE_SIZE, typed=False):
+    """
+    Yield every bucket of a namespace, following the list pagination markers
+    so that only one page is held in memory at a time
+
+    :param client: An ECS client instance
+    :param namespace: The namespace whose buckets are listed
+    :param page_size: Number of buckets requested per call
+    :param typed: Yield compact BucketRecord mappings rather than dicts
+    """
+    marker = ''
+    while True:
+        page = client.bucket.list(namespace, marker=marker, limit=page_size, typed=typed) or {}
+        for bucket in page.get('object_bucket', []):
+            yield bucket
+        marker = page.get('NextMarker')
+        if not marker or not page.get('object_bucket'):
+            return
+
+
+def iter_object_users(client, namespace=None, typed=False):
+    """
+    Yield the {'userid': ..., 'namespace': ...} records of the object users
+    of a namespace, or of every namespace
+
+    :param client: An ECS client instance
+    :param namespace: The namespace whose users are listed (optional)
+    :param typed: Yield compact ObjectUserRecord mappings rather than dicts
+    """
+    for user in (client.object_user.list(namespace, typed=typed) or {}).get('blobuser', []):
+        yield user
@@ -0,0 +1,133 @@
+# Standard lib imports
+import logging
+import time
+
+# Project level imports
+from ecsclient.bulk.errors import already_exists
+from ecsclient.bulk.journal import Journal
+from ecsclient.common import parallel
+
+log = logging.getLogger(__name__)
+
+
+def _user_key(spec):
+    return '{0}/{1}'.format(spec['namespace'], spec['user_id'])
+
+
+def _provision(client, spec, result):
+    """
+    Run the create -> secret key -> CAS secret chain for one user, recording
+    the outcome of every step in the result. Stops at the first failure.
+    """
+    user_id, namespace = spec['user_id'], spec['namespace']
+    steps = result['steps']
+
+    result['failed_step'] = 'user'
+    try:
+        client.object_user.create(user_id, namespace, tags=spec.get('tags'))
+        steps['user'] = 'created'
+    except Exception as e:
+        if not already_exists(e):
+            raise
+        steps['user'] = 'exists'
+
+    if spec.get('secret_key') is not False:
+        result['failed_step'] = 'secret_key'
+        secret = None
+        if steps['user'] == 'exists':
+            # Do not add a second key to a user provisioned by an earlier run
+            secret = client.secret_key.get(user_id, namespace).get('secret_key_1')
+        if secret:
+            steps['secret_key'] = 'exists'
+        else:
+            resp = client.secret_key.create(user_id, namespace, secret_key=spec.get('secret_key'))
+            secret = (resp or {}).get('secret_key') or spec.get('secret_key')
+            steps['secret_key'] = 'created'
+        result['secret_key'] = secret
+
+    if spec.get('cas_secret'):
+        result['failed_step'] = 'cas_secret'
+        client.cas.set_cas_secret(user_id, namespace, spec['cas_secret'])
+        steps['cas_secret'] = 'set'
+
+    result['failed_step'] = None
+
+
+def provision_object_users(client, users, checkpoint=None, max_workers=None):
+    """
+    Create object users in bulk. For every user, the user is created, then
+    given a secret key, then optionally a CAS secret. Users are provisioned
+    concurrently, each user's steps in order. A user or secret key that
+    already exists counts as a success, so a batch can safely be run again.
+
+    Each user is described by a dict with the keys:
+
+    - user_id: The user to create
+    - namespace: The namespace of the user
+    - tags: A list of tags to assign to the user (optional)
+    - secret_key: The secret key to set. Generated by ECS if not provided,
+      and not created at all if False (optional)
+    - cas_secret: The CAS secret to set (optional)
+
+    For every user a result dict is yielded, in input order:
+
+    {
+        'user_id': 'user1',
+        'namespace': 'namespace1',
+        'status': 'created',  # or 'exists', 'skipped', 'failed'
+        'steps': {'user': 'created', 'secret_key': 'created'},
+        'secret_key': '3tW4A5G7QaAGVtsGLVL8uDy73S2A6LrvkPTDNdrk',
+        'failed_step': None,
+        'error': None,
+        'elapsed': 0.21
+    }
+
+    :param client: An ECS client instance
+    :param users: Iterable of user dicts
+    :param checkpoint: Path to a journal file. Every result is appended to
+    it, without the secrets, and users already provisioned by a previous
+    run with the same file are skipped (optional)
+    :param max_workers: Maximum number of users provisioned concurrently.
+    Defaults to the client concurrency limit (optional)
+    """
+    journal = Journal(checkpoint) if checkpoint else None
+
+    def provision(spec):
+        key = _user_key(spec)
+        result = {'user_id': spec['user_id'],
+                  'namespace': spec['namespace'],
+                  'status': None,
+                  'steps': {},
+                  'secret_key': None,
+                  'failed_step': None,
+                  'error': None,
+                  'elapsed': None}
+        if journal is not None and journal.done(key):
+            result.update(status='skipped', steps=journal.get(key)['steps'])
+            return result
+
+        started = time.time()
+        try:
+            _provision(client, spec, result)
+            result['status'] = result['steps']['user']
+        except Exception as e:
+            error = getattr(e, 'message', None) or str(e)
+            log.warning("Provisioning of user '{0}' failed at step '{1}': {2}".format(
+                spec['user_id'], result['failed_step'], error))
+            result.update(status='failed', error=error)
+        result['elapsed'] = time.time() - started
+
+        if journal is not None:
+            journal.write(key, result['status'],
+                          **dict((k, v) for k, v in result.items() if k not in ('status', 'secret_key')))
+        return result
+
+    try:
+        for _, result, error in parallel.imap(provision, users,
+                                              max_workers=max_workers or parallel.default_workers(client)):
+            if error is not None:
+                raise error
+            yield result
+    finally:
+        if journal is not None:
+            journal.close()
@@ -0,0 +1,149 @@
+# Standard lib imports
+import logging
+
+# Project level imports
+from ecsclient.bulk.listing import iter_buckets
+from ecsclient.common import parallel
+
+log = logging.getLogger(__name__)
+
+# A quota of -1 means that no quota is defined
+NO_QUOTA = -1
+
+
+def _percent(used, limit):
+    if used is None or limit is None or limit == NO_QUOTA or limit <= 0:
+        return None
+    return round(100.0 * used / limit, 2)
+
+
+def _fetch_namespace(client, namespace):
+    quota = client.namespace.get_namespace_quota(namespace) or {}
+    billing = client.billing.get_namespace_billing_info(namespace) or {}
+    return {'block_size': quota.get('blockSize'),
+            'notification_size': quota.get('notificationSize'),
+            'used_gb': billing.get('total_size_in_gb'),
+            'sample_time': billing.get('sample_time')}
+
+
+def _fetch_bucket(client, namespace, bucket):
+    if 'block_size' in bucket:
+        # The bucket list records already hold the quota
+        quota = {'blockSize': bucket['block_size'], 'notificationSize': bucket.get('notification_size')}
+    else:
+        quota = client.bucket.get_quota(bucket['name'], namespace=namespace) or {}
+    billing = client.billing.get_bucket_billing_info(bucket['name'], namespace) or {}
+    return {'block_size': quota.get('blockSize'),
+            'notification_size': quota.get('notificationSize'),
+            'used_gb': billing.get('total_size_in_gb'),
+            'sample_time': billing.get('sample_time')}
+
+
+def _entities(client, namespaces, include_buckets):
+    for namespace in namespaces:
+        yield 'namespace', namespace, namespace, None
+        if include_buckets:
+            for bucket in iter_buckets(client, namespace):
+                yield 'bucket', namespace, bucket['name'], bucket
+
+
+def utilization(client, namespaces, cache=None, include_buckets=True, max_workers=None):
+    """
+    Fetch the quota and the billed size of namespaces and their buckets
+    concurrently and join them. Quotas and sizes are in GB.
+
+    A dict is yielded for every namespace and bucket:
+
+    {
+        'kind': 'bucket',  # or 'namespace'
+        'namespace': 'namespace1',
+        'name': 'bucket1',
+        'used_gb': 95.0,
+        'block_size': 100,
+        'notification_size': 80,
+        'block_used_pct': 95.0,  # None without a hard quota
+        'notification_used_pct': 118.75,  # None without a notification quota
+        'sample_time': '2015-06-18T22:20:01Z'
+    }
+
+    :param client: An ECS client instance
+    :param namespaces: Iterable of namespace names
+    :param cache: DiskCache keeping the fetched quotas and sizes between
+    runs. Only missing or stale entities are fetched (optional)
+    :param include_buckets: Also report the buckets of the namespaces
+    :param max_workers: Maximum number of concurrent fetches. Defaults to the
+    client concurrency limit (optional)
+    """
+    def fetch(entity):
+        kind, namespace, name, bucket = entity
+        key = '{0}/{1}/{2}'.format(kind, namespace, name)
+        values = cache.get(key) if cache is not None else None
+        if values is None:
+            if kind == 'namespace':
+                values = _fetch_namespace(client, namespace)
+            else:
+                values = _fetch_bucket(client, namespace, bucket)
+            if cache is not None:
+                cache.set(key, values)
+        return values
+
+    for (kind, namespace, name, _), values, error in parallel.imap(
+            fetch, _entities(client, namespaces, include_buckets),
+            max_workers=max_workers or parallel.default_workers(client)):
+        if error is not None:
+            raise error
+        yield {'kind': kind,
+               'namespace': namespace,
+               'name': name,
+               'used_gb': values['used_gb'],
+               'block_size': values['block_size'],
+               'notification_size': values['notification_size'],
+               'block_used_pct': _percent(values['used_gb'], values['block_size']),
+               'notification_used_pct': _percent(values['used_gb'], values['notification_size']),
+               'sample_time': values['sample_time']}
+
+    if cache is not None:
+        cache.save()
+
+
+def worst_offenders(records, limit=20, threshold=None):
+    """
+    Sort utilization records by how close they are to their quota. Records
+    are ranked by the percentage of their hard quota used, then of their
+    notification quota. Records without any quota are left out.
+
+    :param records: Records from utilization()
+    :param limit: Maximum number of records returned (optional)
+    :param threshold: Only keep records using at least this percentage of
+    either quota (optional)
+    :return: The sorted list of records
+    """
+    def rank(record):
+        return (record['block_used_pct'] if record['block_used_pct'] is not None else -1,
+                record['notification_used_pct'] if record['notification_used_pct'] is not None else -1)
+
+    ranked = [r for r in records if r['block_used_pct'] is not None or r['notification_used_pct'] is not None]
+    if threshold is not None:
+        ranked = [r for r in ranked if max(rank(r)) >= threshold]
+    ranked.sort(key=rank, reverse=True)
+    return ranked[:limit] if limit else ranked
+
+
+def format_report(records):
+    """
+    Render utilization records as a text table
+
+    :param records: Records from utilization() or worst_offenders()
+    """
+    lines = ['{0:<9} {1:<40} {2:>10} {3:>10} {4:>8} {5:>10} {6:>8}'.format(
+        'KIND', 'NAME', 'USED GB', 'QUOTA GB', 'USED %', 'NOTIFY GB', 'NOTIFY %')]
+    for r in records:
+        name = r['name'] if r['kind'] == 'namespace' else '{0}/{1}'.format(r['namespace'], r['name'])
+        lines.append('{0:<9} {1:<40} {2:>10} {3:>10} {4:>8} {5:>10} {6:>8}'.format(
+            r['kind'], name,
+            r['used_gb'] if r['used_gb'] is not None else '-',
+            r['block_size'] if r['block_size'] not in (None, NO_QUOTA) else '-',
+            r['block_used_pct'] if r['block_used_pct'] is not None else '-',
+            r['notification_size'] if r['notification_size'] not in (None, NO_QUOTA) else '-',
+            r['notification_used_pct'] if r['notification_used_pct'] is not None else '-'))
+    return '\n'.join(lines)
@@ -0,0 +1,322 @@
+# Standard lib imports
+import collections
+import logging
+
+# Project level imports
+from ecsclient.bulk.buckets import read_document
+from ecsclient.bulk.errors import not_found
+from ecsclient.common import parallel
+
+log = logging.getLogger(__name__)
+
+# Namespace fields set at creation, and the subset that can be updated
+NAMESPACE_CREATE_FIELDS = ('default_object_project', 'default_data_services_vpool', 'default_bucket_block_size',
+                           'allowed_vpools_list', 'disallowed_vpools_list', 'namespace_admins',
+                           'external_group_admins', 'user_mapping', 'is_encryption_enabled', 'is_stale_allowed',
+                           'is_compliance_enabled')
+NAMESPACE_UPDATE_FIELDS = ('default_data_services_vpool', 'default_bucket_block_size', 'allowed_vpools_list',
+                           'disallowed_vpools_list', 'namespace_admins', 'external_group_admins', 'user_mapping',
+                           'is_encryption_enabled', 'is_stale_allowed')
+BUCKET_CREATE_FIELDS = ('replication_group', 'filesystem_enabled', 'head_type', 'stale_allowed',
+                        'encryption_enabled', 'search_metadata')
+
+# Fields compared as unordered lists
+_SET_FIELDS = ('allowed_vpools_list', 'disallowed_vpools_list')
+
+
+class Change(collections.namedtuple('Change', 'kind key action fields')):
+    """
+    A single mutation of the plan. ``kind`` is 'namespace' or 'bucket',
+    ``key`` the namespace name or a (namespace, bucket name) tuple,
+    ``action`` the operation to run and ``fields`` a dict of field names to
+    (current, desired) value pairs.
+    """
+    __slots__ = ()
+
+
+def load_state(path):
+    """
+    Read a desired state document (JSON or YAML) of the form:
+
+    namespaces:
+    - name: ns1
+      default_data_services_vpool: urn:storageos:ReplicationGroupInfo:...:global
+      namespace_admins: admin1,admin2
+      quota: {block_size: 1000, notification_size: 800}
+      retention_classes: {legal: 31536000}
+    buckets:
+    - name: bucket1
+      namespace: ns1
+      replication_group: urn:storageos:ReplicationGroupInfo:...:global
+      quota: {block_size: 100, notification_size: 80}
+      retention: 2592000
+      owner: user1
+
+    Namespaces accept the arguments of Namespace.create, and buckets the
+    create arguments of the bulk bucket manifests. Only the fields present
+    are managed: the reconciler never resets or deletes what the desired
+    state does not mention.
+
+    :param path: Path to the document
+    """
+    state = read_document(path) or {}
+    return {'namespaces': state.get('namespaces') or [],
+            'buckets': state.get('buckets') or []}
+
+
+def _get(call, *args, **kwargs):
+    try:
+        return call(*args, **kwargs)
+    except Exception as e:
+        if not_found(e):
+            return None
+        raise
+
+
+def _fetch_namespace(client, name):
+    info = _get(client.namespace.get, name)
+    if info is None:
+        return None
+
+    current = dict((f, info.get(f)) for f in NAMESPACE_CREATE_FIELDS)
+    quota = client.namespace.get_namespace_quota(name) or {}
+    current['quota'] = {'block_size': quota.get('blockSize'),
+                        'notification_size': quota.get('notificationSize')}
+    classes = client.namespace.get_retention_classes(name) or {}
+    current['retention_classes'] = dict((c['name'], c['period']) for c in classes.get('retention_class', []))
+    return current
+
+
+def _fetch_bucket(client, key):
+    # The bucket info holds the quota, retention and owner, one call is enough
+    info = _get(client.bucket.get, key[1], namespace=key[0])
+    if info is None:
+        return None
+
+    return {'quota': {'block_size': info.get('block_size'),
+                      'notification_size': info.get('notification_size')},
+            'retention': info.get('default_retention'),
+            'owner': info.get('owner')}
+
+
+def _bucket_key(spec):
+    return spec.get('namespace'), spec['name']
+
+
+def fetch_state(client, desired, max_workers=None):
+    """
+    Fetch, in parallel, the current state of the namespaces and buckets
+    named in the desired state
+
+    :param client: An ECS client instance
+    :param desired: The desired state, see load_state()
+    :param max_workers: Maximum number of concurrent fetches. Defaults to the
+    client concurrency limit (optional)
+    :return: Dict with 'namespaces' and 'buckets' dicts keyed like the
+    changes, holding the current state or None for missing entities
+    """
+    jobs = [('namespaces', spec['name']) for spec in desired['namespaces']]
+    jobs += [('buckets', _bucket_key(spec)) for spec in desired['buckets']]
+    fetchers = {'namespaces': _fetch_namespace, 'buckets': _fetch_bucket}
+
+    current = {'namespaces': {}, 'buckets': {}}
+    for (section, key), state, error in parallel.imap(lambda job: fetchers[job[0]](client, job[1]), jobs,
+                                                      max_workers=max_workers or parallel.default_workers(client)):
+        if error is not None:
+            raise error
+        current[section][key] = state
+    return current
+
+
+def _differs(field, current, desired):
+    if field in _SET_FIELDS:
+        return set(current or []) != set(desired or [])
+    if field == 'namespace_admins':
+        return (sorted(a.strip() for a in (current or '').split(',') if a.strip()) !=
+                sorted(a.strip() for a in (desired or '').split(',') if a.strip()))
+    return current != desired
+
+
+def _diff_fields(fields, current, desired):
+    return collections.OrderedDict(
+        (f, (current.get(f), desired[f])) for f in fields
+        if f in desired and _differs(f, current.get(f), desired[f]))
+
+
+def _plan_quota(kind, key, current, desired):
+    quota = desired.get('quota')
+    if not quota:
+        return []
+    current_quota = current.get('quota') or {}
+    fields = _diff_fields(('block_size', 'notification_size'), current_quota, quota)
+    if not fields:
+        return []
+    # The quota is always set as a whole
+    return [Change(kind, key, 'set_quota', collections.OrderedDict(
+        (f, (current_quota.get(f), quota[f])) for f in ('block_size', 'notification_size')))]
+
+
+def _plan_namespace(spec, current):
+    name = spec['name']
+    changes = []
+    if current is None:
+        changes.append(Change('namespace', name, 'create', _diff_fields(NAMESPACE_CREATE_FIELDS, {}, spec)))
+        current = {}
+    else:
+        fields = _diff_fields(NAMESPACE_UPDATE_FIELDS, current, spec)
+        if fields:
+            changes.append(Change('namespace', name, 'update', fields))
+
+    changes += _plan_quota('namespace', name, current, spec)
+
+    classes = current.get('retention_classes') or {}
+    for class_name, period in sorted((spec.get('retention_classes') or {}).items()):
+        if class_name not in classes:
+            changes.append(Change('namespace', name, 'create_retention_class', {class_name: (None, period)}))
+        elif classes[class_name] != period:
+            changes.append(Change('namespace', name, 'update_retention_class',
+                                  {class_name: (classes[class_name], period)}))
+    return changes
+
+
+def _plan_bucket(spec, current):
+    key = _bucket_key(spec)
+    changes = []
+    if current is None:
+        changes.append(Change('bucket', key, 'create', _diff_fields(BUCKET_CREATE_FIELDS, {}, spec)))
+        current = {}
+
+    changes += _plan_quota('bucket', key, current, spec)
+    if spec.get('retention') is not None and spec['retention'] != current.get('retention'):
+        changes.append(Change('bucket', key, 'set_retention', {'retention': (current.get('retention'),
+                                                                             spec['retention'])}))
+    if spec.get('owner') and spec['owner'] != current.get('owner'):
+        changes.append(Change('bucket', key, 'set_owner', {'owner': (current.get('owner'), spec['owner'])}))
+    return changes
+
+
+def plan(desired, current):
+    """
+    Compute the minimal list of changes turning the current state into the
+    desired one. Namespace changes come first, since buckets depend on them,
+    and the changes of an entity are in the order they must be applied.
+
+    :param desired: The desired state, see load_state()
+    :param current: The current state, see fetch_state()
+    :return: A list of Change
+    """
+    changes = []
+    for spec in desired['namespaces']:
+        changes += _plan_namespace(spec, current['namespaces'].get(spec['name']))
+    for spec in desired['buckets']:
+        changes += _plan_bucket(spec, current['buckets'].get(_bucket_key(spec)))
+    return changes
+
+
+def format_plan(changes):
+    """
+    Render a plan for humans, one line per change and field
+
+    :param changes: A list of Change
+    """
+    if not changes:
+        return 'No changes.'
+
+    lines = []
+    for change in changes:
+        name = change.key if change.kind == 'namespace' else '{0}/{1}'.format(*change.key)
+        symbol = '+' if change.action.startswith('create') else '~'
+        lines.append('{0} {1} {2}: {3}'.format(symbol, change.kind, name, change.action))
+        for field, (current, desired) in change.fields.items():
+            lines.append('      {0}: {1!r} -> {2!r}'.format(field, current, desired))
+    lines.append('{0} change(s).'.format(len(changes)))
+    return '\n'.join(lines)
+
+
+def _apply_namespace(client, change):
+    name, fields = change.key, change.fields
+    if change.action == 'create':
+        client.namespace.create(name, **dict((f, desired) for f, (_, desired) in fields.items()))
+    elif change.action == 'update':
+        kwargs = {}
+        for field, (current, desired) in fields.items():
+            if field in _SET_FIELDS:
+                kwargs['vpools_added_to_' + field] = sorted(set(desired or []) - set(current or []))
+                kwargs['vpools_removed_from_' + field] = sorted(set(current or []) - set(desired or []))
+            else:
+                kwargs[field] = desired
+        client.namespace.update(name, **kwargs)
+    elif change.action == 'set_quota':
+        client.namespace.update_namespace_quota(fields['block_size'][1], fields['notification_size'][1], name)
+    elif change.action == 'create_retention_class':
+        for class_name, (_, period) in fields.items():
+            client.namespace.create_retention_class(class_name, period, name)
+    elif change.action == 'update_retention_class':
+        for class_name, (_, period) in fields.items():
+            client.namespace.update_retention_class(class_name, period, name)
+
+
+def _apply_bucket(client, change):
+    (namespace, name), fields = change.key, change.fields
+    if change.action == 'create':
+        kwargs = dict((f, desired) for f, (_, desired) in fields.items())
+        kwargs['metadata'] = kwargs.pop('search_metadata', None)
+        client.bucket.create(name, namespace=namespace, **kwargs)
+    elif change.action == 'set_quota':
+        client.bucket.set_quota(name, fields['block_size'][1], fields['notification_size'][1], namespace=namespace)
+    elif change.action == 'set_retention':
+        client.bucket.set_retention(name, namespace, fields['retention'][1])
+    elif change.action == 'set_owner':
+        client.bucket.set_owner(name, fields['owner'][1], namespace=namespace)
+
+
+def apply(client, changes, max_workers=None):
+    """
+    Apply a plan. Entities are reconciled concurrently, namespaces before
+    buckets, and the changes of an entity in order. When a change fails,
+    the later changes of the same entity are skipped.
+
+    A result dict is yielded for every change, in plan order:
+
+    {
+        'change': Change('bucket', ('ns1', 'bucket1'), 'set_owner', {'owner': ('user1', 'user2')}),
+        'status': 'applied',  # or 'failed', 'skipped'
+        'error': None
+    }
+
+    :param client: An ECS client instance
+    :param changes: The plan, see plan()
+    :param max_workers: Maximum number of entities reconciled concurrently.
+    Defaults to the client concurrency limit (optional)
+    """
+    appliers = {'namespace': _apply_namespace, 'bucket': _apply_bucket}
+    max_workers = max_workers or parallel.default_workers(client)
+
+    def reconcile(entity_changes):
+        results = []
+        failed = False
+        for change in entity_changes:
+            result = {'change': change, 'status': 'skipped', 'error': None}
+            if not failed:
+                try:
+                    appliers[change.kind](client, change)
+                    result['status'] = 'applied'
+                except Exception as e:
+                    failed = True
+                    result.update(status='failed', error=getattr(e, 'message', None) or str(e))
+                    log.warning("Applying {0} to {1} '{2}' failed: {3}".format(
+                        change.action, change.kind, change.key, result['error']))
+            results.append(result)
+        return results
+
+    for kind in ('namespace', 'bucket'):
+        entities = collections.OrderedDict()
+        for change in changes:
+            if change.kind == kind:
+                entities.setdefault(change.key, []).append(change)
+
+        for _, results, error in parallel.imap(reconcile, entities.values(), max_workers=max_workers):
+            if error is not None:
+                raise error
+            for result in results:
+                yield result
@@ -0,0 +1,143 @@
+# Standard lib imports
+import json
+import logging
+import os
+import threading
+import time
+
+# Project level imports
+from ecsclient.bulk.journal import Journal
+from ecsclient.bulk.listing import iter_object_users
+from ecsclient.common import parallel
+from ecsclient.common.concurrency import TokenBucket
+
+log = logging.getLogger(__name__)
+
+DEFAULT_EXPIRY_MINUTES = 60 * 24
+
+
+class JsonLinesSink(object):
+    """
+    Appends the new credentials to a JSON-lines file readable only by its
+    owner, flushing every line so that no key is lost if the run stops
+    """
+
+    def __init__(self, path):
+        """
+        Create a new JsonLinesSink instance
+
+        :param path: Path to the credentials file. Created if missing
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = os.fdopen(os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600), 'a')
+
+    def write(self, credentials):
+        line = json.dumps(credentials, sort_keys=True)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def _rotate(client, user_id, namespace, expiry_time):
+    keys = client.secret_key.get(user_id, namespace)
+    if keys.get('secret_key_1') and keys.get('secret_key_2'):
+        # The previous rotation is still within its dual-key window, creating
+        # a third key would fail
+        return 'in_window', None
+
+    has_key = bool(keys.get('secret_key_1') or keys.get('secret_key_2'))
+    resp = client.secret_key.create(user_id, namespace, expiry_time=expiry_time if has_key else None)
+    return 'rotated', resp
+
+
+def rotate_secret_keys(client, namespace, sink, users=None, expiry_time=DEFAULT_EXPIRY_MINUTES,
+                       checkpoint=None, max_workers=None, rate=None):
+    """
+    Rotate the S3 secret key of every object user of a namespace. A new key
+    is created for each user and the previous one expires after
+    ``expiry_time`` minutes, during which both keys are accepted. Users who
+    already hold two keys are still within the window of an earlier rotation
+    and are left alone, with the status 'in_window'.
+
+    Users are rotated concurrently. Each new key is written to the sink, and
+    then to the checkpoint, by the worker that created it, as soon as it is
+    created, so that no created key is lost when the run stops early. The
+    sink receives a dict with the keys user_id, namespace, secret_key,
+    key_timestamp and previous_key_expiry_mins. A result dict is yielded
+    for every user, in order:
+
+    {
+        'user_id': 'user1',
+        'namespace': 'namespace1',
+        'status': 'rotated',  # or 'in_window', 'skipped', 'failed'
+        'error': None,
+        'elapsed': 0.12
+    }
+
+    :param client: An ECS client instance
+    :param namespace: The namespace whose users are rotated
+    :param sink: Object with a ``write(credentials)`` method receiving the
+    new keys, ie a JsonLinesSink
+    :param users: Iterable of user ids to rotate. Defaults to every user of
+    the namespace (optional)
+    :param expiry_time: Minutes during which the previous key remains valid
+    :param checkpoint: Path to a journal file recording the progress, without
+    the secrets. Users rotated by a previous run with the same file are
+    skipped. Users that were in their window are checked again (optional)
+    :param max_workers: Maximum number of users rotated concurrently.
+    Defaults to the client concurrency limit (optional)
+    :param rate: Maximum number of users rotated per second (optional)
+    """
+    journal = Journal(checkpoint) if checkpoint else None
+    bucket = TokenBucket(rate) if rate else None
+    sink_lock = threading.Lock()
+    if users is None:
+        users = (user['userid'] for user in iter_object_users(client, namespace))
+
+    def rotate(user_id):
+        key = '{0}/{1}'.format(namespace, user_id)
+        result = {'user_id': user_id,
+                  'namespace': namespace,
+                  'status': 'skipped',
+                  'error': None,
+                  'elapsed': None}
+        if journal is not None and (journal.get(key) or {}).get('status') == 'rotated':
+            return result
+
+        if bucket is not None:
+            bucket.acquire()
+        started = time.time()
+        try:
+            result['status'], resp = _rotate(client, user_id, namespace, expiry_time)
+            if resp is not None:
+                with sink_lock:
+                    sink.write({'user_id': user_id,
+                                'namespace': namespace,
+                                'secret_key': resp.get('secret_key'),
+                                'key_timestamp': resp.get('key_timestamp'),
+                                'previous_key_expiry_mins': expiry_time})
+        except Exception as e:
+            result['status'], result['error'] = 'failed', getattr(e, 'message', None) or str(e)
+            log.warning("Rotation of the secret key of '{0}' failed: {1}".format(user_id, result['error']))
+        result['elapsed'] = time.time() - started
+        if journal is not None:
+            # Only 'rotated' users are skipped on resume: 'in_window' users
+            # are checked again once their window may have closed
+            journal.write(key, result['status'], user_id=user_id, namespace=namespace,
+                          error=result['error'], elapsed=result['elapsed'])
+        return result
+
+    try:
+        for user_id, result, error in parallel.imap(
+                rotate, users, max_workers=max_workers or parallel.default_workers(client)):
+            if error is not None:
+                raise error
+            yield result
+    finally:
+        if journal is not None:
+            journal.close()
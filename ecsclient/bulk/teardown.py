@@ -0,0 +1,195 @@
+# Standard lib imports
+import collections
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Project level imports
+from ecsclient.bulk.errors import being_referenced, not_found
+from ecsclient.bulk.listing import iter_buckets, iter_object_users
+from ecsclient.common import parallel
+from ecsclient.common.deadline import activate, current_deadline
+
+log = logging.getLogger(__name__)
+
+DEFAULT_RETRIES = 6
+DEFAULT_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+
+def plan_teardown(client, namespace, delete_users=True, delete_namespace=True):
+    """
+    Build the dependency graph of the deletions emptying a namespace. Nodes
+    are ('bucket', name), ('user', user_id) and ('namespace', name) tuples
+    mapped to the set of nodes that must be deleted before them: a user
+    waits for the buckets it owns and the namespace waits for everything.
+
+    :param client: An ECS client instance
+    :param namespace: The namespace to tear down
+    :param delete_users: Delete the object users of the namespace
+    :param delete_namespace: Delete the namespace itself
+    :return: A dict of node to set of nodes
+    """
+    graph = collections.OrderedDict()
+    owned = collections.defaultdict(set)
+    for bucket in iter_buckets(client, namespace):
+        node = ('bucket', bucket['name'])
+        graph[node] = set()
+        owned[bucket.get('owner')].add(node)
+
+    if delete_users:
+        for user in iter_object_users(client, namespace):
+            graph[('user', user['userid'])] = set(owned.get(user['userid'], ()))
+
+    if delete_namespace:
+        graph[('namespace', namespace)] = set(graph)
+    return graph
+
+
+def _run_graph(func, graph, max_workers, deadline):
+    """
+    Call ``func`` on every node of the graph once the nodes it depends on
+    have succeeded, running independent nodes concurrently. Yields
+    ``(node, result, error)`` tuples as nodes complete. Nodes depending on a
+    failed node, and nodes not started before the deadline expired, are not
+    run and are yielded with 'skipped' as the result.
+    """
+    remaining = dict((node, len(deps)) for node, deps in graph.items())
+    blocked = set()
+    dependents = collections.defaultdict(list)
+    for node, deps in graph.items():
+        for dep in deps:
+            dependents[dep].append(node)
+
+    def call(node):
+        with activate(deadline):
+            return func(node)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+
+        def resolve(node, succeeded):
+            # Returns the dependents that can no longer run
+            skipped = []
+            for dependent in dependents[node]:
+                remaining[dependent] -= 1
+                if not succeeded:
+                    blocked.add(dependent)
+                if remaining[dependent] == 0:
+                    if dependent in blocked or (deadline is not None and deadline.expired):
+                        skipped.append(dependent)
+                    else:
+                        futures[executor.submit(call, dependent)] = dependent
+            return skipped
+
+        for node, count in remaining.items():
+            if count == 0:
+                futures[executor.submit(call, node)] = node
+
+        while futures:
+            done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+            for future in done:
+                node = futures.pop(future)
+                try:
+                    result, error = future.result(), None
+                except Exception as e:
+                    result, error = None, e
+                yield node, result, error
+
+                skipped = collections.deque(resolve(node, error is None))
+                while skipped:
+                    node = skipped.popleft()
+                    yield node, 'skipped', None
+                    skipped.extend(resolve(node, False))
+
+    if deadline is not None:
+        deadline.check()
+
+
+def _delete(client, namespace, node):
+    kind, name = node
+    if kind == 'bucket':
+        client.bucket.delete(name, namespace=namespace)
+    elif kind == 'user':
+        client.object_user.delete(name, namespace=namespace)
+    else:
+        client.namespace.delete(name)
+
+
+def teardown(client, namespace, graph=None, max_workers=None, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """
+    Delete the buckets, then the object users, then the namespace itself.
+    Deletions only wait for the ones they depend on (see plan_teardown()),
+    so independent deletions run concurrently and the total time grows with
+    the depth of the graph rather than the number of resources.
+
+    "Resource is being referenced" errors (code 1020) are transient while
+    the dependencies are being removed, and are retried with exponential
+    backoff. Resources already gone count as deleted. When a deletion fails,
+    whatever depends on it is skipped.
+
+    A result dict is yielded as each deletion completes:
+
+    {
+        'kind': 'bucket',  # or 'user', 'namespace'
+        'name': 'bucket1',
+        'status': 'deleted',  # or 'absent', 'failed', 'skipped'
+        'attempts': 1,
+        'error': None,
+        'done': 12,
+        'total': 130
+    }
+
+    :param client: An ECS client instance
+    :param namespace: The namespace to tear down
+    :param graph: The deletions to run, from plan_teardown(). Defaults to
+    tearing the whole namespace down (optional)
+    :param max_workers: Maximum number of concurrent deletions. Defaults to
+    the client concurrency limit (optional)
+    :param retries: Maximum number of retries of a referenced resource
+    :param backoff: Seconds to wait before the first retry, doubled after
+    every attempt
+    """
+    if graph is None:
+        graph = plan_teardown(client, namespace)
+    attempts = {}
+
+    def delete(node):
+        attempt = 0
+        while True:
+            attempt += 1
+            attempts[node] = attempt
+            try:
+                _delete(client, namespace, node)
+                return 'deleted'
+            except Exception as e:
+                if not_found(e):
+                    return 'absent'
+                if not being_referenced(e) or attempt > retries:
+                    raise
+                delay = min(backoff * 2 ** (attempt - 1), MAX_BACKOFF)
+                deadline = current_deadline()
+                if deadline is not None and deadline.remaining() is not None:
+                    # Waking up after the deadline would only fail the next attempt later
+                    delay = min(delay, deadline.remaining())
+                log.info("{0} '{1}' is still referenced, retrying in {2}s".format(node[0], node[1], delay))
+                time.sleep(delay)
+
+    total = len(graph)
+    done = 0
+    for node, status, error in _run_graph(delete, graph, max_workers or parallel.default_workers(client),
+                                          current_deadline()):
+        done += 1
+        result = {'kind': node[0],
+                  'name': node[1],
+                  'status': status,
+                  'attempts': attempts.get(node, 0),
+                  'error': None,
+                  'done': done,
+                  'total': total}
+        if error is not None:
+            result.update(status='failed', error=getattr(error, 'message', None) or str(error))
+            log.warning("Deleting {0} '{1}' failed: {2}".format(node[0], node[1], result['error']))
+        log.info("Teardown of namespace '{0}': {1}/{2}, {3} '{4}' {5}".format(
+            namespace, done, total, node[0], node[1], result['status']))
+        yield result
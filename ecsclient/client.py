@@ -1,8 +1,10 @@
+import contextlib
 import logging
 
 import ecsclient.v2.client as v2_client
 import ecsclient.v3.client as v3_client
 import ecsclient.v4.client as v4_client
+from ecsclient.registry import ClientRegistry
 
 _logger = logging.getLogger(__name__)
 
@@ -32,3 +34,22 @@ def Client(version=None, *args, **kwargs):
         raise RuntimeError(msg)
 
     return client_class(*args, **kwargs)
+
+
+registry = ClientRegistry(Client)
+
+
+@contextlib.contextmanager
+def shared_client(version=None, **kwargs):
+    """Context manager returning a process-wide shared client.
+
+    Clients created with the same arguments are the same logged-in
+    instance, see :py:class:`~ecsclient.registry.ClientRegistry`.
+
+     :param string version: The required version of the ECS Management API.
+    """
+    client = registry.acquire(version, **kwargs)
+    try:
+        yield client
+    finally:
+        registry.release(client)
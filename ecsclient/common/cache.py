@@ -0,0 +1,70 @@
+# Standard lib imports
+import json
+import logging
+import os
+import threading
+import time
+
+# Project level imports
+from ecsclient.common.util import atomic_write
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TTL = 900
+
+
+class DiskCache(object):
+    """
+    Values fetched from the API kept in a JSON file between runs, each with
+    the time it was fetched. Entries older than ``ttl`` seconds are stale
+    and are not returned, so a run only refetches what has gone stale. The
+    file is loaded once and written atomically by save().
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        """
+        Create a new DiskCache instance
+
+        :param path: Path to the cache file. Created by save() if missing
+        :param ttl: Seconds during which an entry is fresh
+        """
+        self.path = path
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r') as f:
+                    self._entries = json.load(f)
+            except ValueError:
+                log.warning("Ignoring corrupt cache '{0}'".format(path))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        :param key: The entry key
+        :return: The value, or None if it is missing or stale
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry['fetched_at'] + self.ttl <= time.time():
+            return None
+        return entry['value']
+
+    def set(self, key, value):
+        """
+        :param key: The entry key
+        :param value: A JSON serializable value
+        """
+        with self._lock:
+            self._entries[key] = {'value': value, 'fetched_at': time.time()}
+
+    def save(self):
+        """
+        Write the entries to disk, dropping the stale ones
+        """
+        now = time.time()
+        with self._lock:
+            self._entries = dict((k, e) for k, e in self._entries.items() if e['fetched_at'] + self.ttl > now)
+            atomic_write(self.path, json.dumps(self._entries))
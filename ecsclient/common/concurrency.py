@@ -0,0 +1,150 @@
+# Standard lib imports
+import logging
+import threading
+import time
+
+# Project level imports
+from ecsclient.common.exceptions import ECSClientException
+
+log = logging.getLogger(__name__)
+
+# HTTP status codes ECS returns when the management service is overloaded
+OVERLOAD_STATUS_CODES = (429, 503)
+
+
+class AIMDLimiter(object):
+    """
+    Adaptive concurrency limiter using Additive Increase / Multiplicative
+    Decrease. The number of in-flight requests grows by one every time a
+    request completes successfully while the limit is being used, and it is
+    cut by ``backoff_ratio`` whenever a request is dropped (overload status
+    code, timeout, connection error or a latency above ``latency_threshold``).
+    """
+
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=64,
+                 backoff_ratio=0.9, latency_threshold=None):
+        """
+        Create a new AIMDLimiter instance
+
+        :param initial_limit: Number of concurrent requests allowed at start
+        :param min_limit: The limit will never go below this value
+        :param max_limit: The limit will never go above this value
+        :param backoff_ratio: Factor applied to the limit when a request is dropped
+        :param latency_threshold: Seconds after which a successful request is
+        considered a sign of overload (optional)
+        """
+        if not 0 < backoff_ratio < 1:
+            raise ECSClientException("'backoff_ratio' must be between 0 and 1")
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ECSClientException("Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_threshold = latency_threshold
+        self._limit = float(initial_limit)
+        self._inflight = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        """
+        The current number of concurrent requests allowed
+        """
+        return int(self._limit)
+
+    @property
+    def inflight(self):
+        """
+        The number of requests currently holding a slot
+        """
+        return self._inflight
+
+    def acquire(self, timeout=None):
+        """
+        Block until a request slot is available
+
+        :param timeout: Maximum number of seconds to wait (optional)
+        :return: True if a slot was acquired, False if the timeout expired
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._inflight >= int(self._limit):
+                if end is None:
+                    self._cond.wait()
+                else:
+                    remaining = end - time.time()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            self._inflight += 1
+            return True
+
+    def release(self, latency=None, dropped=False):
+        """
+        Release a request slot and adjust the limit from the observed outcome
+
+        :param latency: Seconds the request took (optional)
+        :param dropped: Whether the request failed due to overload
+        """
+        if (not dropped and latency is not None and self.latency_threshold is not None and
+                latency > self.latency_threshold):
+            dropped = True
+
+        with self._cond:
+            utilized = self._inflight * 2 >= self._limit
+            self._inflight -= 1
+            if dropped:
+                self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+                log.debug('Concurrency limit decreased to %s', self.limit)
+            elif utilized:
+                self._limit = min(self.max_limit, self._limit + 1)
+            self._cond.notify_all()
+
+
+class TokenBucket(object):
+    """
+    Fixed rate limiter. Tokens are added at ``rate`` per second up to
+    ``burst`` tokens, and every request consumes one.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        Create a new TokenBucket instance
+
+        :param rate: Requests per second allowed
+        :param burst: Maximum number of requests allowed at once. Defaults to
+        the rate rounded up to one
+        """
+        if rate <= 0:
+            raise ECSClientException("'rate' must be greater than 0")
+
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self._tokens = self.burst
+        self._last = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Block until a token is available
+
+        :param timeout: Maximum number of seconds to wait (optional)
+        :return: True if a token was consumed, False if the timeout expired
+        """
+        end = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                now = time.time()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if end is not None:
+                remaining = end - time.time()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
@@ -0,0 +1,129 @@
+# Standard lib imports
+import contextlib
+import threading
+import time
+
+# Project level imports
+from ecsclient.common.exceptions import DeadlineExceeded
+
+_local = threading.local()
+
+
+class Deadline(object):
+    """
+    Overall time budget and cancellation token for an operation made of
+    several API calls. While a deadline is active (see ``activate``), every
+    call made by an ECS client in the same thread fails fast with
+    DeadlineExceeded once the budget is spent or the deadline is cancelled,
+    and the per-call timeout is shrunk to the remaining budget.
+    """
+
+    def __init__(self, timeout=None, parent=None):
+        """
+        Create a new Deadline instance
+
+        :param timeout: Seconds from now until the deadline expires. None
+        means the deadline only ends when cancelled
+        :param parent: Enclosing deadline. Expiring or cancelling the parent
+        also ends this deadline (optional)
+        """
+        self.expires_at = None if timeout is None else time.time() + timeout
+        self.parent = parent
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """
+        Cancel the deadline. Calls in progress finish, new ones fail
+        """
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def remaining(self):
+        """
+        :return: Seconds left before the deadline expires, or None if it has no time limit
+        """
+        remaining = None if self.expires_at is None else max(0.0, self.expires_at - time.time())
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining()
+            if remaining is None or (parent_remaining is not None and parent_remaining < remaining):
+                remaining = parent_remaining
+        return remaining
+
+    @property
+    def expired(self):
+        return self.cancelled or self.remaining() == 0
+
+    def check(self):
+        """
+        Raise DeadlineExceeded if the deadline has expired or was cancelled
+        """
+        if self.cancelled:
+            raise DeadlineExceeded('Operation cancelled')
+        if self.remaining() == 0:
+            raise DeadlineExceeded('Deadline exceeded')
+
+    def timeout(self, timeout):
+        """
+        Shrink a per-call timeout to fit the remaining budget. Raise
+        DeadlineExceeded if there is no budget left
+
+        :param timeout: The per-call timeout in seconds
+        :return: The smallest of the timeout and the remaining budget
+        """
+        if self.cancelled:
+            raise DeadlineExceeded('Operation cancelled')
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if remaining == 0:
+            raise DeadlineExceeded('Deadline exceeded')
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+
+def current_deadline():
+    """
+    :return: The deadline active in the current thread, or None
+    """
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+
+@contextlib.contextmanager
+def activate(deadline):
+    """
+    Make an existing deadline (or cancellation token) the active one in the
+    current thread. Use it to carry a deadline into worker threads.
+
+    :param deadline: A Deadline instance. None is accepted and does nothing
+    """
+    if deadline is None:
+        yield None
+        return
+
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    _local.stack.append(deadline)
+    try:
+        yield deadline
+    finally:
+        _local.stack.pop()
+
+
+@contextlib.contextmanager
+def deadline(timeout=None):
+    """
+    Run the enclosed block with a new deadline nested in the active one, ie,
+
+        with deadline(30) as d:
+            client.bucket.list('namespace1')
+
+    :param timeout: Seconds until the deadline expires. None for a
+    cancellation-only deadline
+    """
+    with activate(Deadline(timeout, parent=current_deadline())) as d:
+        yield d
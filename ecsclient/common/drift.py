@@ -0,0 +1,186 @@
+# Standard lib imports
+import collections
+import json
+import logging
+import random
+import threading
+
+# Third party imports
+from six.moves import queue
+
+# Project level imports
+from ecsclient import schemas
+from ecsclient.common.util import RESPONSE_SCHEMAS, get_validator, response_schema
+
+log = logging.getLogger(__name__)
+
+
+def _schema_names():
+    """
+    Name every schema of RESPONSE_SCHEMAS after its constant in
+    ecsclient.schemas. A schema bound to several constants would make its
+    sampling rate ambiguous, so aliases are refused
+
+    :return: The names by schema id
+    """
+    names = {}
+    for _, schema in RESPONSE_SCHEMAS:
+        found = sorted(name for name, value in vars(schemas).items() if name.isupper() and value is schema)
+        if len(found) != 1:
+            raise ValueError("Response schemas need exactly one name in ecsclient.schemas, found {0}".format(found))
+        names[id(schema)] = found[0]
+    return names
+
+
+# Names of the response schemas, by schema id. The schemas are module
+# constants, so their ids are never reused
+SCHEMA_NAMES = _schema_names()
+
+# Queued by close() to stop the background thread
+_STOP = object()
+
+
+def _schema_path(error):
+    return '/'.join(str(part) for part in error.absolute_schema_path)
+
+
+class DriftMonitor(object):
+    """
+    Sampled validation of responses against their schema from
+    ecsclient.schemas, to notice when the shape of a response changes (ie,
+    after an ECS upgrade). A fraction of the GET responses of every
+    endpoint is handed to a background thread, which decodes and validates
+    them and counts the violations by schema and path within the schema.
+    The first violation of every path is logged as a warning.
+
+    Calls only pay for the sampling decision: when the background thread
+    falls behind, samples are dropped rather than queued. A monitor can be
+    shared by several clients.
+
+    Sampling rates are set per schema name rather than per URL: every
+    endpoint has its own schema in ecsclient.common.util.RESPONSE_SCHEMAS,
+    except for the few endpoints returning the same document (ie the
+    capacity of the cluster and of a storage pool), which share a rate.
+    """
+
+    def __init__(self, rate=0.01, rates=None, queue_size=100):
+        """
+        Create a new DriftMonitor instance
+
+        :param rate: Fraction of the responses validated, from 0 to 1
+        :param rates: Fractions of the responses validated per schema name,
+        overriding ``rate``, ie {'BUCKET_LIST': 0.1} (optional)
+        :param queue_size: Maximum number of samples waiting for validation
+        """
+        self.rate = rate
+        self.rates = dict(rates or {})
+        self.sampled = collections.Counter()
+        self.invalid = collections.Counter()
+        self.violations = collections.Counter()
+        self.examples = {}
+        self.dropped = 0
+        self._closed = False
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._worker = threading.Thread(target=self._work, name='ecsclient-drift-monitor')
+        self._worker.daemon = True
+        self._worker.start()
+
+    def observe(self, http_verb, url, content):
+        """
+        Sample a response. Called by the client for every successful call
+
+        :param http_verb: The HTTP verb of the call
+        :param url: The path of the call
+        :param content: The raw body of the response
+        """
+        if not (self.rate or self.rates):
+            return
+        schema = response_schema(http_verb, url)
+        if schema is None:
+            return
+        name = SCHEMA_NAMES.get(id(schema), 'UNKNOWN')
+        if self._random.random() >= self.rates.get(name, self.rate):
+            return
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                self._queue.put_nowait((name, schema, content))
+            except queue.Full:
+                self.dropped += 1
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            name, schema, content = item
+            try:
+                self._validate(name, schema, content)
+            except Exception as e:
+                log.warning("Validating a {0} response failed: {1}".format(name, e))
+            finally:
+                self._queue.task_done()
+
+    def _validate(self, name, schema, content):
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        errors = list(get_validator(schema).iter_errors(json.loads(content)))
+        with self._lock:
+            self.sampled[name] += 1
+            if not errors:
+                return
+            self.invalid[name] += 1
+            for error in errors:
+                key = (name, _schema_path(error))
+                self.violations[key] += 1
+                if key not in self.examples:
+                    self.examples[key] = error.message
+                    log.warning("Response drift in {0} at '{1}': {2}".format(name, key[1], error.message))
+
+    def join(self):
+        """
+        Wait until every queued sample is validated
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Validate the samples already queued, then stop the background
+        thread. Responses observed afterwards are ignored
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def stats(self):
+        """
+        :return: A dict of the counters: the number of sampled and invalid
+        responses per schema name, the number of violations per (schema
+        name, schema path) tuple, ie ('BUCKET_LIST',
+        'properties/object_bucket/items/required'), with an example message
+        for each, and the number of dropped samples
+        """
+        with self._lock:
+            return {'sampled': dict(self.sampled),
+                    'invalid': dict(self.invalid),
+                    'violations': dict(self.violations),
+                    'examples': dict(self.examples),
+                    'dropped': self.dropped}
+
+    def reset(self):
+        """
+        Reset the counters
+        """
+        with self._lock:
+            self.sampled.clear()
+            self.invalid.clear()
+            self.violations.clear()
+            self.examples.clear()
+            self.dropped = 0
@@ -177,3 +177,10 @@ ERROR_CODES = {
     "55003": "Back end node repair failed when perform reconnect opertion",
     "55004": "There is at least one vdc is unreachable with operator"
 }
+
+# Codes checked by the library, ie to make bulk operations idempotent
+REQUEST_PARAMETER_NOT_FOUND = "1004"
+RESOURCE_ALREADY_EXISTS = "1015"
+RESOURCE_NOT_FOUND = "1019"
+RESOURCE_BEING_REFERENCED = "1020"
+BUCKET_ALREADY_EXISTS = "40008"
@@ -101,3 +101,10 @@ class ECSClientException(Exception):
             b += 'Response_content: %s' % self.http_response_content
 
         return b and a + b or a
+
+
+class DeadlineExceeded(ECSClientException):
+    """
+    Raised when the deadline of an operation has passed or the operation
+    has been cancelled before a request could complete
+    """
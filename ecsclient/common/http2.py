@@ -0,0 +1,121 @@
+# Standard lib imports
+import datetime
+import logging
+import threading
+
+# Third party imports
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import select_proxy
+
+# Project level imports
+from ecsclient.common.exceptions import ECSClientException
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+log = logging.getLogger(__name__)
+
+# Connection-specific headers are not allowed in HTTP/2 requests
+HOP_BY_HOP_HEADERS = frozenset(['connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade',
+                                'host'])
+
+
+class HTTP2Adapter(BaseAdapter):
+    """
+    Transport adapter that sends requests over HTTP/2 with httpx, so that
+    concurrent calls to the same node are multiplexed over a single
+    connection instead of opening one connection per call.
+
+    Over HTTPS the protocol is negotiated with ALPN and the adapter falls
+    back to HTTP/1.1 when the server does not offer h2. Over plain HTTP,
+    HTTP/1.1 is used unless ``prior_knowledge`` is set.
+
+    Proxies are not supported: calls that would go through one (ie set with
+    the HTTPS_PROXY environment variable) raise an ECSClientException
+    rather than silently bypassing it.
+
+    Requires the optional ``httpx[http2]`` package.
+    """
+
+    def __init__(self, prior_knowledge=False, max_connections=None):
+        """
+        Create a new HTTP2Adapter instance
+
+        :param prior_knowledge: Speak HTTP/2 over plain HTTP without
+        negotiation (h2c). Only use it with servers known to support it
+        :param max_connections: Maximum number of connections per adapter (optional)
+        """
+        if httpx is None:
+            raise ECSClientException("HTTP/2 support requires the 'httpx[http2]' package")
+
+        super(HTTP2Adapter, self).__init__()
+        self.prior_knowledge = prior_knowledge
+        self.max_connections = max_connections
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _client(self, verify, cert):
+        key = (verify, cert)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = httpx.Client(http1=not self.prior_knowledge,
+                                      http2=True,
+                                      verify=verify,
+                                      cert=cert,
+                                      limits=httpx.Limits(max_connections=self.max_connections))
+                self._clients[key] = client
+            return client
+
+    @staticmethod
+    def _timeout(timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return httpx.Timeout(timeout)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        proxy = select_proxy(request.url, proxies) if proxies else None
+        if proxy:
+            raise ECSClientException("HTTP2Adapter does not support proxies, "
+                                     "cannot send {0} through {1}".format(request.url, proxy))
+        headers = dict((k, v) for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS)
+        started = datetime.datetime.now()
+
+        try:
+            resp = self._client(verify, cert).request(request.method,
+                                                      request.url,
+                                                      headers=headers,
+                                                      content=request.body,
+                                                      timeout=self._timeout(timeout))
+        except httpx.ConnectTimeout as e:
+            raise requests.ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise requests.ReadTimeout(e, request=request)
+        except (httpx.ConnectError, httpx.RemoteProtocolError) as e:
+            raise requests.ConnectionError(e, request=request)
+        except httpx.HTTPError as e:
+            raise requests.RequestException(e, request=request)
+
+        response = requests.Response()
+        response.status_code = resp.status_code
+        response.reason = resp.reason_phrase
+        response.headers = CaseInsensitiveDict(resp.headers.items())
+        response._content = resp.content
+        response.encoding = resp.charset_encoding
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = datetime.datetime.now() - started
+        response.http_version = resp.http_version
+        return response
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
@@ -1,5 +1,7 @@
 import logging
 
+from ecsclient.common.records import BucketBillingRecord, typed as typed_records
+
 log = logging.getLogger(__name__)
 
 
@@ -50,7 +52,7 @@ class Billing(object):
                 namespace, bucket_name), params=params)
 
     def get_namespace_billing_info(self, namespace, sizeunit='GB',
-                                   include_bucket_detail=False, marker=None):
+                                   include_bucket_detail=False, marker=None, typed=False):
         """
         Gets billing details for the specified namespace and bucket details.
         Note: Due to the fact that sampling a namespace's buckets takes some
@@ -98,6 +100,8 @@ class Billing(object):
         :param marker: Optional. Used to continue a truncated response. Omit
         this parameter on the first request.
         :param sizeunit: Unit to be used for calculating the size on disk (KB,MB and GB. GB is default value)
+        :param typed: Optional. Return the bucket details as compact
+        BucketBillingRecord mappings rather than dicts.
         """
         log.info("Getting billing info for namespace '{0}'".format(namespace))
 
@@ -109,9 +113,10 @@ class Billing(object):
         if marker:
             params['marker'] = marker
 
-        return self.conn.get(
+        response = self.conn.get(
             url='object/billing/namespace/{0}/info'.format(
                 namespace), params=params)
+        return typed_records(response, 'bucket_billing_info', BucketBillingRecord) if typed else response
 
     def get_namespace_billing_sample(self, namespace, start_time, end_time, sizeunit='GB',
                                      include_bucket_detail=False, marker=None):
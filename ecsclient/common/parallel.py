@@ -0,0 +1,73 @@
+# Standard lib imports
+import collections
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Project level imports
+from ecsclient.common.deadline import activate, current_deadline
+
+log = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+
+
+def default_workers(client=None):
+    """
+    Number of worker threads to use against the given client. When the
+    client has a concurrency limiter, use its maximum so the limiter (and
+    not the pool size) decides how many requests are in flight.
+
+    :param client: An ECS client instance (optional)
+    """
+    limiter = getattr(client, 'limiter', None)
+    if limiter is not None:
+        return limiter.max_limit
+    return DEFAULT_WORKERS
+
+
+def imap(func, iterable, max_workers=DEFAULT_WORKERS, deadline=None):
+    """
+    Apply ``func`` to every item in ``iterable`` using a pool of threads and
+    yield ``(item, result, error)`` tuples in input order. Only a bounded
+    window of items is consumed ahead of the results, so arbitrarily long
+    iterators can be streamed. Exceptions raised by ``func`` are returned
+    as ``error`` instead of being raised.
+
+    Requests issued by ``func`` through an ECS client go through the
+    client's concurrency and rate limiters, and under the deadline active
+    in the calling thread. Once the deadline expires no more items are
+    consumed: the items in flight are yielded and DeadlineExceeded is raised.
+
+    :param func: Callable taking a single item
+    :param iterable: The items to process
+    :param max_workers: Maximum number of threads
+    :param deadline: Deadline or cancellation token for the whole run.
+    Defaults to the deadline active in the calling thread
+    """
+    window = collections.deque()
+    iterator = iter(iterable)
+    if deadline is None:
+        deadline = current_deadline()
+
+    def call(item):
+        with activate(deadline):
+            try:
+                return func(item), None
+            except Exception as e:
+                return None, e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for item in iterator:
+            if deadline is not None and deadline.expired:
+                break
+            window.append((item, executor.submit(call, item)))
+            if len(window) >= max_workers * 2:
+                item, future = window.popleft()
+                result, error = future.result()
+                yield item, result, error
+        while window:
+            item, future = window.popleft()
+            result, error = future.result()
+            yield item, result, error
+        if deadline is not None:
+            deadline.check()
@@ -1,6 +1,8 @@
 import json
 import logging
 
+from ecsclient.common.records import BucketRecord, typed as typed_records
+
 log = logging.getLogger(__name__)
 
 
@@ -112,7 +114,7 @@ class Bucket(object):
         log.info(msg)
         return self.conn.post(url)
 
-    def list(self, namespace, marker='', limit=100):
+    def list(self, namespace, marker='', limit=100, typed=False):
         """
         Gets the list of buckets for the specified namespace.
 
@@ -173,13 +175,16 @@ class Bucket(object):
         :param namespace: The namespace to query for buckets
         :param marker: Reference to last object returned
         :param limit: Number of objects requested in current fetch
+        :param typed: Return the buckets as compact BucketRecord mappings
+        rather than dicts (optional)
         """
         log.info("Getting all buckets in namespace '{}'".format(namespace))
 
-        return self.conn.get('object/bucket?namespace={namespace}&marker={marker}&limit={limit}'.format(
+        response = self.conn.get('object/bucket?namespace={namespace}&marker={marker}&limit={limit}'.format(
             namespace=namespace,
             marker=marker,
             limit=limit))
+        return typed_records(response, 'object_bucket', BucketRecord) if typed else response
 
     def set_retention(self, bucket_name, namespace, period=2592000):
         """
@@ -0,0 +1,181 @@
+# Standard lib imports
+import collections
+import gzip
+import json
+import logging
+import re
+import threading
+import time
+
+# Third party imports
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from six.moves import urllib
+
+# Project level imports
+from ecsclient.common.exceptions import ECSClientException
+from ecsclient.common.util import REDACTED, redact
+
+log = logging.getLogger(__name__)
+
+FORMAT_NAME = 'ecsclient-recording'
+FORMAT_VERSION = 1
+
+# Response headers kept in a recording. Every other header is dropped.
+RECORDED_HEADERS = ('Content-Type', 'x-sds-auth-token')
+
+# Response headers whose value is replaced by REDACTED
+SENSITIVE_HEADERS = ('x-sds-auth-token',)
+
+# Path segments replaced by '{id}' in templated paths: URNs, UUIDs, numbers
+# and long hexadecimal strings
+_ID_SEGMENT = re.compile(r'^(urn:.*|[0-9a-fA-F]{8}(-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}|\d+|[0-9a-fA-F]{16,})$')
+
+
+def template_path(path):
+    """
+    Replace identifier-looking segments of a URL path with '{id}', ie,
+    '/vdc/data-service/vpools/urn:storageos:...' becomes '/vdc/data-service/vpools/{id}'
+
+    :param path: The URL path
+    """
+    return '/'.join('{id}' if _ID_SEGMENT.match(urllib.parse.unquote(s)) else s for s in path.split('/'))
+
+
+def _redact_body(text):
+    try:
+        return json.dumps(redact(json.loads(text)), separators=(',', ':'))
+    except ValueError:
+        return text
+
+
+def _request_key(method, path, query):
+    return method, path, urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(query, keep_blank_values=True)))
+
+
+class RecordingAdapter(BaseAdapter):
+    """
+    Transport adapter that sends requests with a real adapter and appends
+    every request/response pair to a gzip-compressed JSON-lines file.
+    Credentials (auth headers, passwords and secret keys in bodies) are
+    redacted and request bodies are not recorded.
+    """
+
+    def __init__(self, path, adapter=None):
+        """
+        Create a new RecordingAdapter instance
+
+        :param path: Path of the recording file. It is overwritten
+        :param adapter: Adapter used to send the requests. Defaults to HTTPAdapter
+        """
+        super(RecordingAdapter, self).__init__()
+        self.path = path
+        self.adapter = adapter or HTTPAdapter()
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wb')
+        self._write({'format': FORMAT_NAME, 'version': FORMAT_VERSION})
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line.encode('utf-8'))
+
+    def send(self, request, **kwargs):
+        started = time.time()
+        resp = self.adapter.send(request, **kwargs)
+        elapsed = time.time() - started
+
+        parsed_url = urllib.parse.urlparse(request.url)
+        headers = dict((h, REDACTED if h in SENSITIVE_HEADERS else resp.headers[h])
+                       for h in RECORDED_HEADERS if h in resp.headers)
+        self._write({'method': request.method,
+                     'path': parsed_url.path,
+                     'template': template_path(parsed_url.path),
+                     'query': parsed_url.query,
+                     'status': resp.status_code,
+                     'reason': resp.reason,
+                     'headers': headers,
+                     'body': _redact_body(resp.text),
+                     'elapsed': round(elapsed, 6)})
+        return resp
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        self.adapter.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Transport adapter that serves the responses of a recording made with
+    RecordingAdapter without any network access. Requests are matched by
+    method, path and query string first and by templated path second.
+    When a request was recorded several times, the responses are served
+    in the recorded order and then cycled.
+    """
+
+    def __init__(self, path, latency_scale=1.0):
+        """
+        Create a new ReplayAdapter instance
+
+        :param path: Path of the recording file
+        :param latency_scale: Factor applied to the recorded latencies.
+        Use 0 to answer immediately
+        """
+        super(ReplayAdapter, self).__init__()
+        self.path = path
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._exact = collections.defaultdict(list)
+        self._templated = collections.defaultdict(list)
+        self._positions = collections.defaultdict(int)
+        self._load()
+
+    def _load(self):
+        with gzip.open(self.path, 'rb') as f:
+            lines = iter(f)
+            header = json.loads(next(lines).decode('utf-8'))
+            if header.get('format') != FORMAT_NAME:
+                raise ECSClientException("'{0}' is not an ecsclient recording".format(self.path))
+            for line in lines:
+                record = json.loads(line.decode('utf-8'))
+                self._exact[_request_key(record['method'], record['path'], record['query'])].append(record)
+                self._templated[(record['method'], record['template'])].append(record)
+        log.debug('Loaded recording %s', self.path)
+
+    def _next(self, key, records):
+        with self._lock:
+            position = self._positions[key]
+            self._positions[key] = position + 1
+        return records[position % len(records)]
+
+    def send(self, request, **kwargs):
+        parsed_url = urllib.parse.urlparse(request.url)
+        key = _request_key(request.method, parsed_url.path, parsed_url.query)
+        records = self._exact.get(key)
+        if not records:
+            key = (request.method, template_path(parsed_url.path))
+            records = self._templated.get(key)
+        if not records:
+            raise requests.ConnectionError('No recorded response for {0} {1}'.format(request.method, request.url),
+                                           request=request)
+
+        record = self._next(key, records)
+        if self.latency_scale:
+            time.sleep(record['elapsed'] * self.latency_scale)
+
+        resp = requests.Response()
+        resp.status_code = record['status']
+        resp.reason = record['reason']
+        resp.headers = CaseInsensitiveDict(record['headers'])
+        resp._content = record['body'].encode('utf-8')
+        resp.encoding = 'utf-8'
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        return resp
+
+    def close(self):
+        pass
@@ -0,0 +1,147 @@
+# Standard lib imports
+import sys
+
+# Third party imports
+import six
+
+# Project level imports
+from ecsclient import schemas
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+if six.PY2:
+    # The intern() builtin of Python 2 does not take unicode strings, so they
+    # are shared through a dict, emptied when full to bound its size
+    _MAX_STRINGS = 10000
+    _strings = {}
+
+    def _intern(value):
+        if len(_strings) >= _MAX_STRINGS and value not in _strings:
+            _strings.clear()
+        return _strings.setdefault(value, value)
+else:
+    _intern = sys.intern
+
+
+class Record(Mapping):
+    """
+    Read-only mapping storing the fields of a list result in slots rather
+    than in a dict, which saves most of the memory of a record when a
+    listing holds many of them. Fields are also readable as attributes, and
+    fields that the record type does not declare are kept in ``_extra``.
+
+    Records are not dicts, so json.dumps() rejects them: serialize the
+    result of to_dict() instead. They can be pickled and copied.
+
+    Record types are built with record_type().
+    """
+    __slots__ = ('_extra',)
+    _fields = frozenset()
+    _order = ()
+    _interned = frozenset()
+
+    def __init__(self, data):
+        extra = None
+        for field, value in data.items():
+            if field in self._interned and isinstance(value, six.string_types):
+                value = _intern(value)
+            if field in self._fields:
+                setattr(self, field, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[field] = value
+        self._extra = extra
+
+    def __getitem__(self, field):
+        if field in self._fields:
+            try:
+                return getattr(self, field)
+            except AttributeError:
+                raise KeyError(field)
+        if self._extra is not None and field in self._extra:
+            return self._extra[field]
+        raise KeyError(field)
+
+    def __iter__(self):
+        for field in self._order:
+            if hasattr(self, field):
+                yield field
+        if self._extra is not None:
+            for field in self._extra:
+                yield field
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(type(self).__name__, self.to_dict())
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def to_dict(self):
+        """
+        The record as a plain dict, ie to serialize it
+        """
+        return dict(self.items())
+
+
+def record_type(name, schema=None, fields=(), interned=()):
+    """
+    Create a Record subclass whose slots are the properties (and required
+    fields) of a JSON schema from ecsclient.schemas, plus the given fields
+
+    :param name: Name of the class
+    :param schema: The JSON schema of a single record (optional)
+    :param fields: Additional field names (optional)
+    :param interned: Fields whose string values are interned, so that the
+    records of a listing share a single copy of repeated values like
+    namespaces or replication group URNs (optional)
+    """
+    names = []
+    if schema is not None:
+        names += list(schema.get('properties', {})) + list(schema.get('required', []))
+    names += list(fields)
+    names = tuple(sorted(set(names), key=names.index))
+    for field in names:
+        if hasattr(Record, field):
+            raise ValueError("Field '{0}' of record type {1} hides a Record attribute".format(field, name))
+    return type(str(name), (Record,), {'__module__': __name__,
+                                       '__slots__': names,
+                                       '_fields': frozenset(names),
+                                       '_order': names,
+                                       '_interned': frozenset(interned)})
+
+
+BucketRecord = record_type(
+    'BucketRecord', schemas.BUCKET, fields=('tags', 'inactive'),
+    interned=('namespace', 'vpool', 'api_type', 'owner', 'vdc'))
+
+ObjectUserRecord = record_type('ObjectUserRecord', schemas.OBJECT_USER_2, interned=('namespace',))
+
+BucketBillingRecord = record_type(
+    'BucketBillingRecord',
+    fields=('name', 'namespace', 'vpool_id', 'total_objects', 'total_size', 'total_size_unit', 'total_size_in_gb',
+            'sample_time', 'uptodate_till'),
+    interned=('namespace', 'vpool_id', 'total_size_unit', 'sample_time', 'uptodate_till'))
+
+
+def typed(response, list_key, cls):
+    """
+    Replace the records of a list response with Record instances
+
+    :param response: The decoded response
+    :param list_key: The key of the records list, ie 'object_bucket'
+    :param cls: The Record subclass, ie BucketRecord
+    :return: The response
+    """
+    if response and response.get(list_key) is not None:
+        response[list_key] = [cls(record) for record in response[list_key]]
+    return response
@@ -0,0 +1,154 @@
+# Standard lib imports
+import collections
+import logging
+import threading
+
+# Third party imports
+import requests
+
+# Project level imports
+from ecsclient.common.exceptions import ECSClientException
+from ecsclient.common.token_request import TokenRequest
+
+log = logging.getLogger(__name__)
+
+
+class TokenManager(object):
+    """
+    Holds the tokens of many identities in one process, keyed by
+    (token endpoint, username), over a single shared requests.Session.
+    Tokens are kept in memory, or in a token store when one is given. When
+    more than ``max_identities`` identities are in use, the least recently
+    used one is evicted and its token is logged out, which bounds both
+    memory and server-side sessions.
+
+    Concurrent calls of an identity that has no token yet wait for a single
+    login instead of each logging in.
+    """
+
+    def __init__(self, max_identities=32, verify_ssl=False, request_timeout=15.0, session=None,
+                 token_store=None):
+        """
+        Create a new TokenManager instance
+
+        :param max_identities: Maximum number of identities holding a token
+        :param verify_ssl: Verify SSL certificates
+        :param request_timeout: How long to wait for ECS to respond
+        :param session: requests.Session shared by all identities (optional)
+        :param token_store: TokenStore persisting the tokens, so that other
+        processes can reuse them. It must store one token per identity, so a
+        FileTokenStore is refused. By default tokens only live in memory (optional)
+        """
+        if token_store is not None and not token_store.keyed:
+            raise ECSClientException("{0} holds a single token and cannot be shared by several identities".format(
+                type(token_store).__name__))
+        self.max_identities = max_identities
+        self.verify_ssl = verify_ssl
+        self.request_timeout = request_timeout
+        self.session = session or requests.Session()
+        self.token_store = token_store
+        self._identities = collections.OrderedDict()
+        self._login_locks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._identities)
+
+    def __contains__(self, key):
+        return key in self._identities
+
+    def _token_request(self, ecs_endpoint, token_endpoint, username, password):
+        key = (token_endpoint, username)
+        evicted = []
+        with self._lock:
+            token_request = self._identities.pop(key, None)
+            if token_request is None or token_request.password != password:
+                token_request = TokenRequest(username=username,
+                                             password=password,
+                                             ecs_endpoint=ecs_endpoint,
+                                             token_endpoint=token_endpoint,
+                                             verify_ssl=self.verify_ssl,
+                                             token_path=None,
+                                             request_timeout=self.request_timeout,
+                                             cache_token=self.token_store is not None,
+                                             session=self.session,
+                                             token_store=self.token_store)
+            self._identities[key] = token_request
+            login_lock = self._login_locks.setdefault(key, threading.Lock())
+            while len(self._identities) > self.max_identities:
+                old_key, old = self._identities.popitem(last=False)
+                self._login_locks.pop(old_key, None)
+                evicted.append(old)
+
+        for old in evicted:
+            self._logout(old)
+        return token_request, login_lock
+
+    def get_token(self, ecs_endpoint, token_endpoint, username, password):
+        """
+        Return the token of an identity, logging in if it has none
+
+        :param ecs_endpoint: The URL where ECS is located
+        :param token_endpoint: The URL where the ECS login is located
+        :param username: The username to fetch a token
+        :param password: The password to fetch a token
+        :return: A token
+        """
+        token_request, login_lock = self._token_request(ecs_endpoint, token_endpoint, username, password)
+        if token_request.token:
+            return token_request.token
+        with login_lock:
+            # Another thread may have logged in while this one was waiting
+            return token_request.token or token_request.get_new_token(reuse_cached=True)
+
+    def invalidate(self, token_endpoint, username, token=None):
+        """
+        Forget the token of an identity so that the next call logs in again
+
+        :param token_endpoint: The URL where the ECS login is located
+        :param username: The username of the identity
+        :param token: Only forget the token if it is still this one (optional)
+        """
+        with self._lock:
+            token_request = self._identities.get((token_endpoint, username))
+            if token_request is not None and (token is None or token_request.token == token):
+                token_request.remove_cached_token()
+
+    def evict(self, token_endpoint, username):
+        """
+        Remove an identity and log its token out
+
+        :param token_endpoint: The URL where the ECS login is located
+        :param username: The username of the identity
+        """
+        with self._lock:
+            token_request = self._identities.pop((token_endpoint, username), None)
+            self._login_locks.pop((token_endpoint, username), None)
+        if token_request is not None:
+            self._logout(token_request)
+
+    def close(self):
+        """
+        Log out every identity
+        """
+        with self._lock:
+            token_requests = list(self._identities.values())
+            self._identities.clear()
+            self._login_locks.clear()
+        for token_request in token_requests:
+            self._logout(token_request)
+
+    def _logout(self, token_request):
+        if not token_request.token:
+            return
+
+        log.info("Logging out '{0}'".format(token_request.username))
+        try:
+            self.session.get(token_request.ecs_endpoint + '/logout',
+                             verify=self.verify_ssl,
+                             headers={'Accept': 'application/json',
+                                      'X-SDS-AUTH-TOKEN': token_request.token},
+                             timeout=self.request_timeout)
+        except requests.RequestException as e:
+            log.warning("Logout of '{0}' failed: {1}".format(token_request.username, e))
+        token_request.remove_cached_token()
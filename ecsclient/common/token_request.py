@@ -1,12 +1,16 @@
 # Standard lib imports
 import logging
 import os
+import threading
+import time
 
 # Third party imports
 import requests
 
 # Project level imports
+from ecsclient.common.deadline import current_deadline
 from ecsclient.common.exceptions import ECSClientException
+from ecsclient.common.token_store import FileTokenStore
 
 
 # Suppress the insecure request warning
@@ -16,6 +20,9 @@ requests.packages.urllib3.disable_warnings()
 
 log = logging.getLogger(__name__)
 
+# Seconds to wait before retrying a failed background token refresh
+REFRESH_RETRY_INTERVAL = 30
+
 
 class TokenRequest(object):
     """
@@ -27,7 +34,7 @@ class TokenRequest(object):
 
     def __init__(self, username, password, ecs_endpoint, token_endpoint,
                  verify_ssl, token_path, request_timeout,
-                 cache_token):
+                 cache_token, session=None, token_store=None):
         """
         Create a new TokenRequest instance
 
@@ -41,6 +48,9 @@ class TokenRequest(object):
         :param cache_token: Whether to cache the token, by default this is true
         you should only switch this to false when you want to directly fetch
         a token for a user
+        :param session: requests.Session to use, ie, to share a connection pool (optional)
+        :param token_store: TokenStore caching the token. Defaults to a
+        FileTokenStore at token_path
         """
         self.username = username
         self.password = password
@@ -48,26 +58,100 @@ class TokenRequest(object):
         self.token_endpoint = token_endpoint
         self.verify_ssl = verify_ssl
         self.token_verification_endpoint = ecs_endpoint + '/user/whoami'
+        self._token_store = token_store
         self.token_path = token_path
         self.request_timeout = request_timeout
         self.cache_token = cache_token
         self.token = None
-        self.session = requests.Session()
+        self.token_acquired_at = None
+        self.token_lifetime = None
+        self.session = session or requests.Session()
+        self._refresher = None
+        self._refresher_stop = threading.Event()
+        self._refresh_margin = None
+        self._resume_refresher = False
+
+    @property
+    def token_path(self):
+        return self._token_path
+
+    @token_path.setter
+    def token_path(self, token_path):
+        self._token_path = token_path
+        if self._token_store is not None:
+            self.token_store = self._token_store
+        else:
+            self.token_store = FileTokenStore(token_path) if token_path else None
 
-    def get_new_token(self):
+    @property
+    def token_key(self):
+        """
+        The key of the token in the token store
+        """
+        return self.ecs_endpoint, self.username
+
+    def remove_cached_token(self):
+        """
+        Forget the token and remove it from the token store. A running
+        background refresh is stopped, so that it does not log in again,
+        and resumes after the next login
+        """
+        if self._refresher is not None:
+            self.stop_refresher()
+            self._resume_refresher = True
+        self.token = None
+        if self.token_store is not None:
+            self.token_store.remove(self.token_key)
+
+    def _timeout(self):
+        """
+        The request timeout, shrunk to the budget left in the active deadline
+        """
+        deadline = current_deadline()
+        if deadline is None:
+            return self.request_timeout
+        return deadline.timeout(self.request_timeout)
+
+    def get_new_token(self, reuse_cached=False, stale_token=None):
         """
         Request a new authentication token from ECS and persist it
         to a file for future usage if cache_token is true
 
+        When caching, only one process logs in at a time. With reuse_cached,
+        the processes that waited for the lock reuse the token written by the
+        one that logged in instead of logging in again.
+
+        :param reuse_cached: Return the cached token instead of logging in
+        when it differs from stale_token
+        :param stale_token: The token known to be invalid, or None
         :return: Returns a valid token, or None if failed
         """
+        if not self.cache_token:
+            return self._login()
+
+        if isinstance(self.token_store, FileTokenStore):
+            token_dir = os.path.dirname(os.path.abspath(self.token_path))
+            if not os.path.isdir(token_dir):
+                raise ECSClientException('Token directory not found')
+
+        with self.token_store.lock(self.token_key):
+            if reuse_cached:
+                token = self.token_store.read(self.token_key)
+                if token and token != stale_token:
+                    log.debug("Reusing token cached by another client")
+                    self.token = token
+                    self.token_acquired_at = self.token_store.modified_at(self.token_key)
+                    return token
+            return self._login()
+
+    def _login(self):
         log.info("Getting new token")
-        self.session.auth = (self.username, self.password)
 
         req = self.session.get(self.token_endpoint,
+                               auth=(self.username, self.password),
                                verify=self.verify_ssl,
                                headers={'Accept': 'application/json'},
-                               timeout=self.request_timeout)
+                               timeout=self._timeout())
 
         if req.status_code == 401:
             msg = 'Invalid username or password'
@@ -79,19 +163,76 @@ class TokenRequest(object):
             raise ECSClientException.from_response(req, message=msg)
 
         self.token = req.headers['x-sds-auth-token']
+        self.token_acquired_at = time.time()
 
         if self.cache_token:
-            log.debug("Caching token to '{0}'".format(self.token_path))
+            self.token_store.write(self.token_key, self.token, ttl=self.token_lifetime)
 
-            token_dir = os.path.dirname(os.path.abspath(self.token_path))
-            if not os.path.isdir(token_dir):
-                raise ECSClientException('Token directory not found')
-
-            with open(self.token_path, 'w') as token_file:
-                token_file.write(self.token)
+        if self._resume_refresher:
+            self._resume_refresher = False
+            self.start_refresher(self.token_lifetime, self._refresh_margin)
 
         return self.token
 
+    def start_refresher(self, lifetime, margin=None):
+        """
+        Start a daemon thread that logs in again shortly before the token
+        reaches its lifetime, so that calls never wait for a login. The new
+        token replaces the old one in a single assignment, and calls in
+        flight keep using the token they started with. Without a token, the
+        thread waits one refresh interval (lifetime minus margin) before
+        logging in.
+
+        :param lifetime: Seconds a token is valid for after login
+        :param margin: Seconds before the end of the lifetime to refresh the
+        token. Defaults to 10% of the lifetime
+        """
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        if margin is None:
+            margin = lifetime * 0.1
+        self.token_lifetime = lifetime
+        self._refresh_margin = margin
+        self._resume_refresher = False
+
+        self._refresher_stop.clear()
+        self._refresher = threading.Thread(target=self._refresh_loop,
+                                           args=(lifetime, margin),
+                                           name='ecsclient-token-refresher')
+        self._refresher.daemon = True
+        self._refresher.start()
+
+    def stop_refresher(self):
+        """
+        Stop the background refresh thread, if running
+        """
+        self._refresher_stop.set()
+        if self._refresher is not None:
+            if self._refresher is not threading.current_thread():
+                self._refresher.join()
+            self._refresher = None
+
+    def _refresh_loop(self, lifetime, margin):
+        started = time.time()
+        while not self._refresher_stop.is_set():
+            acquired_at = self.token_acquired_at
+            # Without a token yet, the first login waits for one interval
+            wait = (acquired_at or started) + lifetime - margin - time.time()
+            if wait > 0:
+                self._refresher_stop.wait(wait)
+                if self.token_acquired_at != acquired_at:
+                    # Refreshed by another call in the meantime
+                    continue
+                if self._refresher_stop.is_set():
+                    return
+
+            log.debug("Refreshing token in the background")
+            try:
+                self.get_new_token(reuse_cached=True, stale_token=self.token)
+            except Exception as e:
+                log.warning("Background token refresh failed: {0}".format(e))
+                self._refresher_stop.wait(REFRESH_RETRY_INTERVAL)
+
     def get_token(self):
         """
         Attempt to get an existing token, if successful then ensure it
@@ -103,7 +244,7 @@ class TokenRequest(object):
 
         if not token:
             log.debug("No Token found getting new one")
-            return self.get_new_token()
+            return self.get_new_token(reuse_cached=True)
 
         # FIXME: Avoid validation at every call
         log.debug("Validating token")
@@ -115,7 +256,8 @@ class TokenRequest(object):
         elif req.status_code in (401, 403, 415):
             msg = "Invalid token. Trying to get a new one (Code: {})".format(req.status_code)
             log.warning(msg)
-            return self.get_new_token()
+            self.token = None
+            return self.get_new_token(reuse_cached=True, stale_token=token)
         else:  # i.e. 500 or unknown raise an exception
             msg = "Token validation error (Code: {})".format(req.status_code)
             log.error(msg)
@@ -131,10 +273,7 @@ class TokenRequest(object):
         token = self.token
 
         if not token and self.cache_token:
-            if os.path.isfile(self.token_path):
-                log.debug("Reading cached token at '{0}'".format(self.token_path))
-                with open(self.token_path, 'r') as token_file:
-                    token = token_file.read()
+            token = self.token_store.read(self.token_key)
 
         if not token:
             log.debug("No token found")
@@ -154,7 +293,7 @@ class TokenRequest(object):
         try:
             return self.session.get(url, verify=self.verify_ssl,
                                     headers=headers,
-                                    timeout=self.request_timeout)
+                                    timeout=self._timeout())
         except requests.ConnectionError as conn_err:
             msg = 'Connection error: {0}'.format(conn_err.args)
             log.error(msg)
@@ -0,0 +1,336 @@
+# Standard lib imports
+import collections
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Project level imports
+from ecsclient.common.util import atomic_write
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def _file_lock(lock_path, thread_lock):
+    """
+    Hold an exclusive lock across threads and processes. Only the thread lock
+    is taken on platforms without fcntl.
+    """
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _key_name(key):
+    return hashlib.sha1('\n'.join(str(k) for k in key).encode('utf-8')).hexdigest()
+
+
+def _stat_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size, stat.st_ino
+
+
+class TokenStore(object):
+    """
+    Interface of the token caches used by TokenRequest. Tokens are stored
+    per key, a (ecs_endpoint, username) tuple, with an optional time to live.
+    Implementations must be safe to use from several threads, and lock()
+    must let a single holder per key log in at a time.
+
+    Stores whose ``keyed`` attribute is False hold a single token whatever
+    the key, and cannot be shared by several identities.
+    """
+    keyed = True
+
+    def read(self, key):
+        """
+        :param key: The (ecs_endpoint, username) tuple
+        :return: The token, or None if there is none or it has expired
+        """
+        raise NotImplementedError()
+
+    def write(self, key, token, ttl=None):
+        """
+        Atomically replace the token
+
+        :param key: The (ecs_endpoint, username) tuple
+        :param token: The token to store
+        :param ttl: Seconds after which the token is considered expired (optional)
+        """
+        raise NotImplementedError()
+
+    def remove(self, key):
+        """
+        Remove the token, if any
+
+        :param key: The (ecs_endpoint, username) tuple
+        """
+        raise NotImplementedError()
+
+    def modified_at(self, key):
+        """
+        :param key: The (ecs_endpoint, username) tuple
+        :return: When the token was last written, or None if there is none
+        """
+        raise NotImplementedError()
+
+    def lock(self, key):
+        """
+        Context manager holding an exclusive lock on the key
+
+        :param key: The (ecs_endpoint, username) tuple
+        """
+        raise NotImplementedError()
+
+
+class MemoryTokenStore(TokenStore):
+    """
+    Token store local to the process
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self._locks = collections.defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+
+    def read(self, key):
+        entry = self._tokens.get(key)
+        if entry is None or (entry[2] is not None and entry[2] <= time.time()):
+            return None
+        return entry[0]
+
+    def write(self, key, token, ttl=None):
+        now = time.time()
+        self._tokens[key] = (token, now, now + ttl if ttl else None)
+
+    def remove(self, key):
+        self._tokens.pop(key, None)
+
+    def modified_at(self, key):
+        entry = self._tokens.get(key)
+        return entry[1] if entry else None
+
+    def lock(self, key):
+        with self._lock:
+            return self._locks[key]
+
+
+class FileTokenStore(TokenStore):
+    """
+    Single token file shared by every process of the host, the historical
+    ``token_path`` cache. The key is ignored, so every configuration using
+    the same path shares the same token, and since the file only holds the
+    token, no TTL is recorded. Writes are atomic, the file is only re-read
+    when it has changed on disk, and an advisory lock lets a single process
+    log in while the others wait and reuse its token.
+    """
+    keyed = False
+
+    def __init__(self, path):
+        """
+        Create a new FileTokenStore instance
+
+        :param path: Path to the cached token file
+        """
+        self.path = path
+        self.lock_path = path + '.lock'
+        self._thread_lock = threading.Lock()
+        self._signature = None
+        self._token = None
+
+    def read(self, key):
+        if not os.path.isfile(self.path):
+            return None
+
+        signature = _stat_signature(self.path)
+        if signature is not None and signature == self._signature:
+            return self._token
+
+        log.debug("Reading cached token at '{0}'".format(self.path))
+        with open(self.path, 'r') as token_file:
+            token = token_file.read()
+
+        self._signature, self._token = signature, token
+        return token
+
+    def write(self, key, token, ttl=None):
+        log.debug("Caching token to '{0}'".format(self.path))
+        atomic_write(self.path, token)
+        self._signature, self._token = _stat_signature(self.path), token
+
+    def remove(self, key):
+        if os.path.isfile(self.path):
+            log.debug("Removing cached token '{0}'".format(self.path))
+            os.remove(self.path)
+        self._signature, self._token = None, None
+
+    def modified_at(self, key):
+        signature = _stat_signature(self.path)
+        return signature[0] if signature else None
+
+    def lock(self, key):
+        return _file_lock(self.lock_path, self._thread_lock)
+
+
+class DirectoryTokenStore(TokenStore):
+    """
+    One token file per (endpoint, username) in a directory, so that many
+    configurations can share a host without colliding. Each file holds the
+    token with its write time and expiry as JSON. Files are written
+    atomically, re-read only when they change, and locked per key.
+    """
+
+    def __init__(self, directory):
+        """
+        Create a new DirectoryTokenStore instance
+
+        :param directory: Directory holding the token files. Created if missing
+        """
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        self._cache = {}
+        self._thread_locks = collections.defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, _key_name(key) + '.tkn')
+
+    def _entry(self, key):
+        path = self._path(key)
+        signature = _stat_signature(path)
+        if signature is None:
+            return None
+
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        try:
+            with open(path, 'r') as token_file:
+                entry = json.load(token_file)
+        except (IOError, OSError, ValueError):
+            return None
+        self._cache[key] = (signature, entry)
+        return entry
+
+    def read(self, key):
+        entry = self._entry(key)
+        if entry is None or (entry['expires_at'] is not None and entry['expires_at'] <= time.time()):
+            return None
+        return entry['token']
+
+    def write(self, key, token, ttl=None):
+        now = time.time()
+        entry = {'endpoint': key[0],
+                 'username': key[1],
+                 'token': token,
+                 'updated_at': now,
+                 'expires_at': now + ttl if ttl else None}
+        path = self._path(key)
+        log.debug("Caching token to '{0}'".format(path))
+        atomic_write(path, json.dumps(entry))
+        self._cache[key] = (_stat_signature(path), entry)
+
+    def remove(self, key):
+        path = self._path(key)
+        if os.path.isfile(path):
+            os.remove(path)
+        self._cache.pop(key, None)
+
+    def modified_at(self, key):
+        entry = self._entry(key)
+        return entry['updated_at'] if entry else None
+
+    def lock(self, key):
+        with self._lock:
+            thread_lock = self._thread_locks[key]
+        return _file_lock(os.path.join(self.directory, _key_name(key) + '.lock'), thread_lock)
+
+
+class SQLiteTokenStore(TokenStore):
+    """
+    Tokens stored in a local SQLite database, one row per (endpoint,
+    username) with its write time and expiry. Every thread uses its own
+    connection, and logins are serialized per key with a lock file next to
+    the database.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        """
+        Create a new SQLiteTokenStore instance
+
+        :param path: Path to the database file. Created if missing
+        :param timeout: Seconds to wait for the database to be unlocked
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._thread_locks = collections.defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS tokens ('
+                         'endpoint TEXT NOT NULL, '
+                         'username TEXT NOT NULL, '
+                         'token TEXT NOT NULL, '
+                         'updated_at REAL NOT NULL, '
+                         'expires_at REAL, '
+                         'PRIMARY KEY (endpoint, username))')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=self.timeout)
+        return conn
+
+    @staticmethod
+    def _params(key):
+        return key[0], key[1] or ''
+
+    def read(self, key):
+        row = self._connection().execute(
+            'SELECT token FROM tokens WHERE endpoint = ? AND username = ? AND (expires_at IS NULL OR expires_at > ?)',
+            self._params(key) + (time.time(),)).fetchone()
+        return row[0] if row else None
+
+    def write(self, key, token, ttl=None):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO tokens (endpoint, username, token, updated_at, expires_at) '
+                         'VALUES (?, ?, ?, ?, ?)',
+                         self._params(key) + (token, now, now + ttl if ttl else None))
+
+    def remove(self, key):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM tokens WHERE endpoint = ? AND username = ?', self._params(key))
+
+    def modified_at(self, key):
+        row = self._connection().execute('SELECT updated_at FROM tokens WHERE endpoint = ? AND username = ?',
+                                         self._params(key)).fetchone()
+        return row[0] if row else None
+
+    def lock(self, key):
+        with self._lock:
+            thread_lock = self._thread_locks[key]
+        return _file_lock('{0}.{1}.lock'.format(self.path, _key_name(key)), thread_lock)
@@ -0,0 +1,133 @@
+# Standard lib imports
+import logging
+import threading
+import time
+
+# Third party imports
+import six
+
+log = logging.getLogger(__name__)
+
+# URN kinds: the URN prefix, the list call, the key of the records list in
+# its response and the record fields holding the URN and the name
+KINDS = {
+    'replication_group': ('urn:storageos:ReplicationGroupInfo:', lambda client: client.replication_group.list(),
+                          'data_service_vpool', 'id', 'name'),
+    'storage_pool': ('urn:storageos:VirtualArray:', lambda client: client.storage_pool.list(),
+                     'varray', 'id', 'name'),
+    'vdc': ('urn:storageos:VirtualDataCenterData:', lambda client: client.vdc.list(),
+            'vdc', 'vdcId', 'vdcName'),
+}
+
+# Minimum seconds between two list calls caused by unknown URNs
+MISS_INTERVAL = 60
+
+
+def urn_kind(value):
+    """
+    :param value: Any value
+    :return: The kind of URN, ie 'replication_group', or None if the value
+    is not a resolvable URN
+    """
+    if isinstance(value, six.string_types) and value.startswith('urn:'):
+        for kind, (prefix, _, _, _, _) in KINDS.items():
+            if value.startswith(prefix):
+                return kind
+    return None
+
+
+class URNResolver(object):
+    """
+    Cache of the names of replication groups, storage pools and VDCs by
+    URN. Each kind is loaded at once with its list call and reloaded when
+    older than ``ttl`` seconds, so resolving any number of URNs costs one
+    list call per kind instead of one get per URN. Unknown URNs reload
+    their kind at most every MISS_INTERVAL seconds.
+
+    Instances are thread safe. List calls are made outside of the lock, so
+    threads missing the same kind at once may each list it.
+    """
+
+    def __init__(self, client, ttl=900):
+        """
+        Create a new URNResolver instance
+
+        :param client: An ECS client instance
+        :param ttl: Seconds after which a kind of URN is listed again
+        """
+        self.client = client
+        self.ttl = ttl
+        self._names = {}
+        self._loaded_at = {}
+        self._lock = threading.Lock()
+
+    def _load(self, kind):
+        """
+        List a kind of URN and swap its names in. The list call is made
+        without holding the lock, so that it does not hold up the lookups
+        of the other kinds
+
+        :return: The names of the kind by URN
+        """
+        _, call, list_key, urn_field, name_field = KINDS[kind]
+        records = (call(self.client) or {}).get(list_key, [])
+        names = dict((r.get(urn_field), r.get(name_field)) for r in records)
+        with self._lock:
+            self._names[kind] = names
+            self._loaded_at[kind] = time.time()
+        log.debug("Loaded {0} {1} URNs".format(len(names), kind))
+        return names
+
+    def prime(self, kinds=None):
+        """
+        Load the names of the given kinds of URN, whatever their age
+
+        :param kinds: Kinds from KINDS. Defaults to every kind (optional)
+        """
+        for kind in kinds or sorted(KINDS):
+            self._load(kind)
+
+    def invalidate(self):
+        """
+        Forget every name, so that they are listed again on next use
+        """
+        with self._lock:
+            self._names.clear()
+            self._loaded_at.clear()
+
+    def resolve(self, urn):
+        """
+        :param urn: A replication group, storage pool or VDC URN
+        :return: Its name, or None if it is unknown
+        """
+        kind = urn_kind(urn)
+        if kind is None:
+            return None
+        with self._lock:
+            names = self._names.get(kind)
+            age = time.time() - self._loaded_at.get(kind, 0)
+        if names is None or age > self.ttl or (urn not in names and age > MISS_INTERVAL):
+            names = self._load(kind)
+        return names.get(urn)
+
+    def annotate(self, response):
+        """
+        Return a copy of a response where every resolvable URN value has a
+        sibling key with its name: ``<key>_name`` for a URN and
+        ``<key>_names`` for a list of URNs. ie {'vpool': 'urn:...'} becomes
+        {'vpool': 'urn:...', 'vpool_name': 'rg1'}
+
+        :param response: A decoded response, or any part of it
+        """
+        if isinstance(response, dict):
+            annotated = {}
+            for key, value in response.items():
+                annotated[key] = self.annotate(value)
+                if urn_kind(value) is not None:
+                    annotated['{0}_name'.format(key)] = self.resolve(value)
+                elif isinstance(value, list) and value and all(urn_kind(v) is not None for v in value):
+                    annotated['{0}_names'.format(key)] = [self.resolve(v) for v in value]
+            return annotated
+        if isinstance(response, list):
+            return [self.annotate(value) for value in response]
+        return response
@@ -1,5 +1,7 @@
 import logging
 
+from ecsclient.common.records import ObjectUserRecord, typed as typed_records
+
 
 log = logging.getLogger(__name__)
 
@@ -12,7 +14,7 @@ class ObjectUser(object):
         """
         self.conn = connection
 
-    def list(self, namespace=None):
+    def list(self, namespace=None, typed=False):
         """
         Gets identifiers for all configured users. If namespace is provided
         then returns all users for the specified namespace.
@@ -39,6 +41,8 @@ class ObjectUser(object):
         }
 
         :param namespace: Namespace for which users should be returned. Optional.
+        :param typed: Return the users as compact ObjectUserRecord mappings
+        rather than dicts. Optional.
         """
         msg = 'Listing all object users'
         url = 'object/users'
@@ -48,7 +52,8 @@ class ObjectUser(object):
             msg += " in namespace '{}'".format(namespace)
 
         log.info(msg)
-        return self.conn.get(url=url)
+        response = self.conn.get(url=url)
+        return typed_records(response, 'blobuser', ObjectUserRecord) if typed else response
 
     def get(self, user_id, namespace=None):
         """
@@ -1,9 +1,110 @@
 import datetime
 import logging
-from jsonschema import validate, FormatChecker
+import os
+import re
+import tempfile
+import threading
+
+from jsonschema import FormatChecker
+from jsonschema.validators import validator_for
+
+from ecsclient import schemas
 
 log = logging.getLogger(__name__)
 
+# os.rename does not overwrite existing files on Windows
+replace_file = getattr(os, 'replace', os.rename)
+
+REDACTED = 'REDACTED'
+
+# JSON keys whose value is replaced by REDACTED in recordings and snapshots
+SENSITIVE_KEYS = frozenset(['password', 'secret_key', 'secret_key_1', 'secret_key_2', 'secretkey',
+                            'cas_secret', 'x-sds-auth-token', 'secretKeys'])
+
+# Format checkers are stateless and can be shared by all validators
+_format_checker = FormatChecker()
+
+# Compiled validators by schema id, with the schema so that a recycled id is
+# never mistaken for a cached schema. The cache is emptied when full, so that
+# callers building schemas on the fly do not grow it without bound
+_MAX_VALIDATORS = 128
+_validators = {}
+_validators_lock = threading.Lock()
+
+# Schemas of the GET responses, by path (without the query string). The
+# first matching path wins
+RESPONSE_SCHEMAS = tuple((re.compile(path), schema) for path, schema in (
+    (r'^object/bucket$', schemas.BUCKET_LIST),
+    (r'^object/bucket/acl/permissions$', schemas.BUCKET_ACL_PERMISSIONS),
+    (r'^object/bucket/acl/groups$', schemas.BUCKET_ACL_GROUPS),
+    (r'^object/bucket/searchmetadata$', schemas.BUCKET_SYSTEM_METADATA),
+    (r'^object/bucket/[^/]+/info$', schemas.BUCKET),
+    (r'^object/bucket/[^/]+/metadata$', schemas.BUCKET_USER_METADATA),
+    (r'^object/capacity(/[^/]+)?$', schemas.CAPACITY),
+    (r'^object/namespaces$', schemas.NAMESPACES),
+    (r'^object/namespaces/namespace/[^/]+$', schemas.NAMESPACE),
+    (r'^object/tenants$', schemas.TENANTS),
+    (r'^object/tenants/tenant/[^/]+$', schemas.TENANT),
+    (r'^object/users(/[^/]+)?$', schemas.OBJECT_USERS),
+    (r'^object/users/[^/]+/info$', schemas.OBJECT_USER),
+    (r'^object/user-password/[^/]+(/[^/]+)?$', schemas.GROUP_LIST),
+    (r'^object/secret-keys$', schemas.SECRET_KEYS),
+    (r'^object/user-secret-keys/[^/]+(/[^/]+)?$', schemas.SECRET_KEYS),
+    (r'^object/vdcs/vdc/list$', schemas.VDCS),
+    (r'^object/vdcs/(vdc|vdcid)/[^/]+$', schemas.VDC),
+    (r'^object-cert/keystore$', schemas.CERTIFICATE),
+    (r'^license$', schemas.LICENSE),
+    (r'^user/whoami$', schemas.WHOAMI),
+    (r'^vdc/alerts$', schemas.ALERTS),
+    (r'^vdc/data-service/vpools$', schemas.REPLICATION_GROUPS),
+    (r'^vdc/data-service/vpools/[^/]+$', schemas.REPLICATION_GROUP),
+    (r'^vdc/data-services/varrays$', schemas.STORAGE_POOLS),
+    (r'^vdc/data-services/varrays/[^/]+$', schemas.STORAGE_POOL),
+    (r'^vdc/data-stores$', schemas.DATA_STORES),
+    (r'^vdc/data-stores/commodity/search/varray/[^/]+$', schemas.DATA_STORES_COMMODITY),
+    (r'^vdc/data-stores/commodity/[^/]+$', schemas.DATA_STORE),
+    (r'^vdc/data-stores/[^/]+/tasks/[^/]+$', schemas.DATA_STORE_TASK),
+    (r'^vdc/keystore$', schemas.VDC_KEYSTORE),
+    (r'^vdc/nodes$', schemas.NODE_LIST),
+    (r'^vdc/users$', schemas.MANAGEMENT_USERS),
+    (r'^vdc/users/[^/]+$', schemas.MANAGEMENT_USER),
+))
+
+
+def atomic_write(path, data):
+    """
+    Write a file through a temporary file renamed over it, so readers
+    never see a partially written file
+
+    :param path: Path to the file
+    :param data: The text to write
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.ecsclient-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        replace_file(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def redact(value):
+    """
+    Returns a copy of a decoded response where the value of every key of
+    SENSITIVE_KEYS is replaced by REDACTED, at any depth
+
+    :param value: A decoded response, or any part of it
+    """
+    if isinstance(value, dict):
+        return dict((k, REDACTED if k in SENSITIVE_KEYS else redact(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
 
 def get_formatted_time_string(year, month, day, hour, minute=None):
     """
@@ -30,6 +131,45 @@ def get_formatted_time_string(year, month, day, hour, minute=None):
         return d.strftime("%Y-%m-%dT%H")
 
 
+def get_validator(schema):
+    """
+    Returns the validator of a schema. The schema is checked and its
+    validator built on first use only, then the validator is cached. Up to
+    _MAX_VALIDATORS validators are cached
+
+    :param schema: The schema, ie from ecsclient.schemas
+    :returns: A jsonschema validator
+    Throws:
+        jsonschema.SchemaError in case of invalid schema
+    """
+    entry = _validators.get(id(schema))
+    if entry is None or entry[0] is not schema:
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        entry = (schema, cls(schema, format_checker=_format_checker))
+        with _validators_lock:
+            if len(_validators) >= _MAX_VALIDATORS:
+                _validators.clear()
+            _validators[id(schema)] = entry
+    return entry[1]
+
+
+def response_schema(http_verb, url):
+    """
+    Returns the schema of the response of a call, or None if unknown
+
+    :param http_verb: The HTTP verb of the call
+    :param url: The path of the call, ie 'object/bucket?namespace=ns1'
+    """
+    if http_verb != 'GET':
+        return None
+    path = url.split('?', 1)[0].strip('/')
+    for pattern, schema in RESPONSE_SCHEMAS:
+        if pattern.match(path):
+            return schema
+    return None
+
+
 def is_valid_response(response, schema):
     """
     Returns True if the response validates with the schema, False otherwise
@@ -39,7 +179,7 @@ def is_valid_response(response, schema):
     :returns: True if the response validates with the schema, False otherwise
     """
     try:
-        validate(response, schema, format_checker=FormatChecker())
+        get_validator(schema).validate(response)
         return True
     except Exception as e:
         log.warning("Response is not valid: %s" % (e,))
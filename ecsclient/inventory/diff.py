@@ -0,0 +1,136 @@
+# Standard lib imports
+import collections
+import logging
+
+# Third party imports
+import six
+
+# Project level imports
+from ecsclient.common.exceptions import ECSClientException
+from ecsclient.inventory.snapshot import SECTIONS, Snapshot
+
+log = logging.getLogger(__name__)
+
+# Categories of the changed fields, per section. Object user records only
+# hold the user id and namespace, so their lock state is not tracked
+CATEGORIES = {
+    'buckets': {'block_size': 'quota', 'notification_size': 'quota', 'owner': 'owner', 'retention': 'retention',
+                'vpool': 'replication_group', 'is_stale_allowed': 'access', 'fs_access_enabled': 'access'},
+    'namespaces': {'default_data_services_vpool': 'replication_group', 'allowed_vpools_list': 'replication_group',
+                   'disallowed_vpools_list': 'replication_group', 'namespace_admins': 'owner'},
+}
+
+
+class Change(collections.namedtuple('Change', 'section key kind fields')):
+    """
+    A difference between two snapshots. ``section`` is the inventory
+    section, ie 'buckets', ``key`` the record key, ``kind`` one of
+    'created', 'deleted' or 'modified' and ``fields`` a dict of the changed
+    field names to (old, new) value pairs. Fields of created and deleted
+    records are left out.
+    """
+    __slots__ = ()
+
+    @property
+    def categories(self):
+        """
+        The categories of the changed fields, ie {'quota', 'owner'}. Other
+        fields, and every field outside buckets and namespaces, are 'other'
+        """
+        categories = CATEGORIES.get(self.section, {})
+        return frozenset(categories.get(field, 'other') for field in self.fields)
+
+
+def _ordered(snapshot, sections):
+    """
+    Yield the records of a snapshot with their merge key, checking that
+    they are sorted
+    """
+    order = dict((section, index) for index, section in enumerate(SECTIONS))
+    previous = None
+    for section, key, data in snapshot.records():
+        if section not in sections:
+            continue
+        merge_key = (order[section], key)
+        if previous is not None and merge_key < previous:
+            raise ECSClientException("Snapshot '{0}' is not sorted at {1} {2!r}".format(snapshot.path, section, key))
+        previous = merge_key
+        yield merge_key, section, key, data
+
+
+def _changed_fields(old, new, ignore):
+    fields = {}
+    for field in sorted(set(old) | set(new)):
+        if field not in ignore and old.get(field) != new.get(field):
+            fields[field] = (old.get(field), new.get(field))
+    return fields
+
+
+def diff_snapshots(old, new, sections=None, ignore=()):
+    """
+    Compare two inventory snapshots and yield a Change for every record
+    created, deleted or modified between them, in section and key order.
+
+    Both snapshots are streamed side by side and merged on their sorted
+    keys, so memory use does not depend on their size. Only the sections
+    captured in both snapshots are compared.
+
+    :param old: The older Snapshot, or the path to it
+    :param new: The newer Snapshot, or the path to it
+    :param sections: Only compare these sections (optional)
+    :param ignore: Field names whose changes are not reported (optional)
+    """
+    if isinstance(old, six.string_types):
+        old = Snapshot(old)
+    if isinstance(new, six.string_types):
+        new = Snapshot(new)
+    common = set(s['name'] for s in old.sections) & set(s['name'] for s in new.sections)
+    if sections is not None:
+        common &= set(sections)
+    ignore = frozenset(ignore)
+
+    old_records, new_records = _ordered(old, common), _ordered(new, common)
+    o, n = next(old_records, None), next(new_records, None)
+    while o is not None or n is not None:
+        if n is None or (o is not None and o[0] < n[0]):
+            yield Change(o[1], o[2], 'deleted', {})
+            o = next(old_records, None)
+        elif o is None or n[0] < o[0]:
+            yield Change(n[1], n[2], 'created', {})
+            n = next(new_records, None)
+        else:
+            fields = _changed_fields(o[3], n[3], ignore)
+            if fields:
+                yield Change(n[1], n[2], 'modified', fields)
+            o, n = next(old_records, None), next(new_records, None)
+
+
+def summarize(changes):
+    """
+    Count changes by section and kind
+
+    :param changes: Iterable of Change
+    :return: A dict of (section, kind) tuples to counts
+    """
+    counts = collections.defaultdict(int)
+    for change in changes:
+        counts[(change.section, change.kind)] += 1
+    return dict(counts)
+
+
+def format_changes(changes):
+    """
+    Render changes for humans, one line per change and field
+
+    :param changes: Iterable of Change
+    """
+    symbols = {'created': '+', 'deleted': '-', 'modified': '~'}
+    lines, count = [], 0
+    for change in changes:
+        count += 1
+        name = '/'.join(change.key) if isinstance(change.key, tuple) else change.key
+        lines.append('{0} {1} {2}'.format(symbols[change.kind], change.section, name))
+        for field, (old, new) in sorted(change.fields.items()):
+            lines.append('      {0}: {1!r} -> {2!r}'.format(field, old, new))
+    lines.append('{0} change(s).'.format(count))
+    return '\n'.join(lines)
@@ -0,0 +1,307 @@
+# Standard lib imports
+import json
+import logging
+import sqlite3
+import time
+
+# Third party imports
+import six
+
+# Project level imports
+from ecsclient.common import parallel
+from ecsclient.common.util import redact
+from ecsclient.inventory.snapshot import LIST_SECTIONS, NAMESPACE_SECTIONS, SECTIONS, list_records, namespace_details
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS records ('
+    'section TEXT NOT NULL, scope TEXT NOT NULL, name TEXT NOT NULL, data TEXT NOT NULL, '
+    'PRIMARY KEY (section, scope, name))',
+    'CREATE TABLE IF NOT EXISTS buckets ('
+    'namespace TEXT NOT NULL, name TEXT NOT NULL, owner TEXT, vpool TEXT, fs_enabled INTEGER, api_type TEXT, '
+    'PRIMARY KEY (namespace, name))',
+    'CREATE INDEX IF NOT EXISTS buckets_owner ON buckets (owner)',
+    'CREATE INDEX IF NOT EXISTS buckets_vpool ON buckets (vpool)',
+    'CREATE INDEX IF NOT EXISTS buckets_fs_enabled ON buckets (fs_enabled)',
+    'CREATE TABLE IF NOT EXISTS object_users ('
+    'namespace TEXT NOT NULL, userid TEXT NOT NULL, PRIMARY KEY (namespace, userid))',
+    'CREATE INDEX IF NOT EXISTS object_users_userid ON object_users (userid)',
+    'CREATE TABLE IF NOT EXISTS namespace_vpools ('
+    'namespace TEXT NOT NULL, vpool TEXT NOT NULL, usage TEXT NOT NULL, PRIMARY KEY (namespace, vpool, usage))',
+    'CREATE INDEX IF NOT EXISTS namespace_vpools_vpool ON namespace_vpools (vpool)',
+    'CREATE TABLE IF NOT EXISTS refreshes ('
+    'section TEXT NOT NULL, scope TEXT NOT NULL, refreshed_at REAL NOT NULL, PRIMARY KEY (section, scope))',
+)
+
+# Scope of the sections that are not split by namespace
+CLUSTER = ''
+
+
+class InventoryIndex(object):
+    """
+    Local SQLite database of the cluster inventory, indexed for the usual
+    lookups (buckets by owner, replication group or file system access,
+    namespaces by replication group...). It is filled from the API with
+    refresh(), which only refetches what is older than a given age, or
+    from an inventory snapshot with load_snapshot().
+
+    Every record is kept as JSON in the ``records`` table, keyed by section,
+    scope (the namespace of buckets and object users, '' otherwise) and
+    name. Secrets, like the VDC secret keys, are redacted as in snapshots.
+    The ``buckets``, ``object_users`` and ``namespace_vpools`` tables hold
+    the indexed columns. An instance must only be used by the
+    thread that created it.
+    """
+
+    def __init__(self, path):
+        """
+        Create a new InventoryIndex instance
+
+        :param path: Path to the database file. Created if missing
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _replace_scope(self, section, scope, records):
+        """
+        Replace every record of a section within a scope (a namespace, or
+        the whole cluster) in one transaction
+        """
+        with self._conn:
+            self._conn.execute('DELETE FROM records WHERE section = ? AND scope = ?', (section, scope))
+            if section == 'buckets':
+                self._conn.execute('DELETE FROM buckets WHERE namespace = ?', (scope,))
+            elif section == 'object_users':
+                self._conn.execute('DELETE FROM object_users WHERE namespace = ?', (scope,))
+            elif section == 'namespaces':
+                self._conn.execute('DELETE FROM namespace_vpools')
+
+            for key, data in records:
+                name = key[1] if section in NAMESPACE_SECTIONS else key
+                data = redact(data)
+                self._conn.execute('INSERT OR REPLACE INTO records (section, scope, name, data) VALUES (?, ?, ?, ?)',
+                                   (section, scope, name, json.dumps(data)))
+                self._index(section, key, data)
+            self._conn.execute('INSERT OR REPLACE INTO refreshes (section, scope, refreshed_at) VALUES (?, ?, ?)',
+                               (section, scope, time.time()))
+
+    def _drop_other_scopes(self, section, scopes):
+        """
+        Remove the records of a per-namespace section outside of the given
+        namespaces, ie of deleted namespaces
+        """
+        table = 'buckets' if section == 'buckets' else 'object_users'
+        with self._conn:
+            for (scope,) in self._conn.execute('SELECT DISTINCT scope FROM records WHERE section = ?',
+                                               (section,)).fetchall():
+                if scope not in scopes:
+                    self._conn.execute('DELETE FROM records WHERE section = ? AND scope = ?', (section, scope))
+                    self._conn.execute('DELETE FROM {0} WHERE namespace = ?'.format(table), (scope,))
+                    self._conn.execute('DELETE FROM refreshes WHERE section = ? AND scope = ?', (section, scope))
+
+    def _index(self, section, key, data):
+        if section == 'buckets':
+            self._conn.execute('INSERT OR REPLACE INTO buckets (namespace, name, owner, vpool, fs_enabled, api_type) '
+                               'VALUES (?, ?, ?, ?, ?, ?)',
+                               (key[0], key[1], data.get('owner'), data.get('vpool'),
+                                1 if data.get('fs_access_enabled') else 0, data.get('api_type')))
+        elif section == 'object_users':
+            self._conn.execute('INSERT OR REPLACE INTO object_users (namespace, userid) VALUES (?, ?)', tuple(key))
+        elif section == 'namespaces':
+            usages = [(data.get('default_data_services_vpool'), 'default')]
+            usages += [(vpool, 'allowed') for vpool in data.get('allowed_vpools_list') or []]
+            usages += [(vpool, 'disallowed') for vpool in data.get('disallowed_vpools_list') or []]
+            for vpool, usage in usages:
+                if vpool:
+                    self._conn.execute('INSERT OR REPLACE INTO namespace_vpools (namespace, vpool, usage) '
+                                       'VALUES (?, ?, ?)', (key, vpool, usage))
+
+    def _is_fresh(self, section, scope, max_age):
+        if max_age is None:
+            return False
+        row = self._conn.execute('SELECT refreshed_at FROM refreshes WHERE section = ? AND scope = ?',
+                                 (section, scope)).fetchone()
+        return row is not None and row[0] + max_age > time.time()
+
+    def refresh(self, client, sections=SECTIONS, max_age=None, max_workers=None):
+        """
+        Fetch the inventory from the API. Buckets and object users are
+        refreshed namespace by namespace, concurrently. With ``max_age``,
+        sections (or namespaces) refreshed less than ``max_age`` seconds ago
+        are not fetched again, so that repeated refreshes are incremental.
+
+        Namespaces are indexed with their details (Namespace.get), which
+        hold the replication groups they may use.
+
+        :param client: An ECS client instance
+        :param sections: The sections to refresh, from SECTIONS
+        :param max_age: Seconds after which indexed data is refetched.
+        Defaults to refetching everything (optional)
+        :param max_workers: Maximum number of concurrent requests. Defaults
+        to the client concurrency limit (optional)
+        :return: A dict of the number of scopes refreshed per section
+        """
+        max_workers = max_workers or parallel.default_workers(client)
+        refreshed = dict((section, 0) for section in sections)
+
+        if 'namespaces' in sections and not self._is_fresh('namespaces', CLUSTER, max_age):
+            namespaces = [key for key, _ in list_records(client, 'namespaces')]
+            self._replace_scope('namespaces', CLUSTER, namespace_details(client, namespaces, max_workers))
+            refreshed['namespaces'] += 1
+        namespaces = [row[0] for row in
+                      self._conn.execute("SELECT name FROM records WHERE section = 'namespaces' ORDER BY name")]
+        if not namespaces and any(s in NAMESPACE_SECTIONS for s in sections):
+            namespaces = [key for key, _ in list_records(client, 'namespaces')]
+
+        for section in sections:
+            if section in LIST_SECTIONS and section != 'namespaces':
+                if not self._is_fresh(section, CLUSTER, max_age):
+                    self._replace_scope(section, CLUSTER, list_records(client, section))
+                    refreshed[section] += 1
+            elif section in NAMESPACE_SECTIONS:
+                call, key_field = NAMESPACE_SECTIONS[section]
+                self._drop_other_scopes(section, set(namespaces))
+                stale = [ns for ns in namespaces if not self._is_fresh(section, ns, max_age)]
+
+                def fetch(namespace):
+                    return [([namespace, six.text_type(r.get(key_field))], r) for r in call(client, namespace)]
+
+                for namespace, records, error in parallel.imap(fetch, stale, max_workers=max_workers):
+                    if error is not None:
+                        raise error
+                    self._replace_scope(section, namespace, records)
+                    refreshed[section] += 1
+
+        log.info('Refreshed inventory index {0}: {1}'.format(self.path, refreshed))
+        return refreshed
+
+    def load_snapshot(self, snapshot):
+        """
+        Replace the indexed sections captured in a snapshot with its content
+
+        :param snapshot: An ecsclient.inventory.snapshot.Snapshot
+        """
+        started = time.time()
+        for section in [s['name'] for s in snapshot.sections]:
+            if section in NAMESPACE_SECTIONS:
+                scope, records = None, []
+                for _, key, data in snapshot.records(section):
+                    if key[0] != scope and scope is not None:
+                        self._replace_scope(section, scope, records)
+                        records = []
+                    scope = key[0]
+                    records.append((list(key), data))
+                if scope is not None:
+                    self._replace_scope(section, scope, records)
+                scopes = set(row[0] for row in self._conn.execute(
+                    'SELECT scope FROM refreshes WHERE section = ? AND refreshed_at >= ?', (section, started)))
+                self._drop_other_scopes(section, scopes)
+            else:
+                self._replace_scope(section, CLUSTER, ((key, data) for _, key, data in snapshot.records(section)))
+
+    def get(self, section, key):
+        """
+        :param section: The section of the record, ie 'buckets'
+        :param key: The key of the record, ie ('namespace1', 'bucket1') for buckets
+        :return: The record, or None
+        """
+        scope, name = key if section in NAMESPACE_SECTIONS else (CLUSTER, key)
+        row = self._conn.execute('SELECT data FROM records WHERE section = ? AND scope = ? AND name = ?',
+                                 (section, scope, name)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def records(self, section):
+        """
+        Yield every record of a section, sorted by key
+
+        :param section: The section, ie 'nodes'
+        """
+        for row in self._conn.execute('SELECT data FROM records WHERE section = ? ORDER BY scope, name',
+                                      (section,)):
+            yield json.loads(row[0])
+
+    def buckets(self, namespace=None, owner=None, replication_group=None, filesystem_enabled=None,
+                api_type=None):
+        """
+        Find buckets, every filter being optional
+
+        :param namespace: Only the buckets of this namespace
+        :param owner: Only the buckets owned by this user
+        :param replication_group: Only the buckets in this replication group
+        :param filesystem_enabled: Only the buckets with (True) or without
+        (False) file system access
+        :param api_type: Only the buckets of this head type, ie 'S3'
+        :return: The list of bucket records, sorted by namespace and name
+        """
+        clauses, params = [], []
+        for column, value in (('b.namespace', namespace), ('b.owner', owner), ('b.vpool', replication_group),
+                              ('b.api_type', api_type)):
+            if value is not None:
+                clauses.append('{0} = ?'.format(column))
+                params.append(value)
+        if filesystem_enabled is not None:
+            clauses.append('b.fs_enabled = ?')
+            params.append(1 if filesystem_enabled else 0)
+
+        sql = ("SELECT r.data FROM buckets b JOIN records r "
+               "ON r.section = 'buckets' AND r.scope = b.namespace AND r.name = b.name")
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY b.namespace, b.name'
+        return [json.loads(row[0]) for row in self._conn.execute(sql, params)]
+
+    def object_users(self, namespace=None, userid=None):
+        """
+        :param namespace: Only the users of this namespace (optional)
+        :param userid: Only the users with this identifier (optional)
+        :return: The list of (namespace, userid) tuples
+        """
+        clauses, params = [], []
+        if namespace is not None:
+            clauses.append('namespace = ?')
+            params.append(namespace)
+        if userid is not None:
+            clauses.append('userid = ?')
+            params.append(userid)
+        sql = 'SELECT namespace, userid FROM object_users'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        return [tuple(row) for row in self._conn.execute(sql + ' ORDER BY namespace, userid', params)]
+
+    def namespaces_using_replication_group(self, replication_group):
+        """
+        Namespaces whose default or allowed replication groups include the
+        given one, or holding buckets in it
+
+        :param replication_group: The replication group identifier
+        :return: The sorted list of namespace names
+        """
+        rows = self._conn.execute(
+            "SELECT namespace FROM namespace_vpools WHERE vpool = ? AND usage != 'disallowed' "
+            "UNION SELECT namespace FROM buckets WHERE vpool = ? ORDER BY namespace",
+            (replication_group, replication_group))
+        return [row[0] for row in rows]
+
+    def query(self, sql, params=()):
+        """
+        Run a read-only SQL query against the index
+
+        :param sql: The SQL query
+        :param params: The query parameters
+        :return: The list of sqlite3.Row results
+        """
+        return self._conn.execute(sql, params).fetchall()
@@ -0,0 +1,243 @@
+# Standard lib imports
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+# Third party imports
+import six
+
+# Project level imports
+from ecsclient.bulk.listing import iter_buckets, iter_object_users
+from ecsclient.common import parallel
+from ecsclient.common.exceptions import ECSClientException
+from ecsclient.common.util import redact, replace_file
+
+log = logging.getLogger(__name__)
+
+FORMAT_NAME = 'ecsclient-inventory'
+FORMAT_VERSION = 2
+
+# Sections fetched with a single list call: the list call, the key of the
+# records list in its response and the record field used as key
+LIST_SECTIONS = {
+    'vdcs': (lambda client: client.vdc.list(), 'vdc', 'vdcId'),
+    'storage_pools': (lambda client: client.storage_pool.list(), 'varray', 'id'),
+    'replication_groups': (lambda client: client.replication_group.list(), 'data_service_vpool', 'id'),
+    'namespaces': (lambda client: client.namespace.list(), 'namespace', 'id'),
+    'management_users': (lambda client: client.management_user.list(), 'mgmt_user_info', 'userId'),
+    'data_stores': (lambda client: client.data_store.list(), 'data_store', 'id'),
+    'nodes': (lambda client: client.node.list(), 'node', 'nodeid'),
+}
+
+# Sections listed namespace by namespace: the records of a namespace and the
+# record field used, with the namespace, as key
+NAMESPACE_SECTIONS = {
+    'buckets': (lambda client, namespace: iter_buckets(client, namespace), 'name'),
+    'object_users': (lambda client, namespace: iter_object_users(client, namespace), 'userid'),
+}
+
+SECTIONS = ('vdcs', 'storage_pools', 'replication_groups', 'namespaces', 'buckets', 'object_users',
+            'management_users', 'data_stores', 'nodes')
+
+
+def _dumps(record):
+    return json.dumps(record, separators=(',', ':'), sort_keys=True) + '\n'
+
+
+def list_records(client, section):
+    """
+    Fetch a section of LIST_SECTIONS with its list call
+
+    :param client: An ECS client instance
+    :param section: The section, ie 'vdcs'
+    :return: A list of (key, record) pairs sorted by key
+    """
+    call, list_key, key_field = LIST_SECTIONS[section]
+    records = (call(client) or {}).get(list_key, [])
+    return sorted(((six.text_type(r.get(key_field)), r) for r in records), key=lambda record: record[0])
+
+
+def namespace_details(client, namespaces, max_workers):
+    """
+    Fetch the details of namespaces (Namespace.get) concurrently. Unlike
+    the records of the namespace list, they hold the replication groups a
+    namespace may use
+
+    :param client: An ECS client instance
+    :param namespaces: The namespace names
+    :param max_workers: Maximum number of concurrent requests
+    :return: A list of (namespace, details) pairs sorted by namespace
+    """
+    details = []
+    for namespace, info, error in parallel.imap(client.namespace.get, sorted(namespaces), max_workers=max_workers):
+        if error is not None:
+            raise error
+        details.append((namespace, info))
+    return details
+
+
+def _namespace_records(client, section, namespaces, max_workers):
+    """
+    Yield the records of a per-namespace section sorted by (namespace, key).
+    Namespaces are fetched concurrently and only a bounded window of them
+    is held in memory.
+    """
+    call, key_field = NAMESPACE_SECTIONS[section]
+
+    def fetch(namespace):
+        return sorted((([namespace, six.text_type(r.get(key_field))], r) for r in call(client, namespace)),
+                      key=lambda record: record[0])
+
+    for _, records, error in parallel.imap(fetch, sorted(namespaces), max_workers=max_workers):
+        if error is not None:
+            raise error
+        for record in records:
+            yield record
+
+
+def export_snapshot(client, path, sections=SECTIONS, max_workers=None):
+    """
+    Capture the inventory of a cluster into a snapshot file. Sections are
+    fetched in parallel and streamed to disk, each one sorted by key, so
+    that snapshots can be compared with a merge join (see
+    ecsclient.inventory.diff). Secrets, like the VDC secret keys, are
+    redacted.
+
+    The snapshot is a gzip-compressed JSON-lines file. The first line is a
+    header recording the version of the format, the endpoint, the creation
+    time and, for every section, its number of records and how many
+    seconds fetching it took:
+
+    {"format": "ecsclient-inventory", "version": 2, "endpoint": "https://...",
+     "created_at": 1500000000.0, "sections": [{"name": "vdcs", "count": 2, "elapsed": 0.05}, ...]}
+
+    Each following line is a record, grouped by section in the order of
+    the header and sorted by key within a section:
+
+    {"section": "buckets", "key": ["namespace1", "bucket1"], "data": {...}}
+
+    Keys are strings, or [namespace, name] pairs for buckets and object users.
+    Namespaces are captured with their details (Namespace.get), which hold
+    the replication groups they may use.
+
+    :param client: An ECS client instance
+    :param path: Path to the snapshot file. It is replaced atomically
+    :param sections: The sections to capture, from SECTIONS
+    :param max_workers: Maximum number of concurrent requests per section.
+    Defaults to the client concurrency limit (optional)
+    :return: The snapshot header
+    """
+    for section in sections:
+        if section not in SECTIONS:
+            raise ValueError("Unknown inventory section '{0}'".format(section))
+    sections = [s for s in SECTIONS if s in sections]
+    max_workers = max_workers or parallel.default_workers(client)
+    directory = os.path.dirname(os.path.abspath(path))
+    created_at = time.time()
+    tmp_paths = {}
+
+    namespaces = []
+    if 'namespaces' in sections or any(s in NAMESPACE_SECTIONS for s in sections):
+        namespaces = [key for key, _ in list_records(client, 'namespaces')]
+
+    def capture(section):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.ecsclient-', suffix='.section')
+        tmp_paths[section] = tmp_path
+        started = time.time()
+        count = 0
+        if section in NAMESPACE_SECTIONS:
+            records = _namespace_records(client, section, namespaces, max_workers)
+        elif section == 'namespaces':
+            records = namespace_details(client, namespaces, max_workers)
+        else:
+            records = list_records(client, section)
+        with os.fdopen(fd, 'w') as f:
+            for key, data in records:
+                f.write(_dumps({'section': section, 'key': key, 'data': redact(data)}))
+                count += 1
+        elapsed = time.time() - started
+        log.info("Captured {0} {1} in {2:.2f}s".format(count, section, elapsed))
+        return {'name': section, 'count': count, 'elapsed': round(elapsed, 3)}
+
+    try:
+        header = {'format': FORMAT_NAME,
+                  'version': FORMAT_VERSION,
+                  'endpoint': client.ecs_endpoint,
+                  'created_at': created_at,
+                  'sections': []}
+        for section, info, error in parallel.imap(capture, sections, max_workers=len(sections) or 1):
+            if error is not None:
+                raise error
+            header['sections'].append(info)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.ecsclient-', suffix='.snapshot')
+        tmp_paths['snapshot'] = tmp_path
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+            f.write(_dumps(header).encode('utf-8'))
+            for section in sections:
+                with open(tmp_paths[section], 'rb') as section_file:
+                    shutil.copyfileobj(section_file, f)
+        replace_file(tmp_path, path)
+        del tmp_paths['snapshot']
+        return header
+    finally:
+        for tmp_path in tmp_paths.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+class Snapshot(object):
+    """
+    Reader of the snapshot files written by export_snapshot(). Records are
+    streamed from disk, so snapshots larger than memory can be read.
+    """
+
+    def __init__(self, path):
+        """
+        Create a new Snapshot instance, reading the header of the file
+
+        :param path: Path to the snapshot file
+        """
+        self.path = path
+        with gzip.open(path, 'rb') as f:
+            try:
+                self.header = json.loads(f.readline().decode('utf-8'))
+            except ValueError:
+                self.header = {}
+        if self.header.get('format') != FORMAT_NAME:
+            raise ECSClientException("'{0}' is not an ecsclient inventory snapshot".format(path))
+        if self.header.get('version') != FORMAT_VERSION:
+            raise ECSClientException("Unsupported inventory snapshot version {0}".format(self.header.get('version')))
+
+    @property
+    def sections(self):
+        """
+        The captured sections, in file order, with their count and elapsed time
+        """
+        return self.header['sections']
+
+    def records(self, section=None):
+        """
+        Yield the records of the snapshot as (section, key, data) tuples,
+        sorted by key within each section. Keys of buckets and object users
+        are (namespace, name) tuples.
+
+        :param section: Only yield the records of this section (optional)
+        """
+        with gzip.open(self.path, 'rb') as f:
+            f.readline()
+            seen = False
+            for line in f:
+                record = json.loads(line.decode('utf-8'))
+                if section is not None and record['section'] != section:
+                    if seen:
+                        # Sections are contiguous
+                        return
+                    continue
+                seen = True
+                key = record['key']
+                yield record['section'], tuple(key) if isinstance(key, list) else key, record['data']
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+
+from ecsclient.common.exceptions import ECSClientException
+
+log = logging.getLogger(__name__)
+
+
+class ClientRegistry(object):
+    """
+    Process-wide pool of clients. Asking twice for a client with the same
+    configuration returns the same logged-in instance, so repeated
+    instantiations (ie, per web request) neither log in again nor open new
+    connections. Clients are reference counted, and clients nobody holds
+    are closed once they have been idle for ``idle_timeout`` seconds.
+
+    Configurations are compared by value. Dict, list and set arguments are
+    compared by their content, and other unhashable arguments are rejected.
+    """
+
+    def __init__(self, factory, idle_timeout=300):
+        """
+        Create a new ClientRegistry instance
+
+        :param factory: Callable creating a client from (version, **kwargs)
+        :param idle_timeout: Seconds an unreferenced client is kept
+        """
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self._entries = {}
+        self._keys = {}
+        self._creation_locks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def _freeze(cls, name, value):
+        # Hashable copy of an argument, tagged with its type so that ie a
+        # list and a tuple of the same items stay different configurations
+        if isinstance(value, dict):
+            return 'dict', tuple(sorted((k, cls._freeze(name, v)) for k, v in value.items()))
+        if isinstance(value, (list, tuple)):
+            return type(value).__name__, tuple(cls._freeze(name, v) for v in value)
+        if isinstance(value, (set, frozenset)):
+            return 'set', frozenset(cls._freeze(name, v) for v in value)
+        try:
+            hash(value)
+        except TypeError:
+            raise ECSClientException("Argument '{0}' of a shared client is not hashable".format(name))
+        return value
+
+    @classmethod
+    def _key(cls, version, kwargs):
+        return (version,) + tuple((name, cls._freeze(name, value)) for name, value in sorted(kwargs.items()))
+
+    def acquire(self, version, **kwargs):
+        """
+        Return the shared client for this configuration, creating and logging
+        it in if needed. Every call must be paired with release()
+
+        :param version: The required version of the ECS Management API
+        :param kwargs: The client arguments
+        """
+        key = self._key(version, kwargs)
+        with self._lock:
+            self._evict_idle()
+            client = self._reference(key)
+            if client is not None:
+                return client
+            creation_lock = self._creation_locks.setdefault(key, threading.Lock())
+
+        # Logging in happens outside the registry lock, so that it only holds
+        # up the calls asking for the same configuration
+        with creation_lock:
+            with self._lock:
+                client = self._reference(key)
+                if client is not None:
+                    return client
+            client = self.factory(version, **kwargs)
+            if client.token_endpoint and not client.token:
+                client._token_request.get_token()
+            with self._lock:
+                self._entries[key] = [client, 1, time.time()]
+                self._keys[id(client)] = key
+                self._creation_locks.pop(key, None)
+                return client
+
+    def _reference(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, client):
+        """
+        Drop a reference to a client returned by acquire()
+
+        :param client: The client
+        """
+        with self._lock:
+            entry = self._entries.get(self._keys.get(id(client)))
+            if entry is None or entry[0] is not client:
+                log.warning('Releasing a client not held by the registry')
+                return
+            entry[1] = max(0, entry[1] - 1)
+            entry[2] = time.time()
+            self._evict_idle()
+
+    def _evict_idle(self):
+        now = time.time()
+        for key, (client, refs, last_used) in list(self._entries.items()):
+            if refs == 0 and now - last_used >= self.idle_timeout:
+                log.debug('Closing idle shared client for {0}'.format(client.ecs_endpoint))
+                del self._entries[key]
+                del self._keys[id(client)]
+                client.close()
+
+    def clear(self):
+        """
+        Close every client, referenced or not
+        """
+        with self._lock:
+            for client, _, _ in self._entries.values():
+                client.close()
+            self._entries.clear()
+            self._keys.clear()
+            self._creation_locks.clear()
@@ -30,6 +30,9 @@ setup(
     author_email='ecs@dell.com',
     tests_require=read('./test-requirements.txt'),
     install_requires=read('./requirements.txt'),
+    extras_require={
+        'http2': ['httpx[http2]'],
+    },
     test_suite='nose.collector',
     zip_safe=False,
     include_package_data=True,
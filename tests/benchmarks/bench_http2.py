@@ -0,0 +1,157 @@
+"""
+Compare the default requests connection pool with the HTTP/2 adapter.
+
+Starts a local mock ECS server that speaks both HTTP/1.1 and cleartext
+HTTP/2 (prior knowledge) on the same port, runs the same concurrent
+workload through both transports and reports the number of TCP
+connections the server accepted and the call latencies.
+
+Requires the optional ``httpx[http2]`` package (which brings ``h2``).
+
+    $ PYTHONPATH=. python tests/benchmarks/bench_http2.py --threads 32 --calls 2000 --delay 0.005
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import h2.config
+import h2.connection
+import h2.events
+from six.moves import BaseHTTPServer
+
+from ecsclient.client import Client
+from ecsclient.common.http2 import HTTP2Adapter
+
+H2_PREFACE = b'PRI * HTTP/2.0'
+BODY = json.dumps({'object_bucket': [{'name': 'bucket{}'.format(i), 'namespace': 'ns1'} for i in range(20)]})
+
+
+def start_daemon(target, *args):
+    # Thread(daemon=...) is not available on Python 2
+    thread = threading.Thread(target=target, args=args)
+    thread.daemon = True
+    thread.start()
+
+
+class MockServer(object):
+    """
+    Minimal threaded server answering every request with the same JSON body
+    after ``delay`` seconds. It counts the TCP connections it accepts.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.connections = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen(512)
+        self.port = self._sock.getsockname()[1]
+        start_daemon(self._serve)
+
+    def _serve(self):
+        while True:
+            conn, addr = self._sock.accept()
+            self.connections += 1
+            start_daemon(self._handle, conn, addr)
+
+    def _handle(self, conn, addr):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if conn.recv(len(H2_PREFACE), socket.MSG_PEEK) == H2_PREFACE:
+            self._handle_h2(conn)
+        else:
+            self._handle_h1(conn, addr)
+
+    def _handle_h1(self, conn, addr):
+        server = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                time.sleep(server.delay)
+                body = BODY.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            Handler(conn, addr, None)
+        except (IOError, OSError):
+            pass
+
+    def _handle_h2(self, conn):
+        h2_conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        lock = threading.Lock()
+        h2_conn.initiate_connection()
+        conn.sendall(h2_conn.data_to_send())
+        body = BODY.encode('utf-8')
+
+        def respond(stream_id):
+            time.sleep(self.delay)
+            with lock:
+                h2_conn.send_headers(stream_id, [(':status', '200'),
+                                                 ('content-type', 'application/json'),
+                                                 ('content-length', str(len(body)))])
+                h2_conn.send_data(stream_id, body, end_stream=True)
+                conn.sendall(h2_conn.data_to_send())
+
+        while True:
+            try:
+                data = conn.recv(65535)
+            except (IOError, OSError):
+                break
+            if not data:
+                break
+            with lock:
+                events = h2_conn.receive_data(data)
+                conn.sendall(h2_conn.data_to_send())
+            for event in events:
+                if isinstance(event, h2.events.RequestReceived):
+                    start_daemon(respond, event.stream_id)
+        conn.close()
+
+
+def run(name, server, adapter, threads, calls):
+    client = Client('3', token='token', ecs_endpoint='http://127.0.0.1:{}'.format(server.port), adapter=adapter)
+    latencies = []
+
+    def call(_):
+        started = time.time()
+        client.get('object/bucket')
+        latencies.append(time.time() - started)
+
+    server.connections = 0
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(call, range(calls)))
+    elapsed = time.time() - started
+
+    latencies.sort()
+    print('{:<16} connections={:<5} calls/s={:<8.0f} p50={:.2f}ms p99={:.2f}ms'.format(
+        name, server.connections, calls / elapsed,
+        latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--delay', type=float, default=0.005, help='Server side latency in seconds')
+    args = parser.parse_args()
+
+    server = MockServer(args.delay)
+    run('requests pool', server, None, args.threads, args.calls)
+    run('http2', server, HTTP2Adapter(prior_knowledge=True), args.threads, args.calls)
+
+
+if __name__ == '__main__':
+    main()
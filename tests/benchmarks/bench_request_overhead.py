@@ -0,0 +1,60 @@
+"""
+Measure the client-side CPU cost of a call through baseclient.Client.
+
+Calls are answered by an in-process transport adapter returning a canned
+response, so the figures only include the client overhead (header and URL
+construction, payload encoding, limiter bookkeeping and requests' own
+request preparation), not network or server time.
+
+    $ PYTHONPATH=. python tests/benchmarks/bench_request_overhead.py --calls 20000
+"""
+import argparse
+import timeit
+
+import requests
+from requests.adapters import BaseAdapter
+
+from ecsclient.client import Client
+
+
+class CannedAdapter(BaseAdapter):
+    """
+    Transport adapter answering every request with the same JSON body
+    """
+
+    def send(self, request, **kwargs):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = b'{"name": "bucket1"}'
+        resp.encoding = 'utf-8'
+        resp.request = request
+        resp.url = request.url
+        return resp
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    client = Client('3', token='token', ecs_endpoint='https://127.0.0.1:4443', adapter=CannedAdapter())
+    payload = {'name': 'bucket1', 'vpool': 'urn:storageos:ReplicationGroupInfo:1:global'}
+    calls = [
+        ('GET', lambda: client.get('object/bucket/bucket1/info', params={'namespace': 'ns1'})),
+        ('POST', lambda: client.post('object/bucket', json_payload=payload)),
+        ('POST (no body)', lambda: client.post('object/bucket/bucket1/deactivate')),
+        ('PUT', lambda: client.put('object/bucket/bucket1/quota', json_payload=payload)),
+        ('DELETE', lambda: client.delete('object/bucket/bucket1')),
+    ]
+
+    for name, call in calls:
+        best = min(timeit.repeat(call, number=args.calls, repeat=args.repeat))
+        print('{:<16} {:8.1f} us/call'.format(name, best / args.calls * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Measure the JSON schema validation throughput of large list responses.
+
+Compares validating with a validator built for every call, as
+jsonschema.validate() does, with the cached validators of
+ecsclient.common.util.get_validator(), on BUCKET_LIST and OBJECT_USERS
+payloads of the given size.
+
+    $ PYTHONPATH=. python tests/benchmarks/bench_validation.py --records 10000
+"""
+import argparse
+import timeit
+
+from jsonschema import FormatChecker, validate
+
+from ecsclient import schemas
+from ecsclient.common.util import get_validator
+
+
+def bucket_list(count):
+    return {
+        'Filter': '',
+        'MaxBuckets': count,
+        'object_bucket': [{
+            'TagSet': [],
+            'id': 'ns1.bucket{0}'.format(i),
+            'global': None,
+            'vdc': None,
+            'search_metadata': {'search_enabled': False, 'max_keys': 0, 'metadata': []},
+            'remote': None,
+            'name': 'bucket{0}'.format(i),
+            'block_size': -1,
+            'retention': 0,
+            'api_type': 'S3',
+            'notification_size': -1,
+            'namespace': 'ns1',
+            'default_retention': 0,
+            'locked': False,
+            'is_encryption_enabled': 'false',
+            'is_stale_allowed': False,
+            'vpool': 'urn:storageos:ReplicationGroupInfo:1:global',
+            'fs_access_enabled': False,
+            'created': '2017-06-15T18:39:11.957Z',
+            'owner': 'user{0}'.format(i % 100)} for i in range(count)]}
+
+
+def object_users(count):
+    return {'Filter': '', 'blobuser': [{'userid': 'user{0}'.format(i), 'namespace': 'ns1'} for i in range(count)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--calls', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    payloads = [
+        ('BUCKET_LIST', schemas.BUCKET_LIST, bucket_list(args.records)),
+        ('OBJECT_USERS', schemas.OBJECT_USERS, object_users(args.records)),
+        ('OBJECT_USERS (1)', schemas.OBJECT_USERS, object_users(1)),
+    ]
+
+    for name, schema, payload in payloads:
+        records = len(payload.get('object_bucket', payload.get('blobuser')))
+        # Small responses are validated many more times to get stable figures
+        calls = args.calls if records > 1 else args.calls * 1000
+        get_validator(schema).validate(payload)
+        for mode, call in (('uncached', lambda: validate(payload, schema, format_checker=FormatChecker())),
+                           ('cached', lambda: get_validator(schema).validate(payload))):
+            best = min(timeit.repeat(call, number=calls, repeat=args.repeat)) / calls
+            print('{:<18} {:<9} {:10.3f} ms/response {:12.0f} records/s'.format(
+                name, mode, best * 1e3, records / best))
+
+
+if __name__ == '__main__':
+    main()
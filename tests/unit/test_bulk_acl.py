@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import tempfile
+
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.bulk.acl import export_acls, import_acls, normalize_acl
+from ecsclient.client import Client
+
+
+class TestBucketAcls(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestBucketAcls, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'acls.jsonl')
+
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/bucket?namespace=ns1', json={
+            'object_bucket': [{'name': 'b1'}, {'name': 'b2'}]})
+        self._register_acl('b1', [{'user': 'u2', 'permission': ['write', 'read']},
+                                  {'user': 'u1', 'permission': ['read']}])
+        self._register_acl('b2', [])
+
+    def _register_acl(self, bucket, user_acl):
+        self.requests_mock.register_uri(
+            'GET', '{0}/object/bucket/{1}/acl?namespace=ns1'.format(self.ECS_ENDPOINT, bucket),
+            json={'bucket': bucket, 'namespace': 'ns1', 'acl': {'owner': 'owner1', 'user_acl': user_acl}})
+        self.requests_mock.register_uri('PUT', '{0}/object/bucket/{1}/acl'.format(self.ECS_ENDPOINT, bucket), text='')
+
+    def test_normalize_ignores_order(self):
+        a = {'acl': {'user_acl': [{'user': 'u2', 'permission': ['write', 'read']},
+                                  {'user': 'u1', 'permission': 'read'}]}}
+        b = {'user_acl': [{'user': 'u1', 'permission': ['read']}, {'user': 'u2', 'permission': ['read', 'write']}]}
+
+        self.assertEqual(normalize_acl(a), normalize_acl(b))
+
+    def test_export(self):
+        results = list(export_acls(self.client, 'ns1', self.path))
+
+        self.assertEqual([r['status'] for r in results], ['exported', 'exported'])
+        with open(self.path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r['bucket'] for r in records], ['b1', 'b2'])
+        self.assertEqual(records[0]['acl']['user_acl'], [{'user': 'u1', 'permission': ['read']},
+                                                         {'user': 'u2', 'permission': ['read', 'write']}])
+
+    def test_import_only_updates_changed_acls(self):
+        list(export_acls(self.client, 'ns1', self.path))
+        self._register_acl('b2', [{'user': 'intruder', 'permission': ['full_control']}])
+
+        results = list(import_acls(self.client, self.path))
+
+        self.assertEqual([r['status'] for r in results], ['unchanged', 'updated'])
+        puts = [r for r in self.requests_mock.request_history if r.method == 'PUT']
+        self.assertEqual(len(puts), 1)
+        self.assertEqual(puts[0].json(), {'bucket': 'b2', 'namespace': 'ns1', 'acl': {'owner': 'owner1',
+                                                                                      'user_acl': [],
+                                                                                      'group_acl': [],
+                                                                                      'customgroup_acl': []}})
+
+    def test_import_restores_empty_acl(self):
+        list(export_acls(self.client, 'ns1', self.path))
+        self._register_acl('b2', [{'user': 'intruder', 'permission': ['full_control']}])
+        list(import_acls(self.client, self.path))
+        # The bucket now holds the ACL that was sent
+        put, = [r for r in self.requests_mock.request_history if r.method == 'PUT']
+        self._register_acl('b2', put.json()['acl']['user_acl'])
+
+        results = list(import_acls(self.client, self.path))
+
+        self.assertEqual([r['status'] for r in results], ['unchanged', 'unchanged'])
+
+    def test_import_dry_run(self):
+        list(export_acls(self.client, 'ns1', self.path))
+        self._register_acl('b1', [])
+
+        results = list(import_acls(self.client, self.path, dry_run=True))
+
+        self.assertEqual([r['status'] for r in results], ['changed', 'unchanged'])
+        self.assertFalse(any(r.method == 'PUT' for r in self.requests_mock.request_history))
@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import tempfile
+
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.bulk import buckets
+from ecsclient.bulk.buckets import load_manifest, provision_buckets
+from ecsclient.client import Client
+
+
+class TestLoadManifest(testtools.TestCase):
+
+    def setUp(self):
+        super(TestLoadManifest, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_json_manifest(self):
+        path = self._write('buckets.json', json.dumps({'buckets': [{'name': 'b1', 'retention': 60}]}))
+
+        self.assertEqual(load_manifest(path), [{'name': 'b1', 'retention': 60}])
+
+    @testtools.skipIf(buckets.yaml is None, 'PyYAML is not installed')
+    def test_yaml_manifest(self):
+        path = self._write('buckets.yaml', 'buckets:\n- name: b1\n  quota: {block_size: 10, notification_size: 8}\n')
+
+        self.assertEqual(load_manifest(path), [{'name': 'b1', 'quota': {'block_size': 10, 'notification_size': 8}}])
+
+    def test_csv_manifest(self):
+        path = self._write('buckets.csv',
+                           'name,namespace,filesystem_enabled,block_size,notification_size,retention_period,'
+                           'user_acl,metadata.team\n'
+                           'b1,ns1,true,10,8,60,"[{""user"": ""u1"", ""permission"": [""read""]}]",a\n'
+                           'b2,ns1,,,,,,\n')
+
+        self.assertEqual(load_manifest(path), [
+            {'name': 'b1',
+             'namespace': 'ns1',
+             'filesystem_enabled': True,
+             'quota': {'block_size': 10, 'notification_size': 8},
+             'retention': 60,
+             'acl': {'user_acl': [{'user': 'u1', 'permission': ['read']}]},
+             'metadata': {'team': 'a'}},
+            {'name': 'b2', 'namespace': 'ns1', 'metadata': {}}])
+
+
+class TestProvisionBuckets(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestProvisionBuckets, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/bucket', json={})
+        for name in ('b1', 'b2'):
+            for path in ('quota', 'retention', 'acl', 'owner', 'metadata?namespace=ns1'):
+                self.requests_mock.register_uri(
+                    'PUT', '{0}/object/bucket/{1}/{2}'.format(self.ECS_ENDPOINT, name, path), text='')
+            self.requests_mock.register_uri(
+                'POST', '{0}/object/bucket/{1}/owner'.format(self.ECS_ENDPOINT, name), text='')
+
+    def _spec(self, name):
+        return {'name': name,
+                'namespace': 'ns1',
+                'quota': {'block_size': 10, 'notification_size': 8},
+                'retention': 60,
+                'acl': {'default_group': 'g1'},
+                'owner': 'u1',
+                'metadata': {'team': 'a'}}
+
+    def test_steps_run_in_order(self):
+        results = list(provision_buckets(self.client, [self._spec('b1'), self._spec('b2')]))
+
+        self.assertEqual([r['status'] for r in results], ['created', 'created'])
+        self.assertEqual(list(results[0]['steps'].items()), [('create', 'created'),
+                                                             ('quota', 'set'),
+                                                             ('retention', 'set'),
+                                                             ('acl', 'set'),
+                                                             ('owner', 'set'),
+                                                             ('metadata:team', 'set')])
+        b1_paths = [r.path for r in self.requests_mock.request_history
+                    if r.path.startswith('/object/bucket/b1') or (r.text and json.loads(r.text).get('name') == 'b1')]
+        self.assertEqual(b1_paths, ['/object/bucket',
+                                    '/object/bucket/b1/quota',
+                                    '/object/bucket/b1/retention',
+                                    '/object/bucket/b1/acl',
+                                    '/object/bucket/b1/owner',
+                                    '/object/bucket/b1/metadata'])
+
+    def test_failures_are_reported_per_step(self):
+        self.requests_mock.register_uri('PUT', self.ECS_ENDPOINT + '/object/bucket/b1/quota', status_code=400,
+                                        json={'code': 1008, 'description': 'Bad quota'})
+
+        results = list(provision_buckets(self.client, [self._spec('b1'), self._spec('b2')]))
+
+        self.assertEqual(results[0]['status'], 'failed')
+        self.assertEqual(results[0]['steps']['quota'], 'failed')
+        self.assertEqual(results[0]['steps']['owner'], 'set')
+        self.assertEqual(results[0]['errors'], {'quota': 'Bad quota'})
+        self.assertEqual(results[1]['status'], 'created')
+
+    def test_metadata_keys_are_reported_per_key(self):
+        spec = dict(self._spec('b1'), metadata={'cost_center': 'c1', 'team': 'a'})
+        self.requests_mock.register_uri('PUT', self.ECS_ENDPOINT + '/object/bucket/b1/metadata?namespace=ns1',
+                                        [{'status_code': 400, 'json': {'code': 1008, 'description': 'Bad key'}},
+                                         {'text': ''}])
+
+        result, = provision_buckets(self.client, [spec])
+
+        self.assertEqual(result['steps']['metadata:cost_center'], 'failed')
+        self.assertEqual(result['steps']['metadata:team'], 'set')
+        self.assertEqual(result['errors'], {'metadata:cost_center': 'Bad key'})
+
+    def test_existing_bucket_is_configured(self):
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/bucket', status_code=400,
+                                        json={'code': 40008, 'description': 'Bucket already exists'})
+
+        result, = provision_buckets(self.client, [self._spec('b1')])
+
+        self.assertEqual(result['status'], 'exists')
+        self.assertEqual(result['steps']['metadata:team'], 'set')
+
+    def test_failed_create_skips_other_steps(self):
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/bucket', status_code=400,
+                                        json={'code': 1008, 'description': 'Bad name'})
+
+        result, = provision_buckets(self.client, [self._spec('b1')])
+
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual(set(result['steps'].values()), {'failed', 'skipped'})
+        self.assertEqual(self.requests_mock.call_count, 1)
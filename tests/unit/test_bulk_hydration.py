@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.bulk.hydration import hydrate_buckets
+from ecsclient.client import Client
+from ecsclient.common.cache import DiskCache
+
+
+class TestHydrateBuckets(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestHydrateBuckets, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+        for i in range(5):
+            url = '{0}/object/bucket/b{1}'.format(self.ECS_ENDPOINT, i)
+            self.requests_mock.register_uri('GET', url + '/info?namespace=ns1', json={'name': 'b{}'.format(i)})
+            self.requests_mock.register_uri('GET', url + '/lock?namespace=ns1', json={'isLocked': False})
+            self.requests_mock.register_uri('GET', url + '/retention?namespace=ns1', json={'period': i})
+            self.requests_mock.register_uri('GET', url + '/quota?namespace=ns1', json={'blockSize': i})
+            self.requests_mock.register_uri('GET', url + '/metadata?namespace=ns1&headType=S3',
+                                            json={'metadata': [], 'head_type': 'S3'})
+        self.buckets = [{'name': 'b{}'.format(i), 'namespace': 'ns1', 'api_type': 'S3'} for i in range(5)]
+
+    def test_records_are_merged_in_order(self):
+        records = list(hydrate_buckets(self.client, self.buckets, max_workers=4))
+
+        self.assertEqual([r['name'] for r in records], ['b0', 'b1', 'b2', 'b3', 'b4'])
+        self.assertEqual(records[3]['retention'], {'period': 3})
+        self.assertEqual(records[3]['quota'], {'blockSize': 3})
+        self.assertEqual(records[3]['metadata'], {'metadata': [], 'head_type': 'S3'})
+        self.assertEqual(records[3]['api_type'], 'S3')
+        self.assertEqual(records[3]['errors'], {})
+        self.assertEqual(self.requests_mock.call_count, 25)
+
+    def test_selected_facets_and_names(self):
+        records = list(hydrate_buckets(self.client, ['b1', 'b2'], facets=('quota',), namespace='ns1'))
+
+        self.assertEqual(records, [{'name': 'b1', 'quota': {'blockSize': 1}, 'errors': {}},
+                                   {'name': 'b2', 'quota': {'blockSize': 2}, 'errors': {}}])
+
+    def test_facet_errors_are_reported(self):
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/bucket/b1/lock?namespace=ns1',
+                                        status_code=500, json={'code': 6000, 'description': 'Boom'})
+
+        records = list(hydrate_buckets(self.client, self.buckets[:2], facets=('lock', 'quota')))
+
+        self.assertEqual(records[1]['errors'], {'lock': 'Boom'})
+        self.assertNotIn('lock', records[1])
+        self.assertIn('quota', records[1])
+
+    def test_fresh_cached_facets_are_skipped(self):
+        cache = DiskCache(os.path.join(self.tmp_dir, 'facets.cache'))
+        list(hydrate_buckets(self.client, self.buckets, facets=('info', 'quota'), cache=cache))
+        calls = self.requests_mock.call_count
+
+        records = list(hydrate_buckets(self.client, self.buckets, facets=('quota', 'retention'),
+                                       cache=DiskCache(cache.path)))
+
+        self.assertEqual(self.requests_mock.call_count - calls, 5)
+        self.assertEqual(records[2]['quota'], {'blockSize': 2})
+
+    def test_unknown_facet(self):
+        self.assertRaises(ValueError, list, hydrate_buckets(self.client, self.buckets, facets=('acl',)))
@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import tempfile
+
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.bulk.object_users import provision_object_users
+from ecsclient.client import Client
+
+
+class TestProvisionObjectUsers(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestProvisionObjectUsers, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.checkpoint = os.path.join(self.tmp_dir, 'users.journal')
+
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/users', json={})
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/user-secret-keys/user1',
+                                        json={'secret_key': 'SECRET1'})
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/user-secret-keys/user2',
+                                        json={'secret_key': 'SECRET2'})
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/user-cas/secret/user1', text='')
+
+    def _users(self):
+        return [{'user_id': 'user1', 'namespace': 'ns1', 'cas_secret': 'CAS1'},
+                {'user_id': 'user2', 'namespace': 'ns1'}]
+
+    def test_provision_runs_every_step_in_order(self):
+        results = list(provision_object_users(self.client, self._users(), max_workers=2))
+
+        self.assertEqual([r['status'] for r in results], ['created', 'created'])
+        self.assertEqual(results[0]['steps'], {'user': 'created', 'secret_key': 'created', 'cas_secret': 'set'})
+        self.assertEqual(results[1]['steps'], {'user': 'created', 'secret_key': 'created'})
+        self.assertEqual([r['secret_key'] for r in results], ['SECRET1', 'SECRET2'])
+
+        user1_calls = [r.path for r in self.requests_mock.request_history
+                       if 'user1' in r.path or json.loads(r.text).get('user') == 'user1']
+        self.assertEqual(user1_calls, ['/object/users',
+                                       '/object/user-secret-keys/user1',
+                                       '/object/user-cas/secret/user1'])
+
+    def test_existing_user_is_a_success(self):
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/users', status_code=400,
+                                        json={'code': 1015, 'description': 'Resource already exists'})
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/user-secret-keys/user2/ns1',
+                                        json={'secret_key_1': 'OLD2', 'secret_key_2': ''})
+
+        results = list(provision_object_users(self.client, self._users()[1:]))
+
+        self.assertEqual(results[0]['status'], 'exists')
+        self.assertEqual(results[0]['steps'], {'user': 'exists', 'secret_key': 'exists'})
+        self.assertEqual(results[0]['secret_key'], 'OLD2')
+
+    def test_failure_is_reported_per_user(self):
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/user-secret-keys/user1',
+                                        status_code=500, json={'code': 6000, 'description': 'Boom'})
+
+        results = list(provision_object_users(self.client, self._users()))
+
+        self.assertEqual(results[0]['status'], 'failed')
+        self.assertEqual(results[0]['failed_step'], 'secret_key')
+        self.assertEqual(results[0]['steps'], {'user': 'created'})
+        self.assertEqual(results[1]['status'], 'created')
+
+    def test_resume_from_checkpoint(self):
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/user-secret-keys/user2',
+                                        status_code=500, json={'code': 6000, 'description': 'Boom'})
+        list(provision_object_users(self.client, self._users(), checkpoint=self.checkpoint))
+
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/user-secret-keys/user2',
+                                        json={'secret_key': 'SECRET2'})
+        calls = self.requests_mock.call_count
+        results = list(provision_object_users(self.client, self._users(), checkpoint=self.checkpoint))
+
+        self.assertEqual([r['status'] for r in results], ['skipped', 'created'])
+        self.assertEqual(self.requests_mock.call_count - calls, 2)
+
+        with open(self.checkpoint) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([(r['key'], r['status']) for r in records],
+                         [('ns1/user1', 'created'), ('ns1/user2', 'failed'), ('ns1/user2', 'created')])
+        self.assertFalse(any('SECRET' in json.dumps(r) for r in records))
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.bulk.quota_report import format_report, utilization, worst_offenders
+from ecsclient.client import Client
+from ecsclient.common.cache import DiskCache
+
+
+class TestQuotaReport(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestQuotaReport, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/namespaces/namespace/ns1/quota',
+                                        json={'blockSize': 1000, 'notificationSize': 800, 'namespace': 'ns1'})
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/billing/namespace/ns1/info',
+                                        json={'total_size_in_gb': 500.0, 'namespace': 'ns1'})
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/bucket?namespace=ns1', json={
+            'object_bucket': [{'name': 'b1', 'block_size': 100, 'notification_size': 80},
+                              {'name': 'b2', 'block_size': -1, 'notification_size': -1},
+                              {'name': 'b3', 'block_size': 10, 'notification_size': 5}]})
+        for name, used in (('b1', 95.0), ('b2', 1000.0), ('b3', 6.0)):
+            self.requests_mock.register_uri(
+                'GET', '{0}/object/billing/buckets/ns1/{1}/info'.format(self.ECS_ENDPOINT, name),
+                json={'total_size_in_gb': used, 'name': name, 'namespace': 'ns1'})
+
+    def test_utilization_joins_quota_and_billing(self):
+        records = list(utilization(self.client, ['ns1']))
+
+        self.assertEqual([(r['kind'], r['name']) for r in records],
+                         [('namespace', 'ns1'), ('bucket', 'b1'), ('bucket', 'b2'), ('bucket', 'b3')])
+        self.assertEqual(records[0]['block_used_pct'], 50.0)
+        self.assertEqual(records[1]['block_used_pct'], 95.0)
+        self.assertEqual(records[1]['notification_used_pct'], 118.75)
+        self.assertIsNone(records[2]['block_used_pct'])
+
+    def test_worst_offenders(self):
+        ranked = worst_offenders(utilization(self.client, ['ns1']), limit=2)
+
+        self.assertEqual([r['name'] for r in ranked], ['b1', 'b3'])
+        self.assertIn('ns1/b1', format_report(ranked))
+
+    def test_threshold(self):
+        ranked = worst_offenders(utilization(self.client, ['ns1']), threshold=100)
+
+        self.assertEqual([r['name'] for r in ranked], ['b1', 'b3'])
+
+    def test_cached_entities_are_not_refetched(self):
+        path = os.path.join(self.tmp_dir, 'quota.cache')
+        list(utilization(self.client, ['ns1'], cache=DiskCache(path)))
+        calls = self.requests_mock.call_count
+
+        records = list(utilization(self.client, ['ns1'], cache=DiskCache(path)))
+
+        # Only the bucket list is fetched again
+        self.assertEqual(self.requests_mock.call_count - calls, 1)
+        self.assertEqual(records[1]['block_used_pct'], 95.0)
+
+    def test_stale_entities_are_refetched(self):
+        path = os.path.join(self.tmp_dir, 'quota.cache')
+        list(utilization(self.client, ['ns1'], cache=DiskCache(path)))
+        calls = self.requests_mock.call_count
+
+        list(utilization(self.client, ['ns1'], cache=DiskCache(path, ttl=0)))
+
+        self.assertEqual(self.requests_mock.call_count - calls, calls)
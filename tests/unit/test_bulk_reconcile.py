@@ -0,0 +1,93 @@
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.bulk.reconcile import Change, apply, fetch_state, format_plan, plan
+from ecsclient.client import Client
+
+
+class TestReconcile(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+    NAMESPACE_URL = ECS_ENDPOINT + '/object/namespaces/namespace/'
+
+    def setUp(self):
+        super(TestReconcile, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+
+        self.requests_mock.register_uri('GET', self.NAMESPACE_URL + 'ns1', json={
+            'name': 'ns1',
+            'namespace_admins': 'admin1, admin2',
+            'allowed_vpools_list': ['rg1', 'rg2'],
+            'default_data_services_vpool': 'rg1'})
+        self.requests_mock.register_uri('GET', self.NAMESPACE_URL + 'ns1/quota', json={
+            'blockSize': 100, 'notificationSize': 80, 'namespace': 'ns1'})
+        self.requests_mock.register_uri('GET', self.NAMESPACE_URL + 'ns1/retention', json={
+            'retention_class': [{'name': 'short', 'period': 60}, {'name': 'long', 'period': 3600}]})
+        self.requests_mock.register_uri('GET', self.NAMESPACE_URL + 'ns2', status_code=400,
+                                        json={'code': 1004, 'description': 'Not found'})
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/bucket/b1/info?namespace=ns1', json={
+            'name': 'b1', 'owner': 'user1', 'block_size': 10, 'notification_size': 8, 'default_retention': 0})
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/bucket/b2/info?namespace=ns1',
+                                        status_code=404, text='')
+
+        self.desired = {
+            'namespaces': [{'name': 'ns1',
+                            'namespace_admins': 'admin2,admin1',
+                            'allowed_vpools_list': ['rg2', 'rg3'],
+                            'default_data_services_vpool': 'rg1',
+                            'quota': {'block_size': 100, 'notification_size': 80},
+                            'retention_classes': {'short': 60, 'long': 7200, 'new': 10}},
+                           {'name': 'ns2',
+                            'default_data_services_vpool': 'rg1'}],
+            'buckets': [{'name': 'b1', 'namespace': 'ns1', 'owner': 'user1',
+                         'quota': {'block_size': 20, 'notification_size': 8}},
+                        {'name': 'b2', 'namespace': 'ns1', 'replication_group': 'rg1', 'retention': 60}]}
+
+    def test_plan_contains_only_changes(self):
+        changes = plan(self.desired, fetch_state(self.client, self.desired))
+
+        self.assertEqual([(c.kind, c.key, c.action) for c in changes], [
+            ('namespace', 'ns1', 'update'),
+            ('namespace', 'ns1', 'update_retention_class'),
+            ('namespace', 'ns1', 'create_retention_class'),
+            ('namespace', 'ns2', 'create'),
+            ('bucket', ('ns1', 'b1'), 'set_quota'),
+            ('bucket', ('ns1', 'b2'), 'create'),
+            ('bucket', ('ns1', 'b2'), 'set_retention')])
+        self.assertEqual(dict(changes[0].fields), {'allowed_vpools_list': (['rg1', 'rg2'], ['rg2', 'rg3'])})
+        self.assertEqual(dict(changes[4].fields), {'block_size': (10, 20), 'notification_size': (8, 8)})
+        self.assertIn('~ bucket ns1/b1: set_quota', format_plan(changes))
+
+    def test_no_changes(self):
+        desired = {'namespaces': [], 'buckets': [{'name': 'b1', 'namespace': 'ns1', 'owner': 'user1'}]}
+
+        changes = plan(desired, fetch_state(self.client, desired))
+
+        self.assertEqual(changes, [])
+        self.assertEqual(format_plan(changes), 'No changes.')
+
+    def test_apply_sends_only_changed_fields(self):
+        self.requests_mock.register_uri('PUT', self.NAMESPACE_URL + 'ns1', text='')
+        changes = [Change('namespace', 'ns1', 'update', {'allowed_vpools_list': (['rg1', 'rg2'], ['rg2', 'rg3'])})]
+
+        results = list(apply(self.client, changes))
+
+        self.assertEqual([r['status'] for r in results], ['applied'])
+        payload = self.requests_mock.last_request.json()
+        self.assertEqual(payload['vpools_added_to_allowed_vpools_list'], ['rg3'])
+        self.assertEqual(payload['vpools_removed_from_allowed_vpools_list'], ['rg1'])
+        self.assertIsNone(payload['namespace_admins'])
+
+    def test_failed_change_skips_the_rest_of_the_entity(self):
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/bucket', status_code=400,
+                                        json={'code': 1008, 'description': 'Bad bucket'})
+        self.requests_mock.register_uri('PUT', self.ECS_ENDPOINT + '/object/bucket/b1/retention', text='')
+        changes = [Change('bucket', ('ns1', 'b2'), 'create', {'replication_group': (None, 'rg1')}),
+                   Change('bucket', ('ns1', 'b2'), 'set_retention', {'retention': (None, 60)}),
+                   Change('bucket', ('ns1', 'b1'), 'set_retention', {'retention': (0, 60)})]
+
+        results = list(apply(self.client, changes))
+
+        self.assertEqual([r['status'] for r in results], ['failed', 'skipped', 'applied'])
+        self.assertEqual(results[0]['error'], 'Bad bucket')
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import stat
+import tempfile
+
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.bulk.secret_keys import JsonLinesSink, rotate_secret_keys
+from ecsclient.client import Client
+
+
+class TestRotateSecretKeys(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestRotateSecretKeys, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.sink_path = os.path.join(self.tmp_dir, 'keys.jsonl')
+        self.checkpoint = os.path.join(self.tmp_dir, 'rotation.journal')
+
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/users/ns1', json={
+            'blobuser': [{'userid': 'user{}'.format(i), 'namespace': 'ns1'} for i in range(1, 4)]})
+        self._register_keys('user1', 'OLD1', '')
+        self._register_keys('user2', 'OLD2', 'NEWER2')
+        self._register_keys('user3', '', '')
+        for i in range(1, 4):
+            self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/user-secret-keys/user{}'.format(i),
+                                            json={'secret_key': 'NEW{}'.format(i), 'key_timestamp': 'now'})
+
+    def _register_keys(self, user_id, key1, key2):
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/user-secret-keys/{}/ns1'.format(user_id),
+                                        json={'secret_key_1': key1, 'secret_key_2': key2})
+
+    def _rotate(self, **kwargs):
+        sink = JsonLinesSink(self.sink_path)
+        try:
+            return list(rotate_secret_keys(self.client, 'ns1', sink, expiry_time=30, checkpoint=self.checkpoint,
+                                           **kwargs))
+        finally:
+            sink.close()
+
+    def _sink(self):
+        with open(self.sink_path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_rotate_namespace(self):
+        results = self._rotate()
+
+        self.assertEqual([(r['user_id'], r['status']) for r in results],
+                         [('user1', 'rotated'), ('user2', 'in_window'), ('user3', 'rotated')])
+        self.assertEqual([(c['user_id'], c['secret_key']) for c in self._sink()],
+                         [('user1', 'NEW1'), ('user3', 'NEW3')])
+        self.assertEqual(stat.S_IMODE(os.stat(self.sink_path).st_mode), 0o600)
+
+        creates = [r for r in self.requests_mock.request_history if r.method == 'POST']
+        # The previous key only gets an expiry when there is one
+        self.assertEqual(creates[0].json(), {'namespace': 'ns1', 'existing_key_expiry_time_mins': 30})
+        self.assertEqual(creates[1].json(), {'namespace': 'ns1'})
+
+    def test_resume_skips_rotated_users(self):
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/user-secret-keys/user3',
+                                        status_code=500, json={'code': 6000, 'description': 'Boom'})
+        results = self._rotate()
+        self.assertEqual(results[2]['status'], 'failed')
+
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/user-secret-keys/user3',
+                                        json={'secret_key': 'NEW3'})
+        results = self._rotate()
+
+        # user2 was only in its window, it is checked again
+        self.assertEqual([r['status'] for r in results], ['skipped', 'in_window', 'rotated'])
+        self.assertEqual([c['user_id'] for c in self._sink()], ['user1', 'user3'])
+        with open(self.checkpoint) as f:
+            self.assertNotIn('NEW', f.read())
+
+    def test_rotate_given_users_with_rate_limit(self):
+        results = self._rotate(users=['user1'], rate=100)
+
+        self.assertEqual([r['user_id'] for r in results], ['user1'])
+        self.assertFalse(any(r.path == '/object/users/ns1' for r in self.requests_mock.request_history))
+
+    def test_created_keys_are_saved_when_the_run_stops(self):
+        sink = JsonLinesSink(self.sink_path)
+        results = rotate_secret_keys(self.client, 'ns1', sink, expiry_time=30, checkpoint=self.checkpoint)
+        self.assertEqual(next(results)['user_id'], 'user1')
+        # Stopping after the first result still saves the keys created by
+        # the workers in flight
+        results.close()
+        sink.close()
+
+        self.assertEqual(sorted(c['user_id'] for c in self._sink()), ['user1', 'user3'])
+        results = self._rotate()
+        self.assertEqual([r['status'] for r in results], ['skipped', 'in_window', 'skipped'])
@@ -0,0 +1,106 @@
+import mock
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.bulk.teardown import plan_teardown, teardown
+from ecsclient.client import Client
+from ecsclient.common.deadline import deadline
+from ecsclient.common.exceptions import DeadlineExceeded
+
+
+class TestTeardown(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestTeardown, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/bucket?namespace=ns1', [
+            {'json': {'object_bucket': [{'name': 'b1', 'owner': 'user1'}, {'name': 'b2', 'owner': 'user1'}],
+                      'NextMarker': 'b2'}},
+            {'json': {'object_bucket': [{'name': 'b3', 'owner': 'user2'}]}}])
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/users/ns1', json={
+            'blobuser': [{'userid': 'user1', 'namespace': 'ns1'},
+                         {'userid': 'user2', 'namespace': 'ns1'},
+                         {'userid': 'user3', 'namespace': 'ns1'}]})
+        for bucket in ('b1', 'b2', 'b3'):
+            self.requests_mock.register_uri(
+                'POST', '{0}/object/bucket/{1}/deactivate?namespace=ns1'.format(self.ECS_ENDPOINT, bucket), text='')
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/users/deactivate', text='')
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/namespaces/namespace/ns1/deactivate',
+                                        text='')
+
+    def test_plan(self):
+        graph = plan_teardown(self.client, 'ns1')
+
+        self.assertEqual(graph[('user', 'user1')], {('bucket', 'b1'), ('bucket', 'b2')})
+        self.assertEqual(graph[('user', 'user3')], set())
+        self.assertEqual(len(graph[('namespace', 'ns1')]), 6)
+        self.assertEqual(self.requests_mock.request_history[1].qs['marker'], ['b2'])
+
+    def test_dependencies_are_deleted_first(self):
+        results = list(teardown(self.client, 'ns1', max_workers=4))
+
+        self.assertEqual(len(results), 7)
+        self.assertTrue(all(r['status'] == 'deleted' for r in results))
+        self.assertEqual(results[-1]['kind'], 'namespace')
+        self.assertEqual(results[-1]['done'], results[-1]['total'])
+        order = [(r['kind'], r['name']) for r in results]
+        self.assertLess(order.index(('bucket', 'b3')), order.index(('user', 'user2')))
+
+    @mock.patch('ecsclient.bulk.teardown.time.sleep')
+    def test_referenced_resource_is_retried(self, mock_sleep):
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/namespaces/namespace/ns1/deactivate', [
+            {'status_code': 400, 'json': {'code': 1020, 'description': 'Resource is being referenced'}},
+            {'status_code': 400, 'json': {'code': 1020, 'description': 'Resource is being referenced'}},
+            {'text': ''}])
+
+        results = list(teardown(self.client, 'ns1'))
+
+        self.assertEqual(results[-1]['status'], 'deleted')
+        self.assertEqual(results[-1]['attempts'], 3)
+        self.assertEqual([c[0][0] for c in mock_sleep.call_args_list], [1.0, 2.0])
+
+    def test_failure_skips_dependents(self):
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/bucket/b3/deactivate?namespace=ns1',
+                                        status_code=500, json={'code': 6000, 'description': 'Boom'})
+
+        results = dict(((r['kind'], r['name']), r) for r in teardown(self.client, 'ns1'))
+
+        self.assertEqual(results[('bucket', 'b3')]['status'], 'failed')
+        self.assertEqual(results[('user', 'user2')]['status'], 'skipped')
+        self.assertEqual(results[('namespace', 'ns1')]['status'], 'skipped')
+        self.assertEqual(results[('user', 'user1')]['status'], 'deleted')
+
+    @mock.patch('ecsclient.bulk.teardown.time.sleep')
+    def test_retry_delay_is_capped_by_the_deadline(self, mock_sleep):
+        self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/namespaces/namespace/ns1/deactivate',
+                                        status_code=400,
+                                        json={'code': 1020, 'description': 'Resource is being referenced'})
+
+        with deadline(5):
+            results = list(teardown(self.client, 'ns1', backoff=10))
+
+        self.assertEqual(results[-1]['status'], 'failed')
+        self.assertTrue(mock_sleep.called)
+        self.assertTrue(all(c[0][0] <= 5 for c in mock_sleep.call_args_list))
+
+    def test_nodes_left_after_the_deadline_are_skipped(self):
+        results = []
+        with deadline() as d:
+            def cancel(request, context):
+                d.cancel()
+                return ''
+
+            self.requests_mock.register_uri('POST', self.ECS_ENDPOINT + '/object/users/deactivate', text=cancel)
+            graph = plan_teardown(self.client, 'ns1')
+            with super(testtools.TestCase, self).assertRaises(DeadlineExceeded):
+                for result in teardown(self.client, 'ns1', graph=graph, max_workers=1):
+                    results.append(result)
+
+        self.assertEqual(len(results), 7)
+        self.assertEqual(results[-1]['done'], results[-1]['total'])
+        self.assertEqual(results[-1]['kind'], 'namespace')
+        self.assertEqual(results[-1]['status'], 'skipped')
@@ -1,5 +1,10 @@
 import unittest
-from ecsclient.common.util import get_formatted_time_string
+
+import mock
+
+from ecsclient import schemas
+from ecsclient.common import util
+from ecsclient.common.util import get_formatted_time_string, get_validator, is_valid_response, response_schema
 
 
 class TestCommonFunctions(unittest.TestCase):
@@ -19,3 +24,28 @@ class TestCommonFunctions(unittest.TestCase):
     def test_should_throw_value_error(self):
             self.assertRaises(ValueError,
                               get_formatted_time_string, 2014, 11, 18, 'abc')
+
+    def test_validators_are_cached(self):
+        self.assertIs(get_validator(schemas.OBJECT_USERS), get_validator(schemas.OBJECT_USERS))
+        self.assertIsNot(get_validator(schemas.OBJECT_USERS), get_validator(schemas.BUCKET_LIST))
+
+    def test_validator_cache_is_bounded(self):
+        with mock.patch.object(util, '_MAX_VALIDATORS', 2), mock.patch.object(util, '_validators', {}):
+            for schema in (schemas.OBJECT_USERS, schemas.BUCKET_LIST, {'type': 'object'}):
+                get_validator(schema)
+
+            self.assertEqual(len(util._validators), 1)
+
+    def test_is_valid_response(self):
+        self.assertTrue(is_valid_response({'blobuser': [{'userid': 'u1', 'namespace': 'ns1'}]},
+                                          schemas.OBJECT_USERS))
+        self.assertFalse(is_valid_response({'blobuser': [{'namespace': 'ns1'}]}, schemas.OBJECT_USERS))
+        self.assertFalse(is_valid_response({}, {'type': 'no-such-type'}))
+
+    def test_response_schema(self):
+        self.assertIs(response_schema('GET', 'object/bucket?namespace=ns1'), schemas.BUCKET_LIST)
+        self.assertIs(response_schema('GET', 'object/users/ns1'), schemas.OBJECT_USERS)
+        self.assertIs(response_schema('GET', 'object/users/user1/info'), schemas.OBJECT_USER)
+        self.assertIs(response_schema('GET', 'object/vdcs/vdc/list'), schemas.VDCS)
+        self.assertIsNone(response_schema('POST', 'object/bucket'))
+        self.assertIsNone(response_schema('GET', 'object/unknown'))
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.client import Client
+from ecsclient.common.concurrency import AIMDLimiter, TokenBucket
+from ecsclient.common.exceptions import ECSClientException
+from ecsclient.common.parallel import imap
+
+
+class TestAIMDLimiter(testtools.TestCase):
+
+    def test_limit_increases_when_utilized(self):
+        limiter = AIMDLimiter(initial_limit=2, max_limit=4)
+
+        limiter.acquire()
+        limiter.release(latency=0.01)
+
+        self.assertEqual(limiter.limit, 3)
+        self.assertEqual(limiter.inflight, 0)
+
+    def test_limit_does_not_exceed_max(self):
+        limiter = AIMDLimiter(initial_limit=2, max_limit=2)
+
+        limiter.acquire()
+        limiter.release(latency=0.01)
+
+        self.assertEqual(limiter.limit, 2)
+
+    def test_limit_decreases_on_drop(self):
+        limiter = AIMDLimiter(initial_limit=10, backoff_ratio=0.5)
+
+        limiter.acquire()
+        limiter.release(dropped=True)
+
+        self.assertEqual(limiter.limit, 5)
+
+    def test_slow_response_is_a_drop(self):
+        limiter = AIMDLimiter(initial_limit=10, backoff_ratio=0.5, latency_threshold=1.0)
+
+        limiter.acquire()
+        limiter.release(latency=2.0)
+
+        self.assertEqual(limiter.limit, 5)
+
+    def test_limit_never_below_min(self):
+        limiter = AIMDLimiter(initial_limit=2, min_limit=2, backoff_ratio=0.5)
+
+        limiter.acquire()
+        limiter.release(dropped=True)
+
+        self.assertEqual(limiter.limit, 2)
+
+    def test_acquire_blocks_at_limit(self):
+        limiter = AIMDLimiter(initial_limit=1, max_limit=1)
+
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire(timeout=0.01))
+
+        threading.Timer(0.05, limiter.release).start()
+        self.assertTrue(limiter.acquire(timeout=5))
+
+    def test_invalid_backoff_ratio(self):
+        self.assertRaises(ECSClientException, AIMDLimiter, backoff_ratio=1.5)
+
+
+class TestTokenBucket(testtools.TestCase):
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=100, burst=2)
+
+        self.assertTrue(bucket.acquire(timeout=0))
+        self.assertTrue(bucket.acquire(timeout=0))
+        self.assertFalse(bucket.acquire(timeout=0))
+
+        start = time.time()
+        self.assertTrue(bucket.acquire())
+        self.assertGreater(time.time() - start, 0.001)
+
+    def test_invalid_rate(self):
+        self.assertRaises(ECSClientException, TokenBucket, 0)
+
+
+class TestClientLimiter(testtools.TestCase):
+
+    TEST_URL = 'http://127.0.0.1:4443/hi'
+
+    def setUp(self):
+        super(TestClientLimiter, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.limiter = AIMDLimiter(initial_limit=4, max_limit=8, backoff_ratio=0.5)
+        self.client = Client('3',
+                             token='token',
+                             ecs_endpoint='http://127.0.0.1:4443',
+                             limiter=self.limiter,
+                             rate_limit=1000)
+
+    def test_success_releases_slot(self):
+        self.requests_mock.register_uri('GET', self.TEST_URL, text='{}')
+
+        self.client.get('hi')
+
+        self.assertEqual(self.limiter.inflight, 0)
+
+    def test_overload_decreases_limit(self):
+        self.requests_mock.register_uri('GET', self.TEST_URL, status_code=503)
+
+        self.assertRaises(ECSClientException, self.client.get, 'hi')
+
+        self.assertEqual(self.limiter.inflight, 0)
+        self.assertEqual(self.limiter.limit, 2)
+
+    def test_client_error_is_not_a_drop(self):
+        self.requests_mock.register_uri('GET', self.TEST_URL, status_code=404)
+
+        self.assertRaises(ECSClientException, self.client.get, 'hi')
+
+        self.assertEqual(self.limiter.limit, 4)
+
+
+class TestParallel(testtools.TestCase):
+
+    def test_imap_preserves_order_and_captures_errors(self):
+        def func(i):
+            if i == 3:
+                raise ValueError('boom')
+            time.sleep(0.001 * (10 - i))
+            return i * 2
+
+        results = list(imap(func, range(10), max_workers=3))
+
+        self.assertEqual([item for item, _, _ in results], list(range(10)))
+        self.assertEqual(results[2][1], 4)
+        self.assertIsInstance(results[3][2], ValueError)
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import mock
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.client import Client
+from ecsclient.common.concurrency import AIMDLimiter
+from ecsclient.common.deadline import Deadline, activate, current_deadline, deadline
+from ecsclient.common.exceptions import DeadlineExceeded
+from ecsclient.common.parallel import imap
+
+
+class TestDeadline(testtools.TestCase):
+
+    def test_timeout_is_shrunk_to_remaining_budget(self):
+        d = Deadline(1.0)
+
+        self.assertLessEqual(d.timeout(15.0), 1.0)
+        self.assertEqual(Deadline().timeout(15.0), 15.0)
+
+    def test_expired(self):
+        d = Deadline(0)
+
+        self.assertTrue(d.expired)
+        self.assertRaises(DeadlineExceeded, d.check)
+        self.assertRaises(DeadlineExceeded, d.timeout, 15.0)
+
+    def test_cancel(self):
+        d = Deadline()
+        self.assertFalse(d.expired)
+
+        d.cancel()
+
+        self.assertTrue(d.cancelled)
+        self.assertRaises(DeadlineExceeded, d.check)
+
+    def test_nested_deadline_uses_tightest_budget(self):
+        with deadline(1.0) as outer:
+            with deadline(60.0) as inner:
+                self.assertIs(current_deadline(), inner)
+                self.assertLessEqual(inner.remaining(), 1.0)
+                outer.cancel()
+                self.assertTrue(inner.cancelled)
+            self.assertIs(current_deadline(), outer)
+        self.assertIsNone(current_deadline())
+
+
+class TestClientDeadline(testtools.TestCase):
+
+    TEST_URL = 'http://127.0.0.1:4443/hi'
+
+    def setUp(self):
+        super(TestClientDeadline, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.requests_mock.register_uri('GET', self.TEST_URL, text='{}')
+        self.client = Client('3',
+                             token='token',
+                             ecs_endpoint='http://127.0.0.1:4443',
+                             request_timeout=15.0)
+
+    def test_per_call_timeout_fits_deadline(self):
+        with mock.patch.object(self.client._session, 'request', wraps=self.client._session.request) as request:
+            with self.client.deadline(2.0):
+                self.client.get('hi')
+
+        self.assertLessEqual(request.call_args[1]['timeout'], 2.0)
+
+    def test_limiter_wait_is_taken_off_the_call_timeout(self):
+        self.client.rate_limiter = mock.Mock()
+        self.client.rate_limiter.acquire.side_effect = lambda timeout=None: time.sleep(0.2) or True
+
+        with mock.patch.object(self.client._session, 'request', wraps=self.client._session.request) as request:
+            with self.client.deadline(1.0):
+                self.client.get('hi')
+
+        self.assertLessEqual(request.call_args[1]['timeout'], 0.81)
+
+    def test_expired_deadline_fails_fast(self):
+        with self.client.deadline(0):
+            self.assertRaises(DeadlineExceeded, self.client.get, 'hi')
+
+        self.assertFalse(self.requests_mock.called)
+
+    def test_cancelled_token(self):
+        token = Deadline()
+        token.cancel()
+
+        with activate(token):
+            self.assertRaises(DeadlineExceeded, self.client.get, 'hi')
+
+    def test_deadline_while_waiting_for_limiter(self):
+        self.client.limiter = AIMDLimiter(initial_limit=1, max_limit=1)
+        self.client.limiter.acquire()
+
+        with self.client.deadline(0.05):
+            self.assertRaises(DeadlineExceeded, self.client.get, 'hi')
+
+    def test_imap_propagates_deadline_to_workers(self):
+        seen = []
+        lock = threading.Lock()
+
+        def func(item):
+            with lock:
+                seen.append(current_deadline())
+            time.sleep(0.01)
+            return item
+
+        with deadline(0.1) as d:
+            results = []
+
+            def run():
+                for result in imap(func, range(1000), max_workers=2):
+                    results.append(result)
+
+            self.assertRaises(DeadlineExceeded, run)
+
+        self.assertLess(len(results), 1000)
+        self.assertTrue(all(s is d for s in seen))
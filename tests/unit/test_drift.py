@@ -0,0 +1,94 @@
+import mock
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient import schemas
+from ecsclient.client import Client
+from ecsclient.common import drift
+from ecsclient.common.drift import DriftMonitor
+from ecsclient.common.exceptions import ECSClientException
+
+
+class TestDriftMonitor(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestDriftMonitor, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/users/ns1', json={
+            'blobuser': [{'userid': 'u1', 'namespace': 'ns1'}, {'user_id': 'u2', 'namespace': 'ns1'}]})
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/users/ns2', json={
+            'blobuser': [{'userid': 'u3', 'namespace': 'ns2'}]})
+
+    def client(self, monitor):
+        return Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT, drift_monitor=monitor)
+
+    def test_violations_are_counted_by_schema_path(self):
+        monitor = DriftMonitor(rate=1)
+        self.addCleanup(monitor.close)
+        client = self.client(monitor)
+
+        client.object_user.list('ns1')
+        client.object_user.list('ns1')
+        client.object_user.list('ns2')
+        monitor.join()
+
+        stats = monitor.stats()
+        self.assertEqual(stats['sampled'], {'OBJECT_USERS': 3})
+        self.assertEqual(stats['invalid'], {'OBJECT_USERS': 2})
+        key = ('OBJECT_USERS', 'properties/blobuser/items/required')
+        self.assertEqual(stats['violations'], {key: 2})
+        self.assertIn('userid', stats['examples'][key])
+        self.assertEqual(stats['dropped'], 0)
+
+        monitor.reset()
+        self.assertEqual(monitor.stats()['sampled'], {})
+
+    def test_sampling_rates(self):
+        monitor = DriftMonitor(rate=1, rates={'OBJECT_USERS': 0})
+        self.addCleanup(monitor.close)
+        client = self.client(monitor)
+
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/unknown', json={})
+
+        client.object_user.list('ns1')
+        client.get('object/unknown')
+        monitor.join()
+
+        self.assertEqual(monitor.stats()['sampled'], {})
+
+    def test_close_validates_queued_samples_and_stops(self):
+        monitor = DriftMonitor(rate=1)
+        client = self.client(monitor)
+
+        client.object_user.list('ns1')
+        monitor.close()
+        client.object_user.list('ns2')
+        monitor.close()
+
+        self.assertFalse(monitor._worker.is_alive())
+        self.assertEqual(monitor.stats()['sampled'], {'OBJECT_USERS': 1})
+
+    def test_client_closes_the_monitor_it_created(self):
+        client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT, drift_rate=1)
+        shared = DriftMonitor(rate=1)
+        self.addCleanup(shared.close)
+        other = self.client(shared)
+
+        client.object_user.list('ns1')
+        client.close()
+        other.close()
+
+        self.assertFalse(client.drift_monitor._worker.is_alive())
+        self.assertEqual(client.drift_monitor.stats()['sampled'], {'OBJECT_USERS': 1})
+        self.assertTrue(shared._worker.is_alive())
+        self.assertRaises(ECSClientException, Client, '3', token='token', ecs_endpoint=self.ECS_ENDPOINT,
+                          drift_monitor=shared, drift_rate=1)
+
+    def test_schema_names(self):
+        self.assertEqual(drift.SCHEMA_NAMES[id(schemas.OBJECT_USERS)], 'OBJECT_USERS')
+
+        # An alias would make the sampling rate of the schema ambiguous
+        with mock.patch.object(schemas, 'USERS_ALIAS', schemas.OBJECT_USERS, create=True):
+            self.assertRaises(ValueError, drift._schema_names)
@@ -1,5 +1,7 @@
 import json
+import os
 
+import mock
 import testtools
 from requests_mock.contrib import fixture
 from six import string_types
@@ -75,4 +77,61 @@ class TestHttp(testtools.TestCase):
 
         self.assertEqual(self.requests_mock.last_request.method, 'DELETE')
         self.assertEqual(self.requests_mock.last_request.url, self.TEST_URL)
-        self.assertEqual(self.requests_mock.last_request.headers['x-sds-auth-token'], 'token')
\ No newline at end of file
+        self.assertEqual(self.requests_mock.last_request.headers['x-sds-auth-token'], 'token')
+
+    def test_delete_request_has_no_accept_header(self):
+        self.requests_mock.register_uri('DELETE', self.TEST_URL, text=None)
+
+        self.client.delete('hi')
+
+        self.assertNotEqual(self.requests_mock.last_request.headers['Accept'], 'application/json')
+        self.assertIsNone(self.requests_mock.last_request.body)
+
+    def test_get_request_has_no_body(self):
+        self.requests_mock.register_uri('GET', self.TEST_URL, text='resp')
+
+        self.client.get('hi')
+
+        self.assertIsNone(self.requests_mock.last_request.body)
+        self.assertEqual(self.requests_mock.last_request.headers['Accept'], 'application/json')
+
+    def test_post_request_default_payload(self):
+        self.requests_mock.register_uri('POST', self.TEST_URL, text=None)
+
+        self.client.post('hi')
+
+        self.assertEqual(self.requests_mock.last_request.text, '"{}"')
+
+    def test_headers_are_rebuilt_when_token_changes(self):
+        self.requests_mock.register_uri('GET', self.TEST_URL, text='resp')
+        self.addCleanup(setattr, self.client, 'token', self.client.token)
+
+        self.assertIs(self.client._fetch_headers(), self.client._fetch_headers())
+        self.client.token = 'token2'
+        self.client.get('hi')
+
+        self.assertEqual(self.requests_mock.last_request.headers['x-sds-auth-token'], 'token2')
+
+    def test_inline_response_validation(self):
+        self.requests_mock.register_uri('GET', 'http://127.0.0.1:4443/vdc/nodes', json={'nodes': []})
+        self.addCleanup(setattr, self.client, 'validate_responses', False)
+        self.client.validate_responses = True
+
+        with mock.patch('ecsclient.baseclient.log') as log:
+            self.assertEqual(self.client.get('vdc/nodes'), {'nodes': []})
+        self.assertEqual(log.warning.call_count, 1)
+
+    def test_environment_is_read_when_the_client_is_created(self):
+        env = {'HTTPS_PROXY': 'http://proxy:3128', 'REQUESTS_CA_BUNDLE': '/etc/ssl/ecs.pem'}
+        with mock.patch.dict(os.environ, env):
+            client = Client('3', token='token', ecs_endpoint='https://127.0.0.1:4443', verify_ssl=True)
+
+        self.assertEqual(client._session.proxies.get('https'), 'http://proxy:3128')
+        self.assertEqual(client._verify, '/etc/ssl/ecs.pem')
+
+        # Later changes to the environment do not apply to the client
+        with mock.patch.dict(os.environ, {'HTTPS_PROXY': 'http://other:3128'}):
+            self.requests_mock.register_uri('GET', 'https://127.0.0.1:4443/hi', text='resp')
+            client.get('hi')
+        self.assertFalse(client._session.trust_env)
+        self.assertEqual(client._session.proxies.get('https'), 'http://proxy:3128')
@@ -0,0 +1,62 @@
+import mock
+import testtools
+
+from ecsclient.client import Client
+from ecsclient.common import http2
+from ecsclient.common.exceptions import ECSClientException
+from ecsclient.common.http2 import HTTP2Adapter
+
+
+@testtools.skipIf(http2.httpx is None, 'httpx is not installed')
+class TestHTTP2Adapter(testtools.TestCase):
+
+    def setUp(self):
+        super(TestHTTP2Adapter, self).setUp()
+        self.adapter = HTTP2Adapter()
+        self.addCleanup(self.adapter.close)
+        self.client = Client('3',
+                             token='token',
+                             ecs_endpoint='https://127.0.0.1:4443',
+                             adapter=self.adapter)
+
+    def test_request_is_sent_with_httpx(self):
+        resp = http2.httpx.Response(200, json={'key': 'value'}, headers={'Content-Type': 'application/json'})
+        with mock.patch.object(http2.httpx.Client, 'request', return_value=resp) as request:
+            body = self.client.put('hi', json_payload={'key1': 'value1'})
+
+        self.assertEqual(body, {'key': 'value'})
+        args, kwargs = request.call_args
+        self.assertEqual(args, ('PUT', 'https://127.0.0.1:4443/hi'))
+        self.assertEqual(kwargs['headers']['x-sds-auth-token'], 'token')
+        self.assertNotIn('Connection', kwargs['headers'])
+        self.assertEqual(kwargs['content'], '{"key1": "value1"}')
+
+    def test_connection_pool_is_shared(self):
+        self.assertIs(self.adapter._client(False, None), self.adapter._client(False, None))
+
+    def test_connect_error_is_translated(self):
+        with mock.patch.object(http2.httpx.Client, 'request', side_effect=http2.httpx.ConnectError('refused')):
+            with super(testtools.TestCase, self).assertRaises(ECSClientException) as error:
+                self.client.get('hi')
+
+        self.assertIn('Connection error', error.exception.message)
+
+    def test_proxies_are_refused(self):
+        request = mock.Mock(url='https://127.0.0.1:4443/hi')
+        with mock.patch.object(http2.httpx.Client, 'request') as send:
+            self.assertRaises(ECSClientException, self.adapter.send, request,
+                              proxies={'https': 'http://proxy:3128'})
+        self.assertFalse(send.called)
+
+    def test_proxies_for_other_schemes_are_ignored(self):
+        resp = http2.httpx.Response(200, json={}, headers={'Content-Type': 'application/json'})
+        with mock.patch.object(http2.httpx.Client, 'request', return_value=resp):
+            self.client._session.proxies = {'http': 'http://proxy:3128'}
+            self.assertEqual(self.client.get('hi'), {})
+
+
+class TestHTTP2AdapterMissingDependency(testtools.TestCase):
+
+    def test_missing_httpx(self):
+        with mock.patch.object(http2, 'httpx', None):
+            self.assertRaises(ECSClientException, HTTP2Adapter)
@@ -0,0 +1,79 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+import testtools
+
+from ecsclient.common.exceptions import ECSClientException
+from ecsclient.inventory.diff import diff_snapshots, format_changes, summarize
+from ecsclient.inventory.snapshot import FORMAT_NAME, FORMAT_VERSION
+
+
+class TestInventoryDiff(testtools.TestCase):
+
+    def setUp(self):
+        super(TestInventoryDiff, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def write_snapshot(self, name, records, sections=None):
+        path = os.path.join(self.tmp_dir, name)
+        names = sections or sorted(set(section for section, _, _ in records),
+                                   key=['namespaces', 'buckets', 'object_users', 'nodes'].index)
+        header = {'format': FORMAT_NAME, 'version': FORMAT_VERSION, 'endpoint': 'http://127.0.0.1:4443',
+                  'created_at': 0, 'sections': [{'name': s, 'count': 0, 'elapsed': 0} for s in names]}
+        with gzip.open(path, 'wb') as f:
+            f.write((json.dumps(header) + '\n').encode('utf-8'))
+            for section, key, data in records:
+                f.write((json.dumps({'section': section, 'key': key, 'data': data}) + '\n').encode('utf-8'))
+        return path
+
+    def test_diff(self):
+        old = self.write_snapshot('monday.jsonl.gz', [
+            ('namespaces', 'ns1', {'id': 'ns1'}),
+            ('buckets', ['ns1', 'b1'], {'name': 'b1', 'owner': 'alice', 'block_size': 10}),
+            ('buckets', ['ns1', 'b2'], {'name': 'b2', 'owner': 'alice', 'block_size': 10}),
+            ('buckets', ['ns1', 'b3'], {'name': 'b3', 'owner': 'bob', 'block_size': 10}),
+            ('object_users', ['ns1', 'alice'], {'userid': 'alice'}),
+        ])
+        new = self.write_snapshot('tuesday.jsonl.gz', [
+            ('namespaces', 'ns1', {'id': 'ns1'}),
+            ('namespaces', 'ns2', {'id': 'ns2'}),
+            ('buckets', ['ns1', 'b1'], {'name': 'b1', 'owner': 'carol', 'block_size': 20}),
+            ('buckets', ['ns1', 'b3'], {'name': 'b3', 'owner': 'bob', 'block_size': 10}),
+            ('buckets', ['ns2', 'a1'], {'name': 'a1', 'owner': 'dave', 'block_size': 5}),
+            ('object_users', ['ns1', 'alice'], {'userid': 'alice'}),
+            ('object_users', ['ns1', 'carol'], {'userid': 'carol'}),
+        ])
+
+        changes = list(diff_snapshots(old, new))
+
+        self.assertEqual([(c.section, c.key, c.kind) for c in changes],
+                         [('namespaces', 'ns2', 'created'),
+                          ('buckets', ('ns1', 'b1'), 'modified'),
+                          ('buckets', ('ns1', 'b2'), 'deleted'),
+                          ('buckets', ('ns2', 'a1'), 'created'),
+                          ('object_users', ('ns1', 'carol'), 'created')])
+        self.assertEqual(changes[1].fields, {'owner': ('alice', 'carol'), 'block_size': (10, 20)})
+        self.assertEqual(changes[1].categories, frozenset(['owner', 'quota']))
+        self.assertEqual(summarize(changes)[('buckets', 'created')], 1)
+        self.assertIn('~ buckets ns1/b1', format_changes(changes))
+        self.assertTrue(format_changes(changes).endswith('5 change(s).'))
+
+        changes = list(diff_snapshots(old, new, sections=['buckets'], ignore=['block_size']))
+        self.assertEqual(changes[0].fields, {'owner': ('alice', 'carol')})
+        self.assertEqual(len(changes), 3)
+
+    def test_sections_missing_from_a_snapshot_are_not_compared(self):
+        old = self.write_snapshot('old.jsonl.gz', [('nodes', '10.0.0.1', {'nodeid': '10.0.0.1'})])
+        new = self.write_snapshot('new.jsonl.gz', [], sections=['buckets'])
+
+        self.assertEqual(list(diff_snapshots(old, new)), [])
+
+    def test_unsorted_snapshot(self):
+        old = self.write_snapshot('old.jsonl.gz', [('nodes', 'b', {}), ('nodes', 'a', {})])
+        new = self.write_snapshot('new.jsonl.gz', [('nodes', 'a', {})])
+
+        self.assertRaises(ECSClientException, list, diff_snapshots(old, new))
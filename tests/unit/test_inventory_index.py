@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.client import Client
+from ecsclient.inventory.index import InventoryIndex
+from ecsclient.inventory.snapshot import Snapshot, export_snapshot
+
+
+class TestInventoryIndex(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestInventoryIndex, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.index = InventoryIndex(os.path.join(self.tmp_dir, 'inventory.db'))
+        self.addCleanup(self.index.close)
+
+        get = self.requests_mock.register_uri
+        get('GET', self.ECS_ENDPOINT + '/object/namespaces', json={
+            'namespace': [{'id': 'ns1', 'name': 'ns1'}, {'id': 'ns2', 'name': 'ns2'}]})
+        get('GET', self.ECS_ENDPOINT + '/object/namespaces/namespace/ns1', json={
+            'id': 'ns1', 'name': 'ns1', 'default_data_services_vpool': 'urn:rg1', 'allowed_vpools_list': ['urn:rg2']})
+        get('GET', self.ECS_ENDPOINT + '/object/namespaces/namespace/ns2', json={
+            'id': 'ns2', 'name': 'ns2', 'default_data_services_vpool': 'urn:rg2', 'allowed_vpools_list': []})
+        get('GET', self.ECS_ENDPOINT + '/object/bucket?namespace=ns1', json={
+            'object_bucket': [{'name': 'b1', 'namespace': 'ns1', 'owner': 'alice', 'vpool': 'urn:rg1',
+                               'fs_access_enabled': True, 'api_type': 'S3'},
+                              {'name': 'b2', 'namespace': 'ns1', 'owner': 'bob', 'vpool': 'urn:rg3',
+                               'fs_access_enabled': False, 'api_type': 'S3'}]})
+        get('GET', self.ECS_ENDPOINT + '/object/bucket?namespace=ns2', json={
+            'object_bucket': [{'name': 'a1', 'namespace': 'ns2', 'owner': 'alice', 'vpool': 'urn:rg2',
+                               'fs_access_enabled': False, 'api_type': 'Swift'}]})
+        get('GET', self.ECS_ENDPOINT + '/object/users/ns1', json={
+            'blobuser': [{'userid': 'alice', 'namespace': 'ns1'}, {'userid': 'bob', 'namespace': 'ns1'}]})
+        get('GET', self.ECS_ENDPOINT + '/object/users/ns2', json={
+            'blobuser': [{'userid': 'alice', 'namespace': 'ns2'}]})
+        get('GET', self.ECS_ENDPOINT + '/vdc/nodes', json={'node': [{'nodeid': '10.0.0.1'}]})
+
+    def test_refresh_and_query(self):
+        refreshed = self.index.refresh(self.client, sections=('namespaces', 'buckets', 'object_users', 'nodes'))
+
+        self.assertEqual(refreshed, {'namespaces': 1, 'buckets': 2, 'object_users': 2, 'nodes': 1})
+        self.assertEqual([(b['namespace'], b['name']) for b in self.index.buckets(owner='alice')],
+                         [('ns1', 'b1'), ('ns2', 'a1')])
+        self.assertEqual([b['name'] for b in self.index.buckets(filesystem_enabled=True)], ['b1'])
+        self.assertEqual([b['name'] for b in self.index.buckets(namespace='ns1', filesystem_enabled=False)], ['b2'])
+        self.assertEqual(self.index.namespaces_using_replication_group('urn:rg2'), ['ns1', 'ns2'])
+        self.assertEqual(self.index.namespaces_using_replication_group('urn:rg3'), ['ns1'])
+        self.assertEqual(self.index.object_users(userid='alice'), [('ns1', 'alice'), ('ns2', 'alice')])
+        self.assertEqual(self.index.get('buckets', ('ns2', 'a1'))['api_type'], 'Swift')
+        self.assertEqual(self.index.get('namespaces', 'ns1')['default_data_services_vpool'], 'urn:rg1')
+        self.assertIsNone(self.index.get('buckets', ('ns2', 'b1')))
+        self.assertEqual(list(self.index.records('nodes')), [{'nodeid': '10.0.0.1'}])
+        self.assertEqual(self.index.query('SELECT COUNT(*) FROM buckets WHERE vpool = ?', ('urn:rg1',))[0][0], 1)
+
+    def test_secrets_are_redacted(self):
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/vdcs/vdc/list', json={
+            'vdc': [{'vdcId': 'vdc1', 'vdcName': 'vdc1', 'secretKeys': 'KEY1'}]})
+        self.index.refresh(self.client, sections=('vdcs',))
+
+        self.assertEqual(self.index.get('vdcs', 'vdc1'), {'vdcId': 'vdc1', 'vdcName': 'vdc1', 'secretKeys': 'REDACTED'})
+        self.assertNotIn('KEY1', self.index.query('SELECT data FROM records WHERE section = ?', ('vdcs',))[0][0])
+
+    def test_incremental_refresh(self):
+        sections = ('namespaces', 'buckets')
+        self.index.refresh(self.client, sections=sections)
+        history = len(self.requests_mock.request_history)
+
+        self.assertEqual(self.index.refresh(self.client, sections=sections, max_age=3600),
+                         {'namespaces': 0, 'buckets': 0})
+        self.assertEqual(len(self.requests_mock.request_history), history)
+
+        # Deleted buckets and namespaces leave the index on the next refresh
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/namespaces', json={
+            'namespace': [{'id': 'ns1', 'name': 'ns1'}]})
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/bucket?namespace=ns1', json={
+            'object_bucket': [{'name': 'b1', 'namespace': 'ns1', 'owner': 'carol'}]})
+        self.index.refresh(self.client, sections=sections)
+
+        self.assertEqual([(b['namespace'], b['name'], b['owner']) for b in self.index.buckets()],
+                         [('ns1', 'b1', 'carol')])
+        self.assertEqual(self.index.buckets(owner='alice'), [])
+
+    def test_load_snapshot(self):
+        path = os.path.join(self.tmp_dir, 'inventory.jsonl.gz')
+        export_snapshot(self.client, path, sections=('namespaces', 'buckets', 'object_users'))
+
+        calls = self.requests_mock.call_count
+        self.index.load_snapshot(Snapshot(path))
+
+        self.assertEqual(self.requests_mock.call_count, calls)
+        self.assertEqual([b['name'] for b in self.index.buckets(owner='alice')], ['b1', 'a1'])
+        self.assertEqual(self.index.namespaces_using_replication_group('urn:rg2'), ['ns1', 'ns2'])
+        self.assertEqual(self.index.namespaces_using_replication_group('urn:rg1'), ['ns1'])
+        self.assertEqual(len(self.index.object_users()), 3)
@@ -0,0 +1,98 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.client import Client
+from ecsclient.common.exceptions import ECSClientException
+from ecsclient.inventory.snapshot import Snapshot, export_snapshot
+
+
+class TestInventorySnapshot(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestInventorySnapshot, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'inventory.jsonl.gz')
+
+        get = self.requests_mock.register_uri
+        get('GET', self.ECS_ENDPOINT + '/object/vdcs/vdc/list', json={
+            'vdc': [{'vdcId': 'urn:vdc2', 'vdcName': 'vdc2', 'secretKeys': 'KEYS'},
+                    {'vdcId': 'urn:vdc1', 'vdcName': 'vdc1', 'secretKeys': 'KEYS'}]})
+        get('GET', self.ECS_ENDPOINT + '/vdc/data-services/varrays', json={'varray': [{'id': 'urn:sp1'}]})
+        get('GET', self.ECS_ENDPOINT + '/vdc/data-service/vpools', json={'data_service_vpool': [{'id': 'urn:rg1'}]})
+        get('GET', self.ECS_ENDPOINT + '/object/namespaces', json={
+            'namespace': [{'id': 'ns2', 'name': 'ns2'}, {'id': 'ns1', 'name': 'ns1'}]})
+        for namespace in ('ns1', 'ns2'):
+            get('GET', '{0}/object/namespaces/namespace/{1}'.format(self.ECS_ENDPOINT, namespace), json={
+                'id': namespace, 'name': namespace, 'default_data_services_vpool': 'urn:rg1'})
+        get('GET', self.ECS_ENDPOINT + '/object/bucket?namespace=ns1', json={
+            'object_bucket': [{'name': 'b2', 'namespace': 'ns1'}, {'name': 'b1', 'namespace': 'ns1'}]})
+        get('GET', self.ECS_ENDPOINT + '/object/bucket?namespace=ns2', json={
+            'object_bucket': [{'name': 'a1', 'namespace': 'ns2'}]})
+        get('GET', self.ECS_ENDPOINT + '/object/users/ns1', json={'blobuser': [{'userid': 'u1', 'namespace': 'ns1'}]})
+        get('GET', self.ECS_ENDPOINT + '/object/users/ns2', json={'blobuser': []})
+        get('GET', self.ECS_ENDPOINT + '/vdc/users', json={'mgmt_user_info': [{'userId': 'root'}]})
+        get('GET', self.ECS_ENDPOINT + '/vdc/data-stores', json={'data_store': [{'id': '10.0.0.1'}]})
+        get('GET', self.ECS_ENDPOINT + '/vdc/nodes', json={'node': [{'nodeid': '10.0.0.1'}]})
+
+    def test_export_and_read(self):
+        header = export_snapshot(self.client, self.path)
+
+        snapshot = Snapshot(self.path)
+        self.assertEqual(snapshot.header, header)
+        self.assertEqual([(s['name'], s['count']) for s in snapshot.sections],
+                         [('vdcs', 2), ('storage_pools', 1), ('replication_groups', 1), ('namespaces', 2),
+                          ('buckets', 3), ('object_users', 1), ('management_users', 1), ('data_stores', 1),
+                          ('nodes', 1)])
+        self.assertTrue(all(s['elapsed'] >= 0 for s in snapshot.sections))
+
+        self.assertEqual([key for _, key, _ in snapshot.records('buckets')],
+                         [('ns1', 'b1'), ('ns1', 'b2'), ('ns2', 'a1')])
+        vdcs = list(snapshot.records('vdcs'))
+        self.assertEqual([key for _, key, _ in vdcs], ['urn:vdc1', 'urn:vdc2'])
+        self.assertEqual(vdcs[0][2]['secretKeys'], 'REDACTED')
+        namespaces = list(snapshot.records('namespaces'))
+        self.assertEqual([(key, data['default_data_services_vpool']) for _, key, data in namespaces],
+                         [('ns1', 'urn:rg1'), ('ns2', 'urn:rg1')])
+        self.assertEqual(len(list(snapshot.records())), 13)
+        self.assertEqual(os.listdir(self.tmp_dir), ['inventory.jsonl.gz'])
+
+    def test_export_sections(self):
+        header = export_snapshot(self.client, self.path, sections=('nodes', 'buckets'))
+
+        self.assertEqual([s['name'] for s in header['sections']], ['buckets', 'nodes'])
+        self.assertEqual([s for s, _, _ in Snapshot(self.path).records()], ['buckets'] * 3 + ['nodes'])
+
+    def test_failed_export_leaves_no_file(self):
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/vdc/nodes', status_code=500,
+                                        json={'code': 6000, 'description': 'Boom'})
+
+        self.assertRaises(ECSClientException, export_snapshot, self.client, self.path)
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_not_a_snapshot(self):
+        with gzip.open(self.path, 'wb') as f:
+            f.write(json.dumps({'format': 'something-else'}).encode('utf-8'))
+
+        self.assertRaises(ECSClientException, Snapshot, self.path)
+
+    def test_older_format_version_is_rejected(self):
+        export_snapshot(self.client, self.path, sections=('nodes',))
+        with gzip.open(self.path, 'rb') as f:
+            lines = f.read().decode('utf-8').split('\n')
+        header = json.loads(lines[0])
+        header['version'] = 1
+        with gzip.open(self.path, 'wb') as f:
+            f.write('\n'.join([json.dumps(header)] + lines[1:]).encode('utf-8'))
+
+        self.assertRaises(ECSClientException, Snapshot, self.path)
@@ -0,0 +1,75 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+import requests_mock
+import testtools
+
+from ecsclient.client import Client
+from ecsclient.common.exceptions import ECSClientException
+from ecsclient.common.recording import RecordingAdapter, ReplayAdapter, template_path
+
+
+class TestRecording(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestRecording, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'recording.jsonl.gz')
+
+        self.mock_adapter = requests_mock.Adapter()
+        self.mock_adapter.register_uri('GET', self.ECS_ENDPOINT + '/object/secret-keys',
+                                       json={'secret_key_1': 'SECRET', 'key_timestamp_1': '2017-01-01'})
+        self.mock_adapter.register_uri('GET', self.ECS_ENDPOINT + '/object/bucket',
+                                       json={'object_bucket': [{'name': 'bucket1'}]},
+                                       headers={'x-sds-auth-token': 'TOKEN'})
+
+    def _client(self, adapter):
+        return Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT, adapter=adapter)
+
+    def _record(self):
+        recorder = RecordingAdapter(self.path, adapter=self.mock_adapter)
+        client = self._client(recorder)
+        client.secret_key.get()
+        client.bucket.list('ns1')
+        recorder.close()
+
+    def test_template_path(self):
+        self.assertEqual(template_path('/vdc/data-service/vpools/urn:storageos:ReplicationGroupInfo:1:global'),
+                         '/vdc/data-service/vpools/{id}')
+        self.assertEqual(template_path('/object/bucket/bucket1/quota'), '/object/bucket/bucket1/quota')
+
+    def test_recording_redacts_credentials(self):
+        self._record()
+
+        with gzip.open(self.path, 'rb') as f:
+            records = [json.loads(line.decode('utf-8')) for line in f]
+
+        self.assertEqual(records[0]['format'], 'ecsclient-recording')
+        self.assertEqual(len(records), 3)
+        self.assertEqual(json.loads(records[1]['body'])['secret_key_1'], 'REDACTED')
+        self.assertEqual(records[2]['headers']['x-sds-auth-token'], 'REDACTED')
+        self.assertIn('namespace=ns1', records[2]['query'])
+        self.assertNotIn('SECRET', open(self.path, 'rb').read().decode('latin-1'))
+
+    def test_replay(self):
+        self._record()
+
+        client = self._client(ReplayAdapter(self.path, latency_scale=0))
+
+        self.assertEqual(client.bucket.list('ns1'), {'object_bucket': [{'name': 'bucket1'}]})
+        self.assertEqual(client.secret_key.get()['key_timestamp_1'], '2017-01-01')
+
+    def test_replay_unknown_request(self):
+        self._record()
+
+        client = self._client(ReplayAdapter(self.path, latency_scale=0))
+
+        with super(testtools.TestCase, self).assertRaises(ECSClientException) as error:
+            client.get('object/namespaces')
+        self.assertIn('No recorded response', error.exception.message)
@@ -0,0 +1,75 @@
+import json
+import pickle
+
+import mock
+import six
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.bulk.listing import iter_buckets
+from ecsclient.client import Client
+from ecsclient.common import records
+from ecsclient.common.records import BucketRecord, ObjectUserRecord, record_type
+
+
+class TestRecords(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    BUCKET = {'name': 'bucket1', 'namespace': 'ns1', 'owner': 'user1', 'api_type': 'S3', 'block_size': -1,
+              'vpool': 'urn:storageos:ReplicationGroupInfo:1:global', 'global': None, 'unknown': 'value'}
+
+    def test_record_is_a_slotted_mapping(self):
+        bucket = BucketRecord(dict(self.BUCKET))
+
+        self.assertFalse(hasattr(bucket, '__dict__'))
+        self.assertEqual(bucket['name'], 'bucket1')
+        self.assertEqual(bucket.owner, 'user1')
+        self.assertIsNone(bucket['global'])
+        self.assertEqual(bucket['unknown'], 'value')
+        self.assertNotIn('locked', bucket)
+        self.assertIsNone(bucket.get('locked'))
+        self.assertRaises(KeyError, lambda: bucket['locked'])
+        self.assertEqual(bucket, self.BUCKET)
+        self.assertEqual(bucket.to_dict(), self.BUCKET)
+        self.assertEqual(len(bucket), len(self.BUCKET))
+        self.assertEqual(pickle.loads(pickle.dumps(bucket)), bucket)
+
+    def test_records_serialize_through_to_dict(self):
+        bucket = BucketRecord(dict(self.BUCKET))
+
+        self.assertRaises(TypeError, json.dumps, bucket)
+        self.assertEqual(json.loads(json.dumps(bucket.to_dict())), self.BUCKET)
+
+    def test_repeated_strings_are_interned(self):
+        first = BucketRecord(dict(self.BUCKET, namespace=''.join(['n', 's', '1'])))
+        second = BucketRecord(dict(self.BUCKET, namespace=''.join(['n', 's', '1'])))
+
+        self.assertIs(first['namespace'], second['namespace'])
+
+    @testtools.skipUnless(six.PY2, 'Python 3 uses sys.intern')
+    def test_interned_strings_are_bounded(self):
+        with mock.patch.object(records, '_MAX_STRINGS', 2), mock.patch.object(records, '_strings', {}):
+            for namespace in (u'ns1', u'ns2', u'ns3'):
+                ObjectUserRecord({'userid': 'user1', 'namespace': namespace})
+
+            self.assertEqual(records._strings, {u'ns3': u'ns3'})
+
+    def test_record_type_from_schema(self):
+        user = ObjectUserRecord({'userid': 'user1', 'namespace': 'ns1'})
+
+        self.assertEqual(user.userid, 'user1')
+        self.assertIsNone(user._extra)
+        self.assertRaises(ValueError, record_type, 'Broken', fields=('items',))
+
+    def test_typed_listing(self):
+        requests_mock = self.useFixture(fixture.Fixture())
+        requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/bucket?namespace=ns1', json={
+            'object_bucket': [dict(self.BUCKET)], 'MaxBuckets': 1000})
+        client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+
+        buckets = list(iter_buckets(client, 'ns1', typed=True))
+
+        self.assertIsInstance(buckets[0], BucketRecord)
+        self.assertEqual(buckets[0]['owner'], 'user1')
+        self.assertIsInstance(client.bucket.list('ns1')['object_bucket'][0], dict)
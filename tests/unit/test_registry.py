@@ -0,0 +1,117 @@
+import threading
+import time
+
+import mock
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient import client as ecsclient_client
+from ecsclient.client import Client, shared_client
+from ecsclient.common.exceptions import ECSClientException
+from ecsclient.registry import ClientRegistry
+
+
+class TestClientRegistry(testtools.TestCase):
+
+    LOGIN_URL = 'http://127.0.0.1:4443/login'
+
+    def setUp(self):
+        super(TestClientRegistry, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.requests_mock.register_uri('GET', self.LOGIN_URL, headers={'X-SDS-AUTH-TOKEN': 'TOKEN'})
+        self.registry = ClientRegistry(Client, idle_timeout=60)
+        self.addCleanup(self.registry.clear)
+        self.kwargs = dict(username='someone',
+                           password='password',
+                           ecs_endpoint='http://127.0.0.1:4443',
+                           token_endpoint=self.LOGIN_URL,
+                           cache_token=False)
+
+    def test_same_configuration_shares_client(self):
+        c1 = self.registry.acquire('3', **self.kwargs)
+        c2 = self.registry.acquire('3', **self.kwargs)
+
+        self.assertIs(c1, c2)
+        self.assertEqual(c1.get_current_token(), 'TOKEN')
+        self.assertEqual(self.requests_mock.call_count, 1)
+
+    def test_different_configuration(self):
+        c1 = self.registry.acquire('3', **self.kwargs)
+        c2 = self.registry.acquire('4', **self.kwargs)
+
+        self.assertIsNot(c1, c2)
+        self.assertEqual(len(self.registry), 2)
+
+    def test_unhashable_arguments_are_compared_by_content(self):
+        registry = ClientRegistry(lambda version, **kwargs: mock.Mock(token_endpoint=None))
+        self.addCleanup(registry.clear)
+        rates = {'BUCKET_LIST': 0.1}
+        c1 = registry.acquire('3', rates=rates)
+        c2 = registry.acquire('3', rates=dict(rates))
+        c3 = registry.acquire('3', rates={'BUCKET_LIST': 0.2})
+        c4 = registry.acquire('3', rates=[('BUCKET_LIST', 0.1)])
+
+        self.assertIs(c1, c2)
+        self.assertIsNot(c1, c3)
+        self.assertIsNot(c1, c4)
+
+    def test_other_unhashable_arguments_are_rejected(self):
+        class Unhashable(object):
+            __hash__ = None
+
+        self.assertRaises(ECSClientException, self.registry.acquire, '3', extra=Unhashable(), **self.kwargs)
+
+    def test_login_does_not_block_other_configurations(self):
+        logging_in = threading.Event()
+        logged_in = threading.Event()
+
+        def factory(version, **kwargs):
+            if version == '3':
+                logging_in.set()
+                logged_in.wait(5)
+            return Client(version, **kwargs)
+
+        registry = ClientRegistry(factory)
+        self.addCleanup(registry.clear)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.acquire('3', **self.kwargs)))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        logging_in.wait(5)
+
+        started = time.time()
+        registry.acquire('4', **self.kwargs)
+        self.assertLess(time.time() - started, 1)
+
+        logged_in.set()
+        for thread in threads:
+            thread.join()
+        self.assertIs(results[0], results[1])
+        self.assertEqual(len(registry), 2)
+
+    def test_idle_client_is_evicted(self):
+        c1 = self.registry.acquire('3', **self.kwargs)
+        self.registry.release(c1)
+
+        with mock.patch.object(c1, 'close') as close:
+            with mock.patch('ecsclient.registry.time.time', return_value=10 ** 10):
+                self.registry.acquire('4', **self.kwargs)
+
+        close.assert_called_once_with()
+        self.assertEqual(len(self.registry), 1)
+
+    def test_referenced_client_is_not_evicted(self):
+        self.registry.acquire('3', **self.kwargs)
+
+        with mock.patch('ecsclient.registry.time.time', return_value=10 ** 10):
+            self.registry.acquire('4', **self.kwargs)
+
+        self.assertEqual(len(self.registry), 2)
+
+    def test_shared_client_context_manager(self):
+        self.addCleanup(ecsclient_client.registry.clear)
+
+        with shared_client('3', **self.kwargs) as c1:
+            with shared_client('3', **self.kwargs) as c2:
+                self.assertIs(c1, c2)
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import mock
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.client import Client
+from ecsclient.common.exceptions import ECSClientException
+from ecsclient.common.token_manager import TokenManager
+from ecsclient.common.token_request import TokenRequest
+from ecsclient.common.token_store import FileTokenStore, MemoryTokenStore
+
+
+class TestTokenManager(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+    LOGIN_URL = 'http://127.0.0.1:4443/login'
+    LOGOUT_URL = 'http://127.0.0.1:4443/logout'
+
+    def setUp(self):
+        super(TestTokenManager, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.requests_mock.register_uri('GET', self.LOGIN_URL, [
+            {'headers': {'X-SDS-AUTH-TOKEN': 'TOKEN-{}'.format(i)}} for i in range(10)])
+        self.requests_mock.register_uri('GET', self.LOGOUT_URL, json={'user': 'someone'})
+        self.manager = TokenManager(max_identities=2)
+
+    def _get_token(self, username):
+        return self.manager.get_token(self.ECS_ENDPOINT, self.LOGIN_URL, username, 'password')
+
+    def _logged_out_tokens(self):
+        return [r.headers['X-SDS-AUTH-TOKEN'] for r in self.requests_mock.request_history
+                if r.url == self.LOGOUT_URL]
+
+    def test_token_is_kept_per_identity(self):
+        self.assertEqual(self._get_token('user1'), 'TOKEN-0')
+        self.assertEqual(self._get_token('user2'), 'TOKEN-1')
+        self.assertEqual(self._get_token('user1'), 'TOKEN-0')
+
+        self.assertEqual(self.requests_mock.call_count, 2)
+
+    def test_single_token_stores_are_refused(self):
+        self.assertRaises(ECSClientException, TokenManager, token_store=FileTokenStore('/tmp/ecsclient.tkn'))
+        self.assertIsNotNone(TokenManager(token_store=MemoryTokenStore()).token_store)
+
+    def test_concurrent_first_calls_log_in_once(self):
+        get_new_token = TokenRequest.get_new_token
+
+        def slow_login(token_request, **kwargs):
+            time.sleep(0.05)
+            return get_new_token(token_request, **kwargs)
+
+        tokens = []
+        with mock.patch.object(TokenRequest, 'get_new_token', autospec=True, side_effect=slow_login):
+            threads = [threading.Thread(target=lambda: tokens.append(self._get_token('user1'))) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(tokens, ['TOKEN-0'] * 5)
+        self.assertEqual(self.requests_mock.call_count, 1)
+
+    def test_least_recently_used_identity_is_evicted_and_logged_out(self):
+        self._get_token('user1')
+        self._get_token('user2')
+        self._get_token('user1')
+
+        self._get_token('user3')
+
+        self.assertEqual(len(self.manager), 2)
+        self.assertNotIn((self.LOGIN_URL, 'user2'), self.manager)
+        self.assertEqual(self._logged_out_tokens(), ['TOKEN-1'])
+
+    def test_invalidate(self):
+        self._get_token('user1')
+
+        self.manager.invalidate(self.LOGIN_URL, 'user1')
+
+        self.assertEqual(self._get_token('user1'), 'TOKEN-1')
+
+    def test_close_logs_out_everyone(self):
+        self._get_token('user1')
+        self._get_token('user2')
+
+        self.manager.close()
+
+        self.assertEqual(len(self.manager), 0)
+        self.assertEqual(sorted(self._logged_out_tokens()), ['TOKEN-0', 'TOKEN-1'])
+
+
+class TestClientIdentity(testtools.TestCase):
+
+    TEST_URL = 'http://127.0.0.1:4443/hi'
+
+    def setUp(self):
+        super(TestClientIdentity, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.requests_mock.register_uri('GET', 'http://127.0.0.1:4443/login', [
+            {'headers': {'X-SDS-AUTH-TOKEN': 'NS-ADMIN-TOKEN-{}'.format(i)}} for i in range(10)])
+        self.client = Client('3', token='token', ecs_endpoint='http://127.0.0.1:4443')
+
+    def test_calls_use_identity_token(self):
+        self.requests_mock.register_uri('GET', self.TEST_URL, text='{}')
+
+        with self.client.as_identity('ns-admin', 'password'):
+            self.client.get('hi')
+            self.assertEqual(self.requests_mock.last_request.headers['x-sds-auth-token'], 'NS-ADMIN-TOKEN-0')
+        self.client.get('hi')
+
+        self.assertEqual(self.requests_mock.last_request.headers['x-sds-auth-token'], 'token')
+        self.assertIs(self.client.token_manager.session, self.client._session)
+
+    def test_unauthorized_response_invalidates_identity_token(self):
+        self.requests_mock.register_uri('GET', self.TEST_URL, [{'status_code': 401}, {'text': '{}'}])
+
+        with self.client.as_identity('ns-admin', 'password'):
+            self.assertRaises(ECSClientException, self.client.get, 'hi')
+            self.client.get('hi')
+
+        self.assertEqual(self.requests_mock.last_request.headers['x-sds-auth-token'], 'NS-ADMIN-TOKEN-1')
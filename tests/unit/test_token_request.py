@@ -1,3 +1,5 @@
+import time
+
 import testtools
 from mock import mock
 from requests_mock.contrib import fixture
@@ -96,3 +98,71 @@ class TestTokenRequest(testtools.TestCase):
         exception = error.exception
         self.assertEqual(exception.message, "Token validation error (Code: 500)")
         self.assertEqual(exception.http_status, http_client.INTERNAL_SERVER_ERROR)
+
+
+class TestTokenRefresher(testtools.TestCase):
+
+    LOGIN_URL = 'https://127.0.0.1:4443/login'
+
+    def setUp(self):
+        super(TestTokenRefresher, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.requests_mock.register_uri('GET', self.LOGIN_URL,
+                                        headers={'X-SDS-AUTH-TOKEN': 'TOKEN'})
+        self.token_request = TokenRequest(username='someone',
+                                          password='password',
+                                          ecs_endpoint='https://127.0.0.1:4443',
+                                          token_endpoint=self.LOGIN_URL,
+                                          verify_ssl=False,
+                                          token_path='/tmp/ecstoken.tkn',
+                                          request_timeout=5.0,
+                                          cache_token=False)
+        self.addCleanup(self.token_request.stop_refresher)
+
+    def test_token_is_refreshed_before_lifetime(self):
+        self.token_request.get_new_token()
+        first_login = self.token_request.token_acquired_at
+
+        self.token_request.start_refresher(lifetime=0.2, margin=0.1)
+        time.sleep(0.35)
+        self.token_request.stop_refresher()
+
+        self.assertGreaterEqual(self.requests_mock.call_count, 3)
+        self.assertGreater(self.token_request.token_acquired_at, first_login)
+
+    def test_refresher_waits_one_interval_before_logging_in(self):
+        self.token_request.start_refresher(lifetime=0.4, margin=0.2)
+        time.sleep(0.05)
+        self.assertEqual(self.requests_mock.call_count, 0)
+
+        for _ in range(100):
+            if self.token_request.token:
+                break
+            time.sleep(0.01)
+        self.token_request.stop_refresher()
+
+        self.assertEqual(self.token_request.token, 'TOKEN')
+        self.assertEqual(self.requests_mock.call_count, 1)
+
+    def test_refresher_survives_login_errors(self):
+        self.requests_mock.register_uri('GET', self.LOGIN_URL, status_code=http_client.SERVICE_UNAVAILABLE)
+
+        self.token_request.start_refresher(lifetime=0.1, margin=0.05)
+        time.sleep(0.15)
+
+        self.assertEqual(self.requests_mock.call_count, 1)
+        self.assertTrue(self.token_request._refresher.is_alive())
+
+    def test_removed_token_is_not_refreshed_until_next_login(self):
+        self.token_request.get_new_token()
+        self.token_request.start_refresher(lifetime=0.1, margin=0.05)
+
+        self.token_request.remove_cached_token()
+        time.sleep(0.15)
+
+        self.assertIsNone(self.token_request.token)
+        self.assertIsNone(self.token_request._refresher)
+        self.assertEqual(self.requests_mock.call_count, 1)
+
+        self.token_request.get_new_token()
+        self.assertTrue(self.token_request._refresher.is_alive())
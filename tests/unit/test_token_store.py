@@ -0,0 +1,198 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import mock
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.common.token_request import TokenRequest
+from ecsclient.common.token_store import DirectoryTokenStore, FileTokenStore, MemoryTokenStore, SQLiteTokenStore
+
+
+class TestFileTokenStore(testtools.TestCase):
+
+    KEY = ('https://127.0.0.1:4443', 'someone')
+
+    def setUp(self):
+        super(TestFileTokenStore, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'ecsclient.tkn')
+        self.store = FileTokenStore(self.path)
+
+    def test_read_missing_file(self):
+        self.assertIsNone(self.store.read(self.KEY))
+
+    def test_write_is_atomic(self):
+        self.store.write(self.KEY, 'TOKEN-1')
+
+        self.assertEqual(FileTokenStore(self.path).read(self.KEY), 'TOKEN-1')
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['ecsclient.tkn'])
+
+    def test_file_is_only_read_when_changed(self):
+        FileTokenStore(self.path).write(self.KEY, 'TOKEN-1')
+        self.assertEqual(self.store.read(self.KEY), 'TOKEN-1')
+
+        with mock.patch('ecsclient.common.token_store.open', create=True) as mock_open:
+            self.assertEqual(self.store.read(self.KEY), 'TOKEN-1')
+        self.assertFalse(mock_open.called)
+
+        FileTokenStore(self.path).write(self.KEY, 'TOKEN-22')
+        self.assertEqual(self.store.read(self.KEY), 'TOKEN-22')
+
+    def test_remove(self):
+        self.store.write(self.KEY, 'TOKEN-1')
+
+        self.store.remove(self.KEY)
+
+        self.assertFalse(os.path.exists(self.path))
+        self.assertIsNone(self.store.read(self.KEY))
+
+
+class TestSharedTokenLogin(testtools.TestCase):
+
+    LOGIN_URL = 'https://127.0.0.1:4443/login'
+
+    def setUp(self):
+        super(TestSharedTokenLogin, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.requests_mock.register_uri('GET', self.LOGIN_URL, headers={'X-SDS-AUTH-TOKEN': 'NEW-TOKEN'})
+        self.requests_mock.register_uri('GET', 'https://127.0.0.1:4443/user/whoami', json={})
+
+    def _token_request(self):
+        return TokenRequest(username='someone',
+                            password='password',
+                            ecs_endpoint='https://127.0.0.1:4443',
+                            token_endpoint=self.LOGIN_URL,
+                            verify_ssl=False,
+                            token_path=os.path.join(self.tmp_dir, 'ecsclient.tkn'),
+                            request_timeout=5.0,
+                            cache_token=True)
+
+    def test_single_login_for_concurrent_clients(self):
+        token_requests = [self._token_request() for _ in range(8)]
+        tokens = []
+
+        threads = [threading.Thread(target=lambda tr=tr: tokens.append(tr.get_token())) for tr in token_requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(tokens, ['NEW-TOKEN'] * 8)
+        self.assertEqual(len([r for r in self.requests_mock.request_history if r.path == '/login']), 1)
+
+    def test_stale_token_is_not_reused(self):
+        token_request = self._token_request()
+        token_request.token_store.write(token_request.token_key, 'STALE-TOKEN')
+
+        token = token_request.get_new_token(reuse_cached=True, stale_token='STALE-TOKEN')
+
+        self.assertEqual(token, 'NEW-TOKEN')
+        self.assertEqual(token_request.token_store.read(token_request.token_key), 'NEW-TOKEN')
+
+
+class TokenStoreTests(object):
+
+    KEY1 = ('https://127.0.0.1:4443', 'user1')
+    KEY2 = ('https://127.0.0.1:4443', 'user2')
+
+    def setUp(self):
+        super(TokenStoreTests, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.store = self.make_store()
+
+    def test_read_missing(self):
+        self.assertIsNone(self.store.read(self.KEY1))
+        self.assertIsNone(self.store.modified_at(self.KEY1))
+
+    def test_keys_do_not_collide(self):
+        self.store.write(self.KEY1, 'TOKEN-1')
+        self.store.write(self.KEY2, 'TOKEN-2')
+
+        self.assertEqual(self.store.read(self.KEY1), 'TOKEN-1')
+        self.assertEqual(self.store.read(self.KEY2), 'TOKEN-2')
+        self.assertIsNotNone(self.store.modified_at(self.KEY1))
+
+    def test_overwrite_and_remove(self):
+        self.store.write(self.KEY1, 'TOKEN-1')
+        self.store.write(self.KEY1, 'TOKEN-11')
+        self.assertEqual(self.store.read(self.KEY1), 'TOKEN-11')
+
+        self.store.remove(self.KEY1)
+
+        self.assertIsNone(self.store.read(self.KEY1))
+
+    def test_expired_token_is_not_returned(self):
+        self.store.write(self.KEY1, 'TOKEN-1', ttl=60)
+
+        with mock.patch('ecsclient.common.token_store.time.time', return_value=time.time() + 61):
+            self.assertIsNone(self.store.read(self.KEY1))
+
+    def test_lock_is_exclusive(self):
+        holders = []
+
+        def hold():
+            with self.store.lock(self.KEY1):
+                holders.append(1)
+                self.assertEqual(len(holders), 1)
+                time.sleep(0.01)
+                holders.pop()
+
+        threads = [threading.Thread(target=hold) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_single_login_through_token_request(self):
+        requests_mock = self.useFixture(fixture.Fixture())
+        requests_mock.register_uri('GET', 'https://127.0.0.1:4443/login', headers={'X-SDS-AUTH-TOKEN': 'NEW-TOKEN'})
+        requests_mock.register_uri('GET', 'https://127.0.0.1:4443/user/whoami', json={})
+        tokens = []
+
+        def get_token():
+            token_request = TokenRequest(username='user1',
+                                         password='password',
+                                         ecs_endpoint='https://127.0.0.1:4443',
+                                         token_endpoint='https://127.0.0.1:4443/login',
+                                         verify_ssl=False,
+                                         token_path=None,
+                                         request_timeout=5.0,
+                                         cache_token=True,
+                                         token_store=self.store)
+            tokens.append(token_request.get_token())
+
+        threads = [threading.Thread(target=get_token) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(tokens, ['NEW-TOKEN'] * 4)
+        self.assertEqual(len([r for r in requests_mock.request_history if r.path == '/login']), 1)
+        self.assertEqual(self.store.read(self.KEY1), 'NEW-TOKEN')
+
+
+class TestMemoryTokenStore(TokenStoreTests, testtools.TestCase):
+
+    def make_store(self):
+        return MemoryTokenStore()
+
+
+class TestDirectoryTokenStore(TokenStoreTests, testtools.TestCase):
+
+    def make_store(self):
+        return DirectoryTokenStore(os.path.join(self.tmp_dir, 'tokens'))
+
+
+class TestSQLiteTokenStore(TokenStoreTests, testtools.TestCase):
+
+    def make_store(self):
+        return SQLiteTokenStore(os.path.join(self.tmp_dir, 'tokens.db'))
@@ -0,0 +1,78 @@
+import threading
+
+import mock
+import testtools
+from requests_mock.contrib import fixture
+
+from ecsclient.client import Client
+
+RG1 = 'urn:storageos:ReplicationGroupInfo:1:global'
+RG2 = 'urn:storageos:ReplicationGroupInfo:2:global'
+SP1 = 'urn:storageos:VirtualArray:1'
+VDC1 = 'urn:storageos:VirtualDataCenterData:1'
+
+
+class TestURNResolver(testtools.TestCase):
+
+    ECS_ENDPOINT = 'http://127.0.0.1:4443'
+
+    def setUp(self):
+        super(TestURNResolver, self).setUp()
+        self.requests_mock = self.useFixture(fixture.Fixture())
+        self.client = Client('3', token='token', ecs_endpoint=self.ECS_ENDPOINT)
+        self.rg_list = self.requests_mock.register_uri(
+            'GET', self.ECS_ENDPOINT + '/vdc/data-service/vpools',
+            json={'data_service_vpool': [{'id': RG1, 'name': 'rg1'}, {'id': RG2, 'name': 'rg2'}]})
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/vdc/data-services/varrays',
+                                        json={'varray': [{'id': SP1, 'name': 'sp1'}]})
+        self.requests_mock.register_uri('GET', self.ECS_ENDPOINT + '/object/vdcs/vdc/list',
+                                        json={'vdc': [{'vdcId': VDC1, 'vdcName': 'vdc1'}]})
+
+    def test_resolve_lists_each_kind_once(self):
+        self.assertEqual(self.client.urns.resolve(RG1), 'rg1')
+        self.assertEqual(self.client.urns.resolve(RG2), 'rg2')
+        self.assertEqual(self.client.urns.resolve(SP1), 'sp1')
+        self.assertEqual(self.client.urns.resolve(VDC1), 'vdc1')
+        self.assertIsNone(self.client.urns.resolve('not-a-urn'))
+        self.assertEqual(self.rg_list.call_count, 1)
+        self.assertEqual(self.requests_mock.call_count, 3)
+
+    def test_ttl_and_unknown_urns(self):
+        self.client.urns.prime(['replication_group'])
+        self.assertEqual(self.rg_list.call_count, 1)
+
+        # Unknown URNs do not list again right away
+        self.assertIsNone(self.client.urns.resolve('urn:storageos:ReplicationGroupInfo:3:global'))
+        self.assertEqual(self.rg_list.call_count, 1)
+
+        with mock.patch('ecsclient.common.urn.time.time', return_value=self.client.urns._loaded_at[
+                'replication_group'] + 901):
+            self.client.urns.resolve(RG1)
+        self.assertEqual(self.rg_list.call_count, 2)
+
+    def test_list_calls_do_not_hold_the_lock(self):
+        self.client.urns.prime(['storage_pool'])
+        resolved = []
+
+        def list_vdcs():
+            # Another thread resolves a storage pool while the VDCs are listed
+            thread = threading.Thread(target=lambda: resolved.append(self.client.urns.resolve(SP1)))
+            thread.start()
+            thread.join(5)
+            return {'vdc': [{'vdcId': VDC1, 'vdcName': 'vdc1'}]}
+
+        with mock.patch.object(self.client.vdc, 'list', side_effect=list_vdcs):
+            self.assertEqual(self.client.urns.resolve(VDC1), 'vdc1')
+        self.assertEqual(resolved, ['sp1'])
+
+    def test_annotate(self):
+        response = {'object_bucket': [{'name': 'b1', 'vpool': RG1}],
+                    'allowed_vpools_list': [RG1, RG2],
+                    'varray': SP1}
+
+        annotated = self.client.urns.annotate(response)
+
+        self.assertEqual(annotated['object_bucket'][0]['vpool_name'], 'rg1')
+        self.assertEqual(annotated['allowed_vpools_list_names'], ['rg1', 'rg2'])
+        self.assertEqual(annotated['varray_name'], 'sp1')
+        self.assertNotIn('vpool_name', response['object_bucket'][0])